@@ -0,0 +1,74 @@
+"""Compare the NumPy and pure Python analytics backends (p01_2bl_analytics)
+on filter, group by region/year/quarter, top 10 and running total.
+
+    python bench_analytics.py --sizes 1000000,10000000,50000000 --python-max-rows 10000000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_2bl_analytics import SalesColumns, NumpySalesColumns, np
+
+CODES = ["w", "m", "c", "e"]
+
+
+def make_columns(rows: int, seed: int = 2021):
+    # the columns directly; 50M Sales objects would not fit in memory
+    first_day = date(2020, 1, 1).toordinal()
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        return (np.arange(1, rows + 1), np.round(rng.uniform(100, 20_000, rows), 2),
+                first_day + rng.integers(0, 731, rows), rng.integers(0, len(CODES), rows))
+    rng = random.Random(seed)
+    return (range(1, rows + 1), [round(rng.uniform(100, 20_000), 2) for _ in range(rows)],
+            [first_day + rng.randrange(731) for _ in range(rows)],
+            [rng.randrange(len(CODES)) for _ in range(rows)])
+
+
+def measure(columns) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    columns.filter(regions=["w", "e"], start=date(2020, 7, 1), end=date(2021, 6, 30), min_amount=1_000)
+    timings["filter"] = time.perf_counter() - start
+    start = time.perf_counter()
+    columns.group_by("region", "year", "quarter")
+    timings["group_by"] = time.perf_counter() - start
+    start = time.perf_counter()
+    columns.top_n(10)
+    timings["top_n"] = time.perf_counter() - start
+    start = time.perf_counter()
+    columns.running_total()
+    timings["running_total"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000000,10000000,50000000")
+    parser.add_argument("--python-max-rows", type=int, default=10_000_000,
+                        help="skip the pure Python backend above this many rows")
+    args = parser.parse_args()
+
+    backends = [SalesColumns] if np is None else [NumpySalesColumns, SalesColumns]
+    print(f"{'Backend':20}{'Rows':>12}{'Filter s':>12}{'Group s':>12}{'Top 10 s':>12}{'Running s':>12}")
+    for rows in map(int, args.sizes.split(",")):
+        data = make_columns(rows)
+        for columns_type in backends:
+            if columns_type is SalesColumns and rows > args.python_max_rows:
+                print(f"{columns_type.__name__:20}{rows:>12,}  skipped (--python-max-rows)")
+                continue
+            columns = columns_type(*data, CODES)
+            result = measure(columns)
+            del columns
+            print(f"{columns_type.__name__:20}{rows:>12,}"
+                  f"{result['filter']:>12.3f}{result['group_by']:>12.3f}"
+                  f"{result['top_n']:>12.3f}{result['running_total']:>12.3f}")
+        del data
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Same workload against every storage backend (p01_1da_backend): open (first
+read of all sales), import of a quarterly file, view of all sales, point
+lookups, updates and save, so the faster backend can be chosen per deployment.
+
+    python bench_backends.py --rows 200000 --import-rows 50000 --lookups 2000 --updates 5000
+"""
+import argparse
+import csv
+import random
+import sys
+import tempfile
+import time
+from contextlib import closing, redirect_stdout
+from datetime import date
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, Regions, DataFileAccess
+import p01_1da_sales_db as db
+import p01_1da_backend as be
+from bench_parse_dates import write_sales_csv
+from bench_sqlite_pool import fill_sales_db
+
+
+def prepare(folder: Path, rows: int, import_rows: int) -> list:
+    # all_sales.csv and sales_db.sqlite with the same rows, and a quarterly file to import;
+    # returns the (date, region code) of every row
+    write_sales_csv(folder / 'all_sales.csv', rows)
+    write_sales_csv(folder / 'sales_q1_2030_w.csv', import_rows, seed=2030)
+    with open(folder / 'all_sales.csv', newline='') as csvfile:
+        records = list(csv.reader(csvfile))
+    fill_sales_db(folder / 'sales_db.sqlite', 0)
+    with closing(db.sqlite3.connect(folder / 'sales_db.sqlite')) as connection:
+        connection.executemany("INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)", records)
+        connection.commit()
+    return [(Sales.parse_date(salesDate), code) for _, salesDate, code in records]
+
+
+def run_workload(backend, folder: Path, keys: list, rows: int, lookups: int, updates: int) -> dict:
+    # seconds per stage
+    rng = random.Random(7)
+    seconds = {}
+    start = time.perf_counter()
+    backend.all_sales().count
+    seconds["open"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        backend.bulk_load(folder / 'sales_q1_2030_w.csv')
+    seconds["import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for sales in backend.all_sales():
+        sales.amount, sales.salesDate, sales.region
+    seconds["view"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for salesDate, code in rng.choices(keys, k=lookups):
+        backend.find(salesDate, code)
+    seconds["lookup"] = time.perf_counter() - start
+
+    edits = [Sales(rng.randrange(1, rows + 1), round(rng.uniform(100, 20_000), 2), salesDate,
+                   Regions().get(code)) for salesDate, code in rng.choices(keys, k=updates)]
+    start = time.perf_counter()
+    backend.write_updates(edits)
+    seconds["update"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        backend.save()
+    seconds["save"] = time.perf_counter() - start
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--import-rows", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    parser.add_argument("--updates", type=int, default=5_000)
+    parser.add_argument("--backends", nargs="+", choices=list(be.BACKENDS), default=list(be.BACKENDS))
+    args = parser.parse_args()
+
+    results = {}
+    db_folder = db.SQLiteDBAccess.SQLITEDBPATH     # where fill_sales_db copies the schema from
+    for name in args.backends:
+        with tempfile.TemporaryDirectory() as tmpdir:   # a fresh copy for each backend
+            folder = Path(tmpdir)
+            db.SQLiteDBAccess.SQLITEDBPATH = db_folder
+            keys = prepare(folder, args.rows, args.import_rows)
+            DataFileAccess.FILEPATH = db.SQLiteDBAccess.SQLITEDBPATH = folder
+            db.SQLiteDBAccess().migrate()   # indexes before timing
+            DataFileAccess.ID_ALLOCATOR.reset(1)
+            backend = be.BACKENDS[name]()
+            try:
+                results[name] = run_workload(backend, folder, keys, args.rows, args.lookups, args.updates)
+            finally:
+                backend.close()
+
+    stages = list(next(iter(results.values())))
+    print(f"{'Stage':10}" + "".join(f"{name + ' s':>12}" for name in results))
+    for stage in stages:
+        print(f"{stage:10}" + "".join(f"{results[name][stage]:>12.3f}" for name in results))
+    print(f"{'total':10}" + "".join(f"{sum(results[name].values()):>12.3f}" for name in results))
+
+
+if __name__ == '__main__':
+    main()
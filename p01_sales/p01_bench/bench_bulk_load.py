@@ -0,0 +1,82 @@
+"""Time loading a year of regional quarterly files (sales_qN_yyyy_r.csv) into
+SQLite with SQLiteDBAccess.bulk_load_sales, against one INSERT and commit per row.
+
+    python bench_bulk_load.py --rows-per-file 250000
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+import p01_1da_sales_db as db
+import p01_1da_sales as da
+
+
+def write_quarterly_files(folder: Path, year: int, rows: int, seed: int = 2021) -> list:
+    rng = random.Random(seed)
+    filepaths = []
+    for quarter in range(1, 5):
+        first_day = date(year, 3 * quarter - 2, 1).toordinal()
+        for code in "wmce":
+            filepath_name = folder / f"sales_q{quarter}_{year}_{code}.csv"
+            with open(filepath_name, "w") as file:
+                file.writelines(f"{round(rng.uniform(100, 20_000), 2)},"
+                                f"{date.fromordinal(first_day + rng.randrange(90)):{da.Sales.DATE_FORMAT}}\n"
+                                for _ in range(rows))
+            filepaths.append(filepath_name)
+    return filepaths
+
+
+def per_row_insert(dbpath: Path, filepaths: list) -> int:
+    count = 0
+    with closing(db.sqlite3.connect(dbpath)) as connection:
+        for filepath_name in filepaths:
+            for sales in da.SalesFile(str(filepath_name)).import_sales():
+                connection.execute("INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)",
+                                   db.SQLiteDBAccess._sales_record(sales))
+                connection.commit()
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows-per-file", type=int, default=250_000)
+    parser.add_argument("--per-row-files", type=int, default=1,
+                        help="files loaded row by row for the baseline (it is slow)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = Path(tmpdir)
+        filepaths = write_quarterly_files(folder, 2021, args.rows_per_file)
+        shutil.copy(db.SQLiteDBAccess.SQLITEDBPATH / 'sales_db.sqlite', folder / 'baseline.sqlite')
+        shutil.copy(db.SQLiteDBAccess.SQLITEDBPATH / 'sales_db.sqlite', folder / 'sales_db.sqlite')
+        with closing(db.sqlite3.connect(folder / 'sales_db.sqlite')) as connection:
+            connection.execute("DELETE FROM ImportedFiles")     # load every generated file
+            connection.commit()
+
+        start = time.perf_counter()
+        count = per_row_insert(folder / 'baseline.sqlite', filepaths[:args.per_row_files])
+        per_row = count / (time.perf_counter() - start)
+
+        db.SQLiteDBAccess.SQLITEDBPATH = folder
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            sqlite_dbaccess.migrate()   # the indexes are filled by every insert
+            start = time.perf_counter()
+            count = sum(sqlite_dbaccess.bulk_load_sales(filepath_name) for filepath_name in filepaths)
+            seconds = time.perf_counter() - start
+
+    print(f"{len(filepaths)} files, {count:,} rows loaded in {seconds:.2f}s")
+    print(f"{'Loader':12}{'Rows/s':>12}")
+    print(f"{'per row':12}{per_row:>12,.0f}")
+    print(f"{'bulk':12}{count / seconds:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Import speed and peak allocation of all_sales.csv read with csv.reader
+versus the memory-mapped MappedCsvReader (DataFileAccess(mapped=True)).
+
+    python bench_mapped_reader.py --rows 5000000
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import DataFileAccess
+from bench_parse_dates import write_sales_csv
+
+
+def read_all(mapped: bool) -> int:
+    # stream the batches without keeping them, so only the reader's own churn is measured
+    rows = 0
+    for batch in DataFileAccess(columnar=True, lazy=True, mapped=mapped).iter_sales_batches():
+        rows += batch.count
+    return rows
+
+
+def measure(mapped: bool) -> dict:
+    start = time.perf_counter()
+    rows = read_all(mapped)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()     # second pass, tracemalloc slows the reading down
+    read_all(mapped)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"rows": rows, "seconds": seconds, "peak": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        DataFileAccess.FILEPATH = Path(tmpdir)
+        write_sales_csv(DataFileAccess.FILEPATH / "all_sales.csv", args.rows)
+        print(f"{'Reader':16}{'Rows/s':>16}{'Peak MiB':>12}")
+        for mapped in (False, True):
+            result = measure(mapped)
+            print(f"{'mmap' if mapped else 'csv.reader':16}"
+                  f"{result['rows'] / result['seconds']:>16,.0f}{result['peak'] / 2**20:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Micro-benchmark of the date/amount conversion used by the csv importers:
+per-row strptime (the original correct_data_types), the fast per-row
+Sales.correct_data_types and the column-wise Sales.correct_data_columns.
+
+    python bench_parse_dates.py --rows 10000000
+"""
+import argparse
+import csv
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, DataFileAccess
+
+
+def write_sales_csv(filepath_name: Path, rows: int, seed: int = 2021) -> None:
+    rng = random.Random(seed)
+    first_day = date(2020, 1, 1).toordinal()
+    with open(filepath_name, "w", newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        for _ in range(rows):
+            writer.writerow([round(rng.uniform(100, 20_000), 2),
+                             f"{date.fromordinal(first_day + rng.randrange(731)):{Sales.DATE_FORMAT}}",
+                             rng.choice("wmce")])
+
+
+def strptime_types(row):
+    # correct_data_types as it was before the fast path
+    try:
+        row[0] = float(row[0])
+    except ValueError:
+        row[0] = "?"
+    try:
+        row[1] = datetime.strptime(row[1], Sales.DATE_FORMAT).date()
+    except ValueError:
+        row[1] = "?"
+
+
+def per_row(filepath_name: Path, correct) -> None:
+    with open(filepath_name, newline='') as csvfile:
+        for row in csv.reader(csvfile):
+            correct(row)
+
+
+def per_column(filepath_name: Path) -> None:
+    with open(filepath_name, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        while rows := list(islice(reader, DataFileAccess.CHUNK_SIZE)):
+            Sales.correct_data_columns([row[0] for row in rows], [row[1] for row in rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filepath_name = Path(tmpdir) / "all_sales.csv"
+        write_sales_csv(filepath_name, args.rows)
+        timings = {}
+        for name, run in (("strptime per row", lambda: per_row(filepath_name, strptime_types)),
+                          ("fast per row", lambda: per_row(filepath_name, Sales.correct_data_types)),
+                          ("fast per column", lambda: per_column(filepath_name))):
+            start = time.perf_counter()
+            run()
+            timings[name] = time.perf_counter() - start
+
+    baseline = timings["strptime per row"]
+    print(f"{'Parser':20}{'Seconds':>10}{'Rows/s':>14}{'Speedup':>10}")
+    for name, seconds in timings.items():
+        print(f"{name:20}{seconds:>10.2f}{args.rows / seconds:>14,.0f}{baseline / seconds:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Construction cost, attribute access and memory per instance of the slotted
+Sales record against the previous dict-backed Sales, on a synthetic import.
+
+    python bench_sales_record.py --rows 2000000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, Regions
+
+
+class DictSales:
+    # Sales as it was before __slots__: one dict per instance
+    def __init__(self, id: int, amount: float=0.0, salesDate: date=None, region=None):
+        self._salesdata = {"ID": id, "amount": amount, "salesDate": salesDate, "region": region}
+
+    def __setitem__(self, key, value):
+        self._salesdata[key] = value
+
+    @property
+    def id(self):
+        return self._salesdata["ID"]
+
+    @property
+    def amount(self):
+        return self._salesdata["amount"]
+
+    @property
+    def salesDate(self):
+        return self._salesdata["salesDate"]
+
+    @property
+    def region(self):
+        return self._salesdata["region"]
+
+    @property
+    def has_bad_amount(self) -> bool:
+        return self._salesdata["amount"] == "?"
+
+    @property
+    def has_bad_date(self) -> bool:
+        return self._salesdata["salesDate"] == "?"
+
+    @property
+    def has_bad_data(self) -> bool:
+        return self.has_bad_amount or self.has_bad_date
+
+
+def make_rows(rows: int, seed: int = 2021) -> list:
+    # (amount, date, region) as an import would produce them; dates and regions are shared objects
+    rng = random.Random(seed)
+    regions = list(Regions())
+    dates = [date.fromordinal(date(2020, 1, 1).toordinal() + day) for day in range(731)]
+    return [(round(rng.uniform(100, 20_000), 2), rng.choice(dates), rng.choice(regions))
+            for _ in range(rows)]
+
+
+def measure(sales_type, rows: list) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    sales_list = [sales_type(0, amount, salesDate, region) for amount, salesDate, region in rows]
+    for id, sales in enumerate(sales_list, 1):
+        sales["ID"] = id
+    build = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    total = 0.0
+    for sales in sales_list:
+        if not sales.has_bad_data and sales.region is not None:
+            total += sales.amount
+    access = time.perf_counter() - start
+    return {"build": build, "access": access, "memory": memory}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"{'Record':12}{'Bytes/row':>12}{'Build rows/s':>16}{'Access rows/s':>16}")
+    for sales_type in (DictSales, Sales):
+        result = measure(sales_type, rows)
+        print(f"{sales_type.__name__:12}"
+              f"{result['memory'] / args.rows:>12,.1f}"
+              f"{args.rows / result['build']:>16,.0f}"
+              f"{args.rows / result['access']:>16,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compare memory and throughput of SalesList (one Sales object per row)
+with ColumnarSalesList (typed arrays, Sales created on demand).
+
+    python bench_saleslist.py --rows 1000000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, SalesList, ColumnarSalesList, Regions
+
+
+def make_sales(rows: int, seed: int = 2021):
+    rng = random.Random(seed)
+    regions = list(Regions())
+    first_day = date(2020, 1, 1).toordinal()
+    for id in range(1, rows + 1):
+        yield Sales(id, round(rng.uniform(100, 20_000), 2),
+                    date.fromordinal(first_day + rng.randrange(731)), rng.choice(regions))
+
+
+def measure(saleslist_type, rows: int) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    sales_list = saleslist_type()
+    for sales in make_sales(rows):
+        sales_list.add(sales)
+    build = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    total = 0.0
+    for sales in sales_list:
+        total += sales.amount
+    scan = time.perf_counter() - start
+    return {"build": build, "scan": scan, "memory": memory}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'Layout':20}{'Bytes/row':>12}{'Build rows/s':>16}{'Scan rows/s':>16}")
+    for saleslist_type in (SalesList, ColumnarSalesList):
+        result = measure(saleslist_type, args.rows)
+        print(f"{saleslist_type.__name__:20}"
+              f"{result['memory'] / args.rows:>12,.1f}"
+              f"{args.rows / result['build']:>16,.0f}"
+              f"{args.rows / result['scan']:>16,.0f}")
+
+
+if __name__ == '__main__':
+    main()
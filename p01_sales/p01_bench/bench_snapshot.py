@@ -0,0 +1,43 @@
+"""Startup time of DataFileAccess: parsing all_sales.csv versus loading the
+binary snapshot written next to it (SalesSnapshot).
+
+    python bench_snapshot.py --rows 5000000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import DataFileAccess, SalesSnapshot
+from bench_parse_dates import write_sales_csv
+
+
+def load_seconds(columnar: bool) -> float:
+    start = time.perf_counter()
+    DataFileAccess(columnar=columnar)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        DataFileAccess.FILEPATH = Path(tmpdir)
+        csv_filepath_name = DataFileAccess.FILEPATH / "all_sales.csv"
+        write_sales_csv(csv_filepath_name, args.rows)
+        snapshot = SalesSnapshot(csv_filepath_name)
+
+        print(f"{'Start':32}{'Seconds':>10}{'Rows/s':>16}")
+        for columnar in (True, False):
+            snapshot.remove()
+            for label, seconds in ((f"csv (columnar={columnar})", load_seconds(columnar)),
+                                   (f"snapshot (columnar={columnar})", load_seconds(columnar))):
+                print(f"{label:32}{seconds:>10.3f}{args.rows / seconds:>16,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Lookups per second of the Sales(salesDate, region) query on a large table,
+before and after SQLiteDBAccess adds its indexes.
+
+    python bench_sqlite_index.py --rows 2000000 --lookups 20000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+import p01_1da_sales_db as db
+from bench_sqlite_pool import fill_sales_db, lookups_per_second
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dbpath = Path(tmpdir) / 'sales_db.sqlite'
+        keys = fill_sales_db(dbpath, args.rows)
+        keys = random.Random(7).choices(keys, k=args.lookups)
+        query, _ = db.SQLiteDBAccess.HOT_QUERIES["sales by date and region"]
+
+        # without indexes every lookup is a full scan, so only time a few of them
+        scans = keys[:max(1, args.lookups // 1000)]
+        with closing(db.sqlite3.connect(dbpath)) as connection:
+            start = time.perf_counter()
+            for key in scans:
+                connection.execute(query, key).fetchone()
+            no_index = len(scans) / (time.perf_counter() - start)
+
+        db.SQLiteDBAccess.SQLITEDBPATH = Path(tmpdir)
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            start = time.perf_counter()
+            sqlite_dbaccess.migrate()
+            migration = time.perf_counter() - start
+            indexed = lookups_per_second(sqlite_dbaccess, keys)
+            scans = sqlite_dbaccess.check_query_plans()
+
+    print(f"{args.rows:,} rows, migration took {migration:.2f}s, scanning hot queries: {scans}")
+    print(f"{'Schema':12}{'Lookups/s':>12}")
+    print(f"{'no index':12}{no_index:>12,.0f}")
+    print(f"{'indexed':12}{indexed:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
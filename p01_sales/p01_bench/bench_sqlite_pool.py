@@ -0,0 +1,61 @@
+"""Lookups per second of SQLiteDBAccess.retrieve_sales_by_date_region with a
+new connection per call and with pooled, long-lived connections.
+
+    python bench_sqlite_pool.py --rows 100000 --lookups 20000
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+import p01_1da_sales_db as db
+
+
+def fill_sales_db(dbpath: Path, rows: int, seed: int = 2021) -> list:
+    # copy of the real db (same schema) filled with synthetic sales; returns the (date, region) keys
+    shutil.copy(db.SQLiteDBAccess.SQLITEDBPATH / 'sales_db.sqlite', dbpath)
+    rng = random.Random(seed)
+    first_day = date(2000, 1, 1).toordinal()
+    records = [(round(rng.uniform(100, 20_000), 2),
+                f"{date.fromordinal(first_day + rng.randrange(9_000)):%Y-%m-%d}",
+                rng.choice("wmce")) for _ in range(rows)]
+    with closing(db.sqlite3.connect(dbpath)) as connection:
+        connection.execute("DELETE FROM Sales")
+        connection.executemany("INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)", records)
+        connection.commit()
+    return [(salesDate, region) for _, salesDate, region in records]
+
+
+def lookups_per_second(sqlite_dbaccess: db.SQLiteDBAccess, keys: list) -> float:
+    start = time.perf_counter()
+    for salesDate, region in keys:
+        sqlite_dbaccess.retrieve_sales_by_date_region(salesDate, region)
+    return len(keys) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        keys = fill_sales_db(Path(tmpdir) / 'sales_db.sqlite', args.rows)
+        db.SQLiteDBAccess.SQLITEDBPATH = Path(tmpdir)
+        db.SQLiteDBAccess().migrate()   # indexes before timing
+        keys = random.Random(7).choices(keys, k=args.lookups)
+
+        print(f"{'Mode':12}{'Lookups/s':>12}")
+        print(f"{'per-call':12}{lookups_per_second(db.SQLiteDBAccess(), keys):>12,.0f}")
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            print(f"{'pooled':12}{lookups_per_second(sqlite_dbaccess, keys):>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
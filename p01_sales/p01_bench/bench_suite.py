@@ -0,0 +1,199 @@
+"""Repeatable benchmark suite on generated data (generate_sales_data.py): import of
+all_sales.csv (parsed and from the snapshot) and of the quarterly files, view_sales
+rendering, save, SQLite bulk load, lookup and update. Each benchmark runs --repeat
+times on the same data; the results are written as JSON, and --compare prints the
+change against the JSON of an earlier run.
+
+    python bench_suite.py --rows 500000 --repeat 5 --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, Regions, DataFileAccess, SalesFile, SalesSnapshot
+from p01_2bl_salesmanager import SalesReport
+import p01_1da_sales_db as db
+from generate_sales_data import write_all_sales, write_quarterly_files, write_sales_db
+
+RESULTS_VERSION = 1     # bump when the meaning of a benchmark changes
+
+
+class Workload:
+    # the generated files in one folder, and what the benchmarks need to know about them
+    def __init__(self, folder: Path, args):
+        self.folder = folder
+        self.args = args
+        write_all_sales(folder / 'all_sales.csv', args.rows, args.seed, bad_ratio=args.bad_ratio)
+        self.quarterly_files = write_quarterly_files(folder, args.quarter_rows, args.years,
+                                                     bad_ratio=args.bad_ratio, seed=args.seed)
+        (folder / 'clean').mkdir()     # the same files without bad rows: the db refuses a file with bad data
+        self.clean_files = [folder / 'clean' / filename for filename in
+                            write_quarterly_files(folder / 'clean', args.quarter_rows, args.years, seed=args.seed)]
+        self.keys = write_sales_db(folder / 'sales_db.sqlite', args.rows, args.seed)
+        shutil.copy(folder / 'sales_db.sqlite', folder / 'template.sqlite')    # for bulk loads
+        DataFileAccess.FILEPATH = db.SQLiteDBAccess.SQLITEDBPATH = folder
+        rng = random.Random(args.seed)
+        self.lookup_keys = rng.choices(self.keys, k=args.lookups)
+        self.updates = [Sales(rng.randrange(1, args.rows + 1), round(rng.uniform(100, 20_000), 2),
+                              Sales.parse_date(salesDate), Regions().get(code))
+                        for salesDate, code in rng.choices(self.keys, k=args.updates)]
+
+
+# each benchmark: setup(workload) -> state, then run(workload, state) -> rows processed;
+# only run is timed
+def setup_parse(workload):
+    SalesSnapshot(workload.folder / 'all_sales.csv').remove()
+
+
+def run_load(workload, state) -> int:
+    with redirect_stdout(StringIO()):
+        return DataFileAccess(columnar=True)._all_sales_list.count
+
+
+def setup_snapshot(workload):
+    with redirect_stdout(StringIO()):
+        DataFileAccess(columnar=True)   # writes the snapshot if it is missing
+
+
+def run_quarterly(workload, state) -> int:
+    return sum(SalesFile(filename).import_sales().count for filename in workload.quarterly_files)
+
+
+def setup_loaded(workload):
+    with redirect_stdout(StringIO()):
+        return DataFileAccess(columnar=True)
+
+
+def run_view(workload, datafileaccess) -> int:
+    report = SalesReport(datafileaccess._all_sales_list)
+    report.render(StringIO().write)
+    return report.row_count
+
+
+def run_save(workload, datafileaccess) -> int:
+    with redirect_stdout(StringIO()):
+        datafileaccess.save_all_sales(compact=True)
+    return datafileaccess._all_sales_list.count
+
+
+def setup_empty_db(workload):
+    shutil.copy(workload.folder / 'template.sqlite', workload.folder / 'bulk.sqlite')
+    sqlite_dbaccess = db.SQLiteDBAccess('bulk.sqlite')
+    sqlite_dbaccess.migrate()   # the indexes are filled by every insert
+    with sqlite_dbaccess._connection() as connection:
+        connection.execute("DELETE FROM Sales")
+        connection.commit()
+    return sqlite_dbaccess
+
+
+def run_bulk_load(workload, sqlite_dbaccess) -> int:
+    with redirect_stdout(StringIO()):
+        return sum(sqlite_dbaccess.bulk_load_sales(filepath_name) for filepath_name in workload.clean_files)
+
+
+def setup_pooled(workload):
+    sqlite_dbaccess = db.SQLiteDBAccess(pooled=True)
+    sqlite_dbaccess.migrate()   # indexes are created before timing
+    return sqlite_dbaccess
+
+
+def run_lookup(workload, sqlite_dbaccess) -> int:
+    for salesDate, code in workload.lookup_keys:
+        sqlite_dbaccess.retrieve_sales_by_date_region(salesDate, code)
+    return len(workload.lookup_keys)
+
+
+def run_update(workload, sqlite_dbaccess) -> int:
+    return sqlite_dbaccess.update_many(workload.updates)
+
+
+BENCHMARKS = {
+    "import_all_sales_csv": (setup_parse, run_load),
+    "import_all_sales_snapshot": (setup_snapshot, run_load),
+    "import_quarterly_files": (lambda workload: None, run_quarterly),
+    "view_sales": (setup_loaded, run_view),
+    "save_all_sales": (setup_loaded, run_save),
+    "sqlite_bulk_load": (setup_empty_db, run_bulk_load),
+    "sqlite_lookup": (setup_pooled, run_lookup),
+    "sqlite_update": (setup_pooled, run_update),
+}
+
+
+def run_benchmark(name: str, workload: Workload, repeat: int) -> dict:
+    setup, run = BENCHMARKS[name]
+    seconds = []
+    for _ in range(repeat):
+        state = setup(workload)
+        start = time.perf_counter()
+        rows = run(workload, state)
+        seconds.append(time.perf_counter() - start)
+        if hasattr(state, "close"):
+            state.close()
+    best = min(seconds)
+    return {"rows": rows, "seconds": seconds, "best": best, "median": statistics.median(seconds),
+            "rows_per_sec": rows / best if best > 0 else None}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> None:
+    # best time against the baseline; a ratio above 1 + threshold is flagged as slower
+    if baseline.get("parameters") != results["parameters"]:
+        print("Note: the baseline was run with other parameters.")
+    print(f"\n{'Benchmark':28}{'Baseline s':>12}{'Now s':>12}{'Ratio':>8}")
+    for name, result in results["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:28}{'-':>12}{result['best']:>12.4f}")
+            continue
+        ratio = result["best"] / before["best"] if before["best"] else float("inf")
+        flag = "  slower" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+        print(f"{name:28}{before['best']:>12.4f}{result['best']:>12.4f}{ratio:>8.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows of all_sales.csv and sales_db.sqlite")
+    parser.add_argument("--quarter-rows", type=int, default=10_000, help="rows of each quarterly file")
+    parser.add_argument("--years", type=int, nargs="*", default=[2021])
+    parser.add_argument("--bad-ratio", type=float, default=0.001)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=2021)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--compare", type=Path, help="results JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="ratio change reported by --compare")
+    args = parser.parse_args()
+
+    parameters = {key: value for key, value in vars(args).items()
+                  if key not in ("only", "output", "compare", "threshold")}
+    results = {"version": RESULTS_VERSION, "created": datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(), "platform": platform.platform(),
+               "parameters": parameters, "results": {}}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workload = Workload(Path(tmpdir), args)
+        print(f"{'Benchmark':28}{'Rows':>10}{'Best s':>10}{'Median s':>10}{'Rows/s':>14}")
+        for name in args.only:
+            result = results["results"][name] = run_benchmark(name, workload, args.repeat)
+            print(f"{name:28}{result['rows']:>10,}{result['best']:>10.4f}{result['median']:>10.4f}"
+                  f"{result['rows_per_sec'] or 0:>14,.0f}")
+
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results written to {args.output}.")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()), args.threshold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Updates per second of SQLiteDBAccess.update_sales (one commit per row)
+versus update_many / SalesUpdateQueue.flush (executemany, one transaction).
+
+    python bench_update_many.py --rows 100000 --updates 5000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import date
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+import p01_1da_sales_db as db
+from bench_sqlite_pool import fill_sales_db
+
+
+def make_updates(rows: int, updates: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    first_day = date(2000, 1, 1).toordinal()
+    return [db.Sales(rng.randrange(1, rows + 1), round(rng.uniform(100, 20_000), 2),
+                     date.fromordinal(first_day + rng.randrange(9_000)), None) for _ in range(updates)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--updates", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fill_sales_db(Path(tmpdir) / 'sales_db.sqlite', args.rows)
+        db.SQLiteDBAccess.SQLITEDBPATH = Path(tmpdir)
+        db.SQLiteDBAccess().migrate()   # the indexes are kept up to date by every update
+        updates = make_updates(args.rows, args.updates)
+
+        print(f"{'Mode':16}{'Updates/s':>12}")
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            start = time.perf_counter()
+            with redirect_stdout(StringIO()):   # update_sales prints every region
+                for sales in updates:
+                    sqlite_dbaccess.update_sales(sales)
+            print(f"{'update_sales':16}{len(updates) / (time.perf_counter() - start):>12,.0f}")
+
+            start = time.perf_counter()
+            sqlite_dbaccess.update_many(updates)
+            print(f"{'update_many':16}{len(updates) / (time.perf_counter() - start):>12,.0f}")
+
+            update_queue = db.SalesUpdateQueue(sqlite_dbaccess)
+            start = time.perf_counter()
+            for sales in updates:
+                update_queue.put(sales)
+            update_queue.flush()
+            print(f"{'queue + flush':16}{len(updates) / (time.perf_counter() - start):>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
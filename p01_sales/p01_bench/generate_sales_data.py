@@ -0,0 +1,121 @@
+"""Deterministic synthetic sales data for the benchmarks: all_sales.csv, quarterly
+sales_qN_yyyy_r.csv files and a populated sales_db.sqlite. The same arguments always
+give the same files; bad rows (unparsable amount or date) are mixed into the csv
+files at --bad-ratio.
+
+    python generate_sales_data.py OUTDIR --rows 1000000 --quarter-rows 50000 --years 2021 2022 --bad-ratio 0.001
+"""
+import argparse
+import csv
+import random
+import shutil
+import sys
+from contextlib import closing
+from datetime import date
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, Regions
+import p01_1da_sales_db as db
+
+REGION_CODES = "wmce"
+# what a bad row looks like: the amount or the date is replaced by one of these
+BAD_AMOUNTS = ("8-934", "", "n/a")
+BAD_DATES = ("20021-8-15", "2021-13-01", "2021-02-29", "")
+
+
+def sales_rows(rows: int, seed: int=2021, regions: str=REGION_CODES, bad_ratio: float=0.0,
+               first_day: date=date(2020, 1, 1), days: int=731) -> Iterator[list]:
+    # [amount, date, region code] rows with dates in first_day .. first_day + days - 1;
+    # bad rows come from their own random stream, so the good rows do not depend on bad_ratio
+    rng = random.Random(seed)
+    bad_rng = random.Random(seed + 1)
+    first_ordinal = first_day.toordinal()
+    for _ in range(rows):
+        row = [f"{round(rng.uniform(100, 20_000), 2)}",
+               f"{date.fromordinal(first_ordinal + rng.randrange(days)):{Sales.DATE_FORMAT}}",
+               rng.choice(regions)]
+        if bad_ratio and bad_rng.random() < bad_ratio:
+            if bad_rng.random() < 0.5:
+                row[0] = bad_rng.choice(BAD_AMOUNTS)
+            else:
+                row[1] = bad_rng.choice(BAD_DATES)
+        yield row
+
+
+def write_all_sales(filepath_name: Path, rows: int, seed: int=2021, regions: str=REGION_CODES,
+                    bad_ratio: float=0.0) -> None:
+    # all_sales.csv format: amount,date,region
+    with open(filepath_name, "w", newline='') as csvfile:
+        csv.writer(csvfile).writerows(sales_rows(rows, seed, regions, bad_ratio))
+
+
+def quarter_days(year: int, quarter: int) -> tuple[date, int]:
+    # first day and number of days of a quarter
+    first_day = date(year, 3 * quarter - 2, 1)
+    next_first_day = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    return first_day, (next_first_day - first_day).days
+
+
+def write_quarterly_files(folder: Path, rows: int, years=(2021,), regions: str=REGION_CODES,
+                          bad_ratio: float=0.0, seed: int=2021) -> list[str]:
+    # one sales_qN_yyyy_r.csv (amount,date) per quarter, year and region; returns the file names
+    filenames = []
+    for year in years:
+        for quarter in range(1, 5):
+            first_day, days = quarter_days(year, quarter)
+            for number, code in enumerate(regions):
+                filename = f"sales_q{quarter}_{year}_{code}.csv"
+                file_seed = seed + year * 100 + quarter * 10 + number
+                with open(folder / filename, "w", newline='') as csvfile:
+                    csv.writer(csvfile).writerows(row[:2] for row in sales_rows(rows, file_seed, code, bad_ratio,
+                                                                                first_day, days))
+                filenames.append(filename)
+    return filenames
+
+
+def write_sales_db(dbpath: Path, rows: int, seed: int=2021, regions: str=REGION_CODES,
+                   batch_size: int=100_000, template: Optional[Path]=None) -> list[tuple]:
+    # copy of the real db (same schema) holding only generated sales; bad rows are never
+    # generated because the db only stores checked sales. Returns the (date, region) keys.
+    shutil.copy(template or db.SQLiteDBAccess.SQLITEDBPATH / 'sales_db.sqlite', dbpath)
+    keys = []
+    with closing(db.sqlite3.connect(dbpath)) as connection:
+        with connection:
+            connection.execute("DELETE FROM Sales")
+            connection.execute("DELETE FROM ImportedFiles")
+            connection.execute("DELETE FROM sqlite_sequence WHERE name = 'Sales'")
+            known = {region.code for region in Regions()}
+            connection.executemany("INSERT OR IGNORE INTO Region (code, name) VALUES (?, ?)",
+                                   [(code, code.upper()) for code in regions if code not in known])
+            records = sales_rows(rows, seed, regions)
+            while batch := list(islice(records, batch_size)):
+                connection.executemany("INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)", batch)
+                keys.extend((salesDate, code) for _, salesDate, code in batch)
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("outdir", type=Path)
+    parser.add_argument("--rows", type=int, default=100_000, help="rows of all_sales.csv and sales_db.sqlite")
+    parser.add_argument("--quarter-rows", type=int, default=10_000, help="rows of each quarterly file")
+    parser.add_argument("--years", type=int, nargs="*", default=[2021])
+    parser.add_argument("--regions", default=REGION_CODES, help="region codes, one letter each")
+    parser.add_argument("--bad-ratio", type=float, default=0.0, help="share of bad rows in the csv files")
+    parser.add_argument("--seed", type=int, default=2021)
+    args = parser.parse_args()
+
+    args.outdir.mkdir(parents=True, exist_ok=True)
+    write_all_sales(args.outdir / 'all_sales.csv', args.rows, args.seed, args.regions, args.bad_ratio)
+    filenames = write_quarterly_files(args.outdir, args.quarter_rows, args.years, args.regions,
+                                      args.bad_ratio, args.seed)
+    write_sales_db(args.outdir / 'sales_db.sqlite', args.rows, args.seed, args.regions)
+    print(f"Wrote all_sales.csv, sales_db.sqlite ({args.rows:,} rows each) and {len(filenames)} "
+          f"quarterly files ({args.quarter_rows:,} rows each) to {args.outdir}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Unit tests for the analytics backends of p01sc06_OOPDBGUI3tier.
+import unittest
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, SalesList, ColumnarSalesList, Region, Regions
+import p01_2bl_analytics as an
+
+
+class TestSalesColumns(unittest.TestCase):
+
+    def setUp(self):
+        """Same rows, including bad ones, in both list layouts"""
+        rows = [Sales(1, 100.0, date(2021, 1, 5), Regions().get("w")),
+                Sales(2, 250.0, date(2021, 4, 1), Regions().get("e")),
+                Sales(3, "?", date(2021, 4, 2), Regions().get("e")),
+                Sales(4, 300.0, "?", Regions().get("w")),
+                Sales(5, 50.0, date(2021, 1, 5), None),
+                Sales(6, 400.0, date(2022, 2, 1), Regions().get("w"))]
+        self.lists = [SalesList(), ColumnarSalesList()]
+        for sales_list in self.lists:
+            for sales in rows:
+                sales_list.add(sales)
+
+    def backends(self):
+        for sales_list in self.lists:
+            yield an.columns_from_saleslist(sales_list, use_numpy=False)
+            if an.np is not None:
+                yield an.columns_from_saleslist(sales_list, use_numpy=True)
+
+    def test_group_by(self):
+        """Bad rows are left out and groups are keyed by region, year and quarter"""
+        for columns in self.backends():
+            self.assertEqual(columns.count, 4)
+            self.assertEqual(columns.group_by("region", "year", "quarter"),
+                             {("", 2021, 1): (50.0, 1), ("e", 2021, 2): (250.0, 1),
+                              ("w", 2021, 1): (100.0, 1), ("w", 2022, 1): (400.0, 1)})
+            self.assertEqual(columns.group_by("year"), {(2021,): (400.0, 3), (2022,): (400.0, 1)})
+            with self.assertRaises(ValueError):
+                columns.group_by("day")
+
+    def test_filter_top_n_running_total(self):
+        """Filters combine, top_n is largest first and running_total is per date"""
+        for columns in self.backends():
+            selected = columns.filter(regions=["w"], start=date(2021, 1, 1), max_amount=350)
+            self.assertEqual(selected.top_n(5), [(1, 100.0, date(2021, 1, 5), "w")])
+            self.assertEqual(columns.top_n(2), [(6, 400.0, date(2022, 2, 1), "w"),
+                                                (2, 250.0, date(2021, 4, 1), "e")])
+            self.assertEqual(columns.running_total(), [(date(2021, 1, 5), 150.0),
+                                                       (date(2021, 4, 1), 400.0),
+                                                       (date(2022, 2, 1), 800.0)])
+
+    def test_same_code_regions(self):
+        """Two Region objects with one code are one region for every backend"""
+        sales_list = ColumnarSalesList()
+        sales_list.add(Sales(1, 5.0, date(2021, 1, 5), Region("w", "West")))
+        sales_list.add(Sales(2, 10.0, date(2021, 1, 6), Region("w", "Western")))
+        sales_list.add(Sales(3, 1.0, date(2021, 1, 7), Region("e", "East")))
+        backends = [an.columns_from_saleslist(sales_list, use_numpy=False)]
+        if an.np is not None:
+            backends.append(an.columns_from_saleslist(sales_list, use_numpy=True))
+        for columns in backends:
+            self.assertEqual(columns.group_by("region"), {("e",): (1.0, 1), ("w",): (15.0, 2)})
+            self.assertEqual(columns.filter(regions=["w"]).count, 2)
+            self.assertEqual(columns.filter(regions=["w"]).group_by("region"), {("w",): (15.0, 2)})
+
+    @unittest.skipIf(an.np is None, "numpy is not installed")
+    def test_list_can_grow_after_analytics(self):
+        """The numpy columns are copies, so the ColumnarSalesList can still be added to"""
+        good_list = ColumnarSalesList()
+        good_list.add(Sales(1, 100.0, date(2021, 1, 5), Regions().get("w")))
+        for sales_list in (self.lists[1], good_list):   # with and without bad rows
+            columns = an.columns_from_saleslist(sales_list, use_numpy=True)
+            sales_list.add(Sales(7, 10.0, date(2021, 1, 6), Regions().get("w")))
+            self.assertEqual(columns.count, sales_list.count - 1 - sum(map(bool, sales_list._flags)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# Unit tests for the storage backends of p01sc06_OOPDBGUI3tier.
+import unittest
+import sys
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, Regions, DataFileAccess
+import p01_1da_sales_db as db
+import p01_1da_backend as be
+
+
+class BackendTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Both backends on temporary copies holding the same five sales"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.saved = DataFileAccess.FILEPATH, dict(DataFileAccess.SALES_ID), db.SQLiteDBAccess.SQLITEDBPATH
+        shutil.copy(db.SQLiteDBAccess.SQLITEDBPATH / 'sales_db.sqlite', self.tmpdir.name)
+        DataFileAccess.FILEPATH = db.SQLiteDBAccess.SQLITEDBPATH = Path(self.tmpdir.name)
+        DataFileAccess.SALES_ID["Sales"] = 1
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "w", newline='') as f:    # ids 1 to 5 as in the db
+            f.write("23456.0,2021-12-22,w\n1265.0,2021-09-09,e\n23757.0,2020-11-11,e\n"
+                    "12549.0,2020-12-12,m\n393.0,2021-02-02,w\n")
+        with open(DataFileAccess.FILEPATH / "sales_q4_2021_w.csv", "w", newline='') as f:
+            f.write("13761,2021-10-15\n9710,2021-12-22\n")
+        self.backends = [be.CsvSalesBackend(), be.SQLiteSalesBackend()]
+
+    def tearDown(self):
+        """Close the backends and restore the class level settings"""
+        for backend in self.backends:
+            backend.close()
+        DataFileAccess.FILEPATH, saved_id, db.SQLiteDBAccess.SQLITEDBPATH = self.saved
+        DataFileAccess.SALES_ID.update(saved_id)
+        self.tmpdir.cleanup()
+
+
+class TestBackends(BackendTestCase):
+
+    def test_protocol(self):
+        """Both implement SalesBackend and are listed by name"""
+        for backend in self.backends:
+            self.assertIsInstance(backend, be.SalesBackend)
+            self.assertIs(be.BACKENDS[backend.name], type(backend))
+
+    def test_reads(self):
+        """Streaming reads, point lookups and pages give the same sales"""
+        for backend in self.backends:
+            with self.subTest(backend.name):
+                self.assertEqual(backend.all_sales().count, 5)
+                self.assertEqual([sales.id for sales in backend.iter_sales()], [3, 4, 5, 2, 1])
+                self.assertEqual([sales.id for sales in backend.iter_sales(date(2021, 1, 1), regions=["w"])],
+                                 [5, 1])
+                found = backend.find(date(2021, 12, 22), "w")
+                self.assertEqual([(sales.id, sales.amount) for sales in found], [(1, 23456.0)])
+                self.assertIs(found[0].region, Regions().get("w"))
+                page, after = backend.sales_page(page_size=3)
+                self.assertEqual(([sales.id for sales in page], after), ([3, 4, 5], ("2021-02-02", 5)))
+                page, after = backend.sales_page(after, page_size=3)
+                self.assertEqual(([sales.id for sales in page], after), ([2, 1], None))
+                self.assertEqual(backend.summary().totals_by("region")[("e",)], [25022.0, 2])
+                self.assertEqual([region.code for region in backend.regions()], ["w", "m", "c", "e"])
+
+    def test_bulk_load(self):
+        """A quarterly file is loaded once and recorded as imported"""
+        for backend in self.backends:
+            with self.subTest(backend.name):
+                filepath_name = DataFileAccess.FILEPATH / "sales_q4_2021_w.csv"
+                self.assertFalse(backend.already_imported(filepath_name))
+                self.assertEqual(backend.bulk_load(filepath_name), 2)
+                self.assertTrue(backend.already_imported(filepath_name))
+                self.assertEqual(backend.bulk_load(filepath_name), 0)
+                self.assertEqual(len(backend.find(date(2021, 12, 22), "w")), 2)
+                self.assertEqual(backend.bulk_load([Sales(0, "?", date(2022, 1, 1), Regions().get("w"))]), 0)
+                self.assertEqual(backend.all_sales().count, 7)
+
+    def test_sales_ids(self):
+        """The next id follows the Sales table of the database"""
+        self.assertEqual(DataFileAccess.SALES_ID["Sales"], 7)     # sqlite_sequence is 6: id 6 was deleted
+        self.assertEqual(self.backends[1].bulk_load(DataFileAccess.FILEPATH / "sales_q4_2021_w.csv"), 2)
+        self.assertEqual(DataFileAccess.SALES_ID["Sales"], 9)
+
+    def test_pages_with_ties(self):
+        """Paging through sales that share a date gives every sales once, in the same order"""
+        more = [Sales(0, float(amount), date(2021, 2, 2), Regions().get(code))
+                for amount, code in ((1, "w"), (2, "e"), (3, "w"), (4, "w"))]
+        for backend in self.backends:
+            self.assertEqual(backend.bulk_load(more), 4)
+        for filters in ({}, {"regions": ["w"]}, {"start": date(2021, 1, 1), "end": date(2021, 2, 2)}):
+            pages = []
+            for backend in self.backends:
+                with self.subTest(backend.name, **filters):
+                    shown, after = [], None
+                    while True:
+                        page, after = backend.sales_page(after, page_size=2, **filters)
+                        shown += [(sales.salesDate, sales.amount) for sales in page]
+                        if after is None:
+                            break
+                    self.assertEqual(shown, [(sales.salesDate, sales.amount) for sales in backend.iter_sales(**filters)])
+                    pages.append(shown)
+            self.assertEqual(pages[0], pages[1])
+
+    def test_summary(self):
+        """Both backends group the same way, including dates an outside edit left unpadded or bad"""
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "a", newline='') as f:
+            f.write("10.0,2021-7-4,w\n20.0,2021-02-30,e\n")
+        with closing(sqlite3.connect(DataFileAccess.FILEPATH / "sales_db.sqlite")) as connection:
+            connection.executemany("INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)",
+                                   [(10.0, "2021-7-4", "w"), (20.0, "2021-02-30", "e")])
+            connection.commit()
+        summaries = [backend.summary() for backend in self.backends]
+        self.assertEqual(summaries[0].groups(), summaries[1].groups())
+        self.assertEqual([summary.bad_count for summary in summaries], [1, 1])
+        self.assertEqual(summaries[1].totals_by("region")[("w",)], [23859.0, 3])
+
+    def test_updates_and_save(self):
+        """Updates match by id, a bad one changes nothing, and save makes them durable"""
+        for backend in list(self.backends):
+            with self.subTest(backend.name):
+                self.assertEqual(backend.write_updates([Sales(2, 5.0, date(2021, 9, 10), Regions().get("e")),
+                                                        Sales(99, 9.0, date(2021, 1, 1), None)]), 1)
+                with self.assertRaises((db.sqlite3.Error, ValueError)):
+                    backend.write_updates([Sales(3, 3.0, date(2020, 11, 11), None),
+                                           Sales(4, [], date(2020, 12, 12), None)])
+                backend.save()
+                reopened = type(backend)()
+                self.backends.append(reopened)
+                self.assertEqual([sales.amount for sales in reopened.find(date(2021, 9, 10), "e")], [5.0])
+                self.assertEqual(reopened.find(date(2021, 9, 9), "e"), [])
+                self.assertEqual(reopened.find(date(2020, 11, 11), "e")[0].amount, 23757.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
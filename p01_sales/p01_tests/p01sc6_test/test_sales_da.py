@@ -0,0 +1,509 @@
+# Unit tests for the data access tier of p01sc06_OOPDBGUI3tier.
+import unittest
+import sys
+import tempfile
+import threading
+import sqlite3
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import (Sales, SalesList, ColumnarSalesList, Region, Regions, DataFileAccess, SalesFile,
+                           ImportedFile, MappedCsvReader, SalesIdAllocator, SalesSnapshot, SalesIndex)
+
+
+class TestColumnarSalesList(unittest.TestCase):
+
+    def setUp(self):
+        """Build the same rows, including bad ones, into both layouts"""
+        self.rows = [Sales(1, 12493.0, date(2020, 12, 22), Regions().get("w")),
+                     Sales(2, "?", date(2021, 9, 15), Regions().get("e")),
+                     Sales(3, 9710.0, "?", Regions().get("e")),
+                     Sales(4, 8934.0, date(2021, 8, 8), None)]
+        self.plain = SalesList()
+        self.columnar = ColumnarSalesList()
+        for sales in self.rows:
+            self.plain.add(sales)
+            self.columnar.add(sales)
+
+    def test_same_rows(self):
+        """Iterating and indexing give back the same values as SalesList"""
+        self.assertEqual(self.columnar.count, self.plain.count)
+        for expected, actual in zip(self.plain, self.columnar):
+            self.assertEqual(str(expected), str(actual))
+        self.assertEqual(str(self.columnar[-1]), str(self.plain[-1]))
+        self.assertTrue(self.columnar[1].has_bad_amount)
+        self.assertTrue(self.columnar[2].has_bad_date)
+        with self.assertRaises(IndexError):
+            self.columnar[4]
+
+    def test_setitem_writes_through(self):
+        """Setting the ID on a view updates the stored column"""
+        for new_id, sales in enumerate(self.columnar, start=100):
+            sales["ID"] = new_id
+        self.assertEqual([sales.id for sales in self.columnar], [100, 101, 102, 103])
+
+    def test_concat(self):
+        """Concatenating columnar and plain lists keeps every row"""
+        other = ColumnarSalesList()
+        other.concat(self.columnar)
+        other.concat(self.plain)
+        self.assertEqual(other.count, 8)
+        self.assertEqual(str(other[4]), str(self.plain[0]))
+        self.assertEqual(other[3].region, None)
+
+
+class TestSalesIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Both layouts with a few sales on shared dates and regions"""
+        self.lists = [SalesList(), ColumnarSalesList()]
+        rows = [(100.0, date(2021, 3, 1), "w"), (200.0, date(2021, 1, 5), "e"),
+                (300.0, date(2021, 3, 1), "w"), (400.0, "?", "e"), (500.0, date(2021, 2, 1), None)]
+        for sales_list in self.lists:
+            for id, (amount, salesDate, code) in enumerate(rows, start=1):
+                sales_list.add(Sales(id, amount, salesDate, Regions().get(code) if code else None))
+
+    def test_find(self):
+        """Point lookups by date and region code, "" for no region"""
+        for sales_list in self.lists:
+            self.assertEqual([sales.id for sales in sales_list.find(date(2021, 3, 1), "w")], [1, 3])
+            self.assertEqual([sales.id for sales in sales_list.find(date(2021, 2, 1), "")], [5])
+            self.assertEqual(sales_list.find(date(2021, 3, 1), "e").count, 0)
+
+    def test_find_range(self):
+        """Range lookups come back in date order and skip bad dates"""
+        for sales_list in self.lists:
+            self.assertEqual([sales.id for sales in sales_list.find_range()], [2, 5, 1, 3])
+            self.assertEqual([sales.id for sales in sales_list.find_range(date(2021, 1, 6), date(2021, 3, 1))],
+                             [5, 1, 3])
+            self.assertEqual([sales.id for sales in sales_list.find_range(end=date(2021, 2, 28), codes=["e"])], [2])
+
+    def test_add_and_concat_keep_index(self):
+        """Sales added or concatenated after the index is built are found"""
+        for sales_list in self.lists:
+            sales_list.find_range()     # build the index
+            sales_list.add(Sales(6, 600.0, date(2020, 12, 31), Regions().get("w")))
+            other = ColumnarSalesList()
+            other.add(Sales(7, 700.0, date(2021, 3, 1), Regions().get("w")))
+            sales_list.concat(other)
+            self.assertEqual([sales.id for sales in sales_list.find(date(2021, 3, 1), "w")], [1, 3, 7])
+            self.assertEqual(sales_list.find_range()[0].id, 6)
+
+    def test_concat_out_of_order(self):
+        """Older sales concatenated into an indexed list are indexed in one go, in date order"""
+        for sales_list in self.lists:
+            sales_list.find_range()     # build the index
+            other = SalesList()
+            for id, salesDate in ((6, date(2021, 2, 1)), (7, "?"), (8, date(2020, 6, 1)), (9, date(2021, 1, 5))):
+                other.add(Sales(id, 1.0, salesDate, Regions().get("e")))
+            with patch.object(SalesIndex, "add", side_effect=AssertionError("one row at a time")):
+                sales_list.concat(other)
+            self.assertEqual([sales.id for sales in sales_list.find_range()], [8, 2, 9, 5, 6, 1, 3])
+            self.assertEqual([sales.id for sales in sales_list.find(date(2021, 1, 5), "e")], [2, 9])
+
+    def test_find_page(self):
+        """Pages continue after the (date, ID) key of the previous one, within a date too"""
+        for sales_list in self.lists:
+            self.assertEqual([sales.id for sales in sales_list.find_page(page_size=3)], [2, 5, 1])
+            self.assertEqual([sales.id for sales in sales_list.find_page(("2021-03-01", 1), 3)], [3])
+            self.assertEqual([sales.id for sales in sales_list.find_page(("2021-01-05", 2), 3, codes=["w"])],
+                             [1, 3])
+            self.assertEqual(sales_list.find_page(("2021-03-01", 3), 3), [])
+
+    def test_position_of(self):
+        """Ids are found at position + 1 or else by a search"""
+        for sales_list in self.lists:
+            sales_list.add(Sales(100, 1.0, date(2021, 1, 1), None))
+            self.assertEqual([sales_list.position_of(id) for id in (1, 5, 100, 6, 0)], [0, 4, 5, None, None])
+
+    def test_changed_date_invalidates_index(self):
+        """Editing a date or region through a row is seen by the next lookup"""
+        for sales_list in self.lists:
+            self.assertEqual(sales_list.find(date(2021, 1, 5), "e").count, 1)
+            sales_list[1]["salesDate"] = date(2021, 1, 6)
+            if not isinstance(sales_list, ColumnarSalesList):
+                sales_list.invalidate_index()
+            self.assertEqual(sales_list.find(date(2021, 1, 5), "e").count, 0)
+            self.assertEqual([sales.id for sales in sales_list.find(date(2021, 1, 6), "e")], [2])
+
+
+class TestSalesSummary(unittest.TestCase):
+
+    setUp = TestColumnarSalesList.setUp
+
+    def test_incremental(self):
+        """The summary is kept up to date by add and concat in both layouts"""
+        for sales_list in (self.plain, self.columnar):
+            summary = sales_list.summary
+            self.assertEqual(summary.groups(), [("", 2021, 3, 8934.0, 1), ("w", 2020, 4, 12493.0, 1)])
+            self.assertEqual(summary.bad_count, 2)
+            sales_list.add(Sales(5, 7.0, date(2020, 11, 1), Regions().get("w")))
+            other = ColumnarSalesList()
+            other.add(Sales(6, 3.0, date(2021, 1, 5), Regions().get("e")))
+            sales_list.concat(other)
+            self.assertIs(sales_list.summary, summary)
+            self.assertEqual(summary.groups(), [("", 2021, 3, 8934.0, 1), ("e", 2021, 1, 3.0, 1),
+                                                ("w", 2020, 4, 12500.0, 2)])
+            self.assertEqual(summary.totals_by("year"), {(2020,): [12500.0, 2], (2021,): [8937.0, 2]})
+
+
+class TestSalesRecord(unittest.TestCase):
+
+    def test_slots(self):
+        """Fields are slots: no per-instance dict, same properties and item assignment"""
+        sales = Sales(0, "?", date(2021, 1, 2), Regions().get("w"))
+        self.assertFalse(hasattr(sales, "__dict__"))
+        sales["ID"] = 7
+        sales.id += 1
+        sales["amount"] = 5.5
+        self.assertEqual((sales.id, sales.amount, sales.salesDate, sales.region.code), (8, 5.5, date(2021, 1, 2), "w"))
+        self.assertFalse(sales.has_bad_data)
+        sales["salesDate"] = "?"
+        self.assertTrue(sales.has_bad_date and sales.has_bad_data)
+        with self.assertRaises(KeyError):
+            sales["name"] = "x"
+
+
+class TestDataTypes(unittest.TestCase):
+
+    def test_parse_date(self):
+        """The fast date parser accepts and rejects what strptime does"""
+        self.assertEqual(Sales.parse_date("2021-09-15"), date(2021, 9, 15))
+        self.assertEqual(Sales.parse_date("2021-7-15"), date(2021, 7, 15))
+        for text in ("20021-8-15", "2021-02-29", "2021-13-01", "2021-+1-05", "2021-01-\u0662\u0662", ""):
+            self.assertEqual(Sales.parse_date(text), "?")
+
+    def test_correct_data_types(self):
+        """Bad amounts and dates are still marked with '?'"""
+        row = ["8-934", "2021-9-15"]
+        Sales.correct_data_types(row)
+        self.assertEqual(row, ["?", date(2021, 9, 15)])
+        amounts, dates = Sales.correct_data_columns(["13761", "8-934"], ["2021-7-15", "20021-8-15"])
+        self.assertEqual(amounts, [13761.0, "?"])
+        self.assertEqual(dates, [date(2021, 7, 15), "?"])
+
+
+class TestRegions(unittest.TestCase):
+
+    def setUp(self):
+        """Remember the shared registry so each test can change it"""
+        self.saved_regions = list(Regions())
+
+    def tearDown(self):
+        """Put the shared registry back"""
+        Regions().set_VALID_REGION(self.saved_regions)
+        Regions.SQLITE_DB, Regions._loaded_from_db = None, False
+
+    def test_shared_registry(self):
+        """Every Regions() sees the same, interned Region objects"""
+        self.assertIs(Regions().get("w"), Regions().get("w"))
+        Regions().add_region(Region("n", "North"))
+        self.assertEqual(Regions().get("n").name, "North")
+        Regions().set_VALID_REGION([Region(f"r{i}", f"Region {i}") for i in range(500)])
+        self.assertEqual(len(Regions()), 500)
+        self.assertEqual(Regions().get("r499").name, "Region 499")
+        self.assertIsNone(Regions().get("w"))
+
+    def test_load_from_sqlite(self):
+        """Regions come from the Region table once SQLITE_DB is set"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dbpath = Path(tmpdir) / "sales_db.sqlite"
+            with closing(sqlite3.connect(dbpath)) as connection:
+                connection.execute("CREATE TABLE Region (code TEXT PRIMARY KEY, name TEXT)")
+                connection.execute("INSERT INTO Region VALUES ('n', 'North'), ('s', 'South')")
+                connection.commit()
+            Regions.SQLITE_DB = dbpath
+            self.assertEqual([region.code for region in Regions()], ["n", "s"])
+            self.assertEqual(Regions().get("s").name, "South")
+
+
+class TestSalesIdAllocator(unittest.TestCase):
+
+    def test_concurrent_reserve(self):
+        """Blocks reserved from many threads are contiguous and never overlap"""
+        allocator = SalesIdAllocator()
+        blocks = []
+        threads = [threading.Thread(target=lambda: blocks.extend(allocator.reserve(100) for _ in range(50)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ids = sorted(id for block in blocks for id in block)
+        self.assertEqual(ids, list(range(1, 40_001)))
+        self.assertEqual(allocator.next_id, 40_001)
+
+    def test_advance_to_sqlite(self):
+        """The next id follows the Sales table of a database and never goes back"""
+        allocator = SalesIdAllocator()
+        self.assertEqual(allocator.reserve(10), range(1, 11))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dbpath = Path(tmpdir) / "sales.sqlite"
+            with closing(sqlite3.connect(dbpath)) as connection:
+                connection.execute("CREATE TABLE Sales (ID INTEGER PRIMARY KEY AUTOINCREMENT, amount REAL)")
+                connection.execute("INSERT INTO Sales (ID, amount) VALUES (41, 1.0)")
+                connection.commit()
+            allocator.advance_to_sqlite(dbpath)
+        self.assertEqual(allocator.reserve(2), range(42, 44))
+        allocator.advance_to(5)     # never goes back
+        self.assertEqual(allocator.next_id, 44)
+
+    def test_sales_id_view(self):
+        """SALES_ID still reads and sets the next id"""
+        saved = DataFileAccess.SALES_ID["Sales"]
+        try:
+            DataFileAccess.SALES_ID["Sales"] = 500
+            self.assertEqual(DataFileAccess.ID_ALLOCATOR.reserve(3), range(500, 503))
+            self.assertEqual(dict(DataFileAccess.SALES_ID), {"Sales": 503})
+        finally:
+            DataFileAccess.SALES_ID["Sales"] = saved
+
+
+class AllSalesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Point DataFileAccess at a temporary folder with a small all_sales.csv"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.saved_filepath, self.saved_id = DataFileAccess.FILEPATH, dict(DataFileAccess.SALES_ID)
+        DataFileAccess.FILEPATH = Path(self.tmpdir.name)
+        DataFileAccess.SALES_ID["Sales"] = 1
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "w", newline='') as f:
+            f.write("12493.0,2020-12-22,w\n"
+                    "13761.0,2021-09-15,e\n"
+                    "\n"
+                    "9710.0,2021-05-15,e\n"
+                    "8934.0,2021-08-08,c\n"
+                    "18340.0,2020-12-22,c\n")
+        with open(DataFileAccess.FILEPATH / "sales_q4_2021_w.csv", "w", newline='') as f:
+            f.write("13761,2021-10-15\n9710,2021-11-15\n8934,2021-12-15\n")
+
+    def tearDown(self):
+        """Restore the class level settings"""
+        DataFileAccess.FILEPATH = self.saved_filepath
+        DataFileAccess.SALES_ID.update(self.saved_id)
+        self.tmpdir.cleanup()
+
+
+class TestStreamingImport(AllSalesTestCase):
+
+    def test_batches(self):
+        """Batches hold at most chunk_size sales and skip empty lines"""
+        batches = list(DataFileAccess(lazy=True).iter_sales_batches(chunk_size=2))
+        self.assertEqual([batch.count for batch in batches], [2, 1, 2])
+        batches = list(SalesFile("sales_q4_2021_w.csv").iter_sales_batches(chunk_size=2))
+        self.assertEqual([batch.count for batch in batches], [2, 1])
+
+    def test_lazy(self):
+        """A lazy DataFileAccess parses the file on first use only"""
+        datafileaccess = DataFileAccess(lazy=True)
+        self.assertFalse(datafileaccess.is_loaded)
+        self.assertEqual(DataFileAccess.SALES_ID["Sales"], 1)
+        self.assertEqual(datafileaccess._all_sales_list.count, 5)
+        self.assertTrue(datafileaccess.is_loaded)
+        self.assertEqual([sales.id for sales in datafileaccess._all_sales_list], [1, 2, 3, 4, 5])
+
+    def test_stable_ids(self):
+        """Sales keep their ids when they are saved and loaded again"""
+        datafileaccess = DataFileAccess()
+        datafileaccess.add_sales(Sales(0, 100.0, date(2022, 1, 2), Regions().get("m")))
+        other = SalesList()
+        other.add(Sales(0, 200.0, date(2022, 1, 3), Regions().get("e")))
+        datafileaccess.concat_saleslist(other)
+        saved = [(sales.id, sales.amount) for sales in datafileaccess._all_sales_list]
+        self.assertEqual(saved[5:], [(6, 100.0), (7, 200.0)])
+        datafileaccess.save_all_sales()
+        for _ in range(2):    # the second load comes from the snapshot
+            DataFileAccess.SALES_ID["Sales"] = 1    # a new process
+            self.assertEqual([(sales.id, sales.amount) for sales in DataFileAccess()._all_sales_list], saved)
+
+
+class TestSaveAllSales(AllSalesTestCase):
+
+    def read_all_sales(self) -> str:
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", newline='') as f:
+            return f.read()
+
+    def test_append_only(self):
+        """Only the added sales are appended to the file"""
+        before = self.read_all_sales()
+        datafileaccess = DataFileAccess()
+        datafileaccess.add_sales(Sales(0, 100.0, date(2022, 1, 2), Regions().get("m")))
+        datafileaccess.save_all_sales()
+        self.assertEqual(self.read_all_sales(), before + "100.0,2022-01-02,m\r\n")
+        datafileaccess.save_all_sales()     # nothing new
+        self.assertEqual(self.read_all_sales(), before + "100.0,2022-01-02,m\r\n")
+
+    def test_compaction(self):
+        """Modified sales rewrite the whole file through a temporary file, other rows as they were"""
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "a") as f:
+            f.write("2.0,2021-01-02,x\n3.0,2021-02-30,e\n")
+        datafileaccess = DataFileAccess()
+        datafileaccess._all_sales_list[0]["amount"] = 1.5
+        datafileaccess.mark_modified([0])
+        datafileaccess.save_all_sales()
+        lines = self.read_all_sales().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(lines[0], "1.5,2020-12-22,w")
+        self.assertEqual(lines[1], "13761.0,2021-09-15,e")
+        self.assertEqual(lines[5:], ["2.0,2021-01-02,x", "3.0,2021-02-30,e"])     # bad rows kept as typed
+        self.assertEqual(sorted(path.name for path in DataFileAccess.FILEPATH.iterdir()),
+                         ["all_sales.csv", "all_sales.snapshot", "sales_q4_2021_w.csv"])
+
+    def test_outside_change(self):
+        """A file changed by someone else is appended to, and the change is kept"""
+        datafileaccess = DataFileAccess()
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "a") as f:
+            f.write("1.0,2022-02-02,e\n")
+        datafileaccess.add_sales(Sales(0, 100.0, date(2022, 1, 2), Regions().get("m")))
+        datafileaccess.save_all_sales()
+        self.assertEqual(self.read_all_sales().splitlines()[-2:], ["1.0,2022-02-02,e", "100.0,2022-01-02,m"])
+
+    def test_outside_change_not_overwritten(self):
+        """Modified sales are not saved over a file changed by someone else"""
+        datafileaccess = DataFileAccess()
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "a") as f:
+            f.write("1.0,2022-02-02,e\n")
+        before = self.read_all_sales()
+        datafileaccess._all_sales_list[0]["amount"] = 1.5
+        datafileaccess.mark_modified([0])
+        with patch("builtins.print") as printed:
+            datafileaccess.save_all_sales()
+        self.assertIn("changed by another program", printed.call_args.args[0])
+        self.assertEqual(self.read_all_sales(), before)
+
+
+class TestSalesSnapshot(AllSalesTestCase):
+
+    def test_load_from_snapshot(self):
+        """The next start loads the same sales, with the same ids, from the snapshot"""
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "a") as f:
+            f.write("?,2021-01-01,w\n5.0,2021-02-30,x\n")
+        first = DataFileAccess(columnar=True)
+        self.assertTrue((DataFileAccess.FILEPATH / "all_sales.snapshot").exists())
+        with patch.object(DataFileAccess, "iter_sales_batches", side_effect=AssertionError("csv parsed")):
+            for columnar in (True, False):
+                second = DataFileAccess(columnar=columnar)
+                self.assertEqual([(sales.id, sales.amount, sales.salesDate, sales.region)
+                                  for sales in second._all_sales_list],
+                                 [(sales.id, sales.amount, sales.salesDate, sales.region)
+                                  for sales in first._all_sales_list])
+                self.assertEqual(DataFileAccess.SALES_ID["Sales"], 8)
+        self.assertIs(second._all_sales_list[0].region, Regions().get("w"))
+        self.assertTrue(second._all_sales_list[5].has_bad_amount)
+        self.assertTrue(second._all_sales_list[6].has_bad_date)
+
+    def test_stale_snapshot(self):
+        """An edited csv is parsed again, and that load refreshes the snapshot"""
+        datafileaccess = DataFileAccess()
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "a") as f:
+            f.write("1.0,2022-02-02,e\n")
+        self.assertEqual(DataFileAccess()._all_sales_list.count, 6)
+        datafileaccess.add_sales(Sales(0, 100.0, date(2022, 1, 2), Regions().get("m")))
+        datafileaccess.save_all_sales()     # appended to the edited file
+        self.assertEqual(DataFileAccess()._all_sales_list.count, 7)
+        with patch.object(DataFileAccess, "iter_sales_batches", side_effect=AssertionError("csv parsed")):
+            self.assertEqual(DataFileAccess()._all_sales_list.count, 7)
+
+    def test_append_to_snapshot(self):
+        """An append-only save adds the new rows to the snapshot, which the next start loads"""
+        datafileaccess = DataFileAccess()
+        for columnar in (False, True):      # a SalesList, then the ColumnarSalesList loaded from it
+            datafileaccess.add_sales(Sales(0, 100.0, date(2022, 1, 2), Regions().get("m")))
+            datafileaccess.add_sales(Sales(0, 5.0, date(2022, 1, 3), Region("x", "Extra")))
+            datafileaccess.add_sales(Sales(0, "?", date(2022, 1, 4), None))
+            with patch.object(SalesSnapshot, "save", side_effect=AssertionError("whole snapshot written")):
+                datafileaccess.save_all_sales()
+            with patch.object(DataFileAccess, "iter_sales_batches", side_effect=AssertionError("csv parsed")):
+                datafileaccess = DataFileAccess(columnar=columnar)
+            count = datafileaccess._all_sales_list.count
+            self.assertEqual([(sales.id, sales.amount, sales.salesDate, sales.region)
+                              for sales in datafileaccess._all_sales_list[-3:]],
+                             [(count - 2, 100.0, date(2022, 1, 2), Regions().get("m")),
+                              (count - 1, 5.0, date(2022, 1, 3), Region("x", "Extra")),
+                              (count, "?", date(2022, 1, 4), None)])
+        self.assertEqual(count, 11)
+
+    def test_half_appended_snapshot(self):
+        """A snapshot whose header was not restamped after an append is not used"""
+        snapshot = DataFileAccess.FILEPATH / "all_sales.snapshot"
+        datafileaccess = DataFileAccess()
+        header = snapshot.read_bytes()[:SalesSnapshot.HEADER.size]
+        datafileaccess.add_sales(Sales(0, 100.0, date(2022, 1, 2), Regions().get("m")))
+        datafileaccess.save_all_sales()
+        with open(snapshot, "r+b") as f:     # as if it stopped between the block and the header
+            f.write(header)
+        self.assertEqual(DataFileAccess()._all_sales_list.count, 6)     # the csv, parsed again
+        with patch.object(DataFileAccess, "iter_sales_batches", side_effect=AssertionError("csv parsed")):
+            self.assertEqual(DataFileAccess()._all_sales_list.count, 6)
+
+
+class TestMappedReader(AllSalesTestCase):
+
+    def test_same_as_csv_reader(self):
+        """The mmap reader gives the same sales as csv.reader, bad values marked "?" """
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "ab") as f:
+            f.write(b"?,2021-01-01,w\r\n5.0,2021-02-30,x\r\n\r\n7.5,2021-7-4,m")
+        rows = [[(sales.amount, sales.salesDate, sales.region)    # parsed, not from the snapshot
+                 for batch in DataFileAccess(lazy=True, mapped=mapped).iter_sales_batches(chunk_size=3)
+                 for sales in batch] for mapped in (False, True)]
+        self.assertEqual(rows[0], rows[1])
+        with patch.object(MappedCsvReader, "BLOCK_SIZE", 16):   # many blocks, some with mixed rows
+            self.assertEqual([(sales.amount, sales.salesDate, sales.region)
+                              for batch in DataFileAccess(lazy=True, mapped=True).iter_sales_batches(chunk_size=4)
+                              for sales in batch], rows[0])
+        self.assertEqual(rows[1][5][0], "?")
+        self.assertEqual(rows[1][6][1], "?")
+        self.assertEqual(rows[1][7][1:], (date(2021, 7, 4), Regions().get("m")))
+        sales_file = [SalesFile("sales_q4_2021_w.csv", mapped) for mapped in (False, True)]
+        self.assertEqual(*[[(sales.amount, sales.salesDate, sales.region) for sales in file.import_sales()]
+                           for file in sales_file])
+
+    def test_short_rows(self):
+        """Rows without a date or region are flagged instead of failing"""
+        with open(DataFileAccess.FILEPATH / "all_sales.csv", "wb") as f:
+            f.write(b"12.5\n3.0,2021-01-02\n")
+        sales_list = DataFileAccess(mapped=True)._all_sales_list
+        self.assertEqual([(sales.amount, sales.salesDate, sales.region) for sales in sales_list],
+                         [(12.5, "?", None), (3.0, date(2021, 1, 2), None)])
+
+
+class TestParallelImport(AllSalesTestCase):
+
+    def test_import_sales_files(self):
+        """Files are discovered by name and parsed in a pool, results keep the file order"""
+        with open(DataFileAccess.FILEPATH / "sales_q1_2022_c.csv", "w") as f:
+            f.write("1,2022-01-01\n2,2022-1-2\n")
+        with open(DataFileAccess.FILEPATH / "sales_q3_2021_e.csv", "w") as f:
+            f.write("8-934,2021-9-15\n")
+        (DataFileAccess.FILEPATH / "region1.csv").touch()
+        filenames = SalesFile.discover()
+        self.assertEqual(filenames, ["sales_q1_2022_c.csv", "sales_q3_2021_e.csv", "sales_q4_2021_w.csv"])
+        results = SalesFile.import_sales_files(filenames + ["sales_q2_2022_w.csv"], max_workers=2)
+        self.assertEqual([result[0] for result in results], filenames + ["sales_q2_2022_w.csv"])
+        self.assertEqual([sales.salesDate for sales in results[0][1]], [date(2022, 1, 1), date(2022, 1, 2)])
+        self.assertIs(results[0][1][0].region, Regions().get("c"))
+        self.assertTrue(results[1][1][0].has_bad_amount)
+        self.assertEqual(results[2][1].count, 3)
+        self.assertIsInstance(results[3][3], FileNotFoundError)
+
+
+class TestImportedFile(AllSalesTestCase):
+
+    def test_registry(self):
+        """Added files are seen by every ImportedFile, outside changes are picked up"""
+        filepath_name = DataFileAccess.FILEPATH / "sales_q4_2021_w.csv"
+        self.assertFalse(ImportedFile().already_imported(filepath_name))
+        ImportedFile().add_imported_file(filepath_name)
+        self.assertTrue(ImportedFile().already_imported(filepath_name))
+        with open(DataFileAccess.FILEPATH / "imported_files.txt", "a") as f:
+            f.write("sales_q1_2022_e.csv\n")
+        self.assertTrue(ImportedFile().already_imported("sales_q1_2022_e.csv"))
+        with open(DataFileAccess.FILEPATH / "imported_files.txt") as f:
+            self.assertEqual(f.read(), f"{filepath_name}\nsales_q1_2022_e.csv\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
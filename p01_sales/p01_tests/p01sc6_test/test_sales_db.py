@@ -0,0 +1,286 @@
+# Unit tests for the SQLite data access of p01sc06_OOPDBGUI3tier.
+import unittest
+import sys
+import shutil
+import tempfile
+import threading
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'p01sc06_OOPDBGUI3tier'))
+import p01_1da_sales_db as db
+import p01_1da_sales as da
+
+
+class SQLiteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Work on a copy of sales_db.sqlite in a temporary folder"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.saved_dbpath = db.SQLiteDBAccess.SQLITEDBPATH
+        shutil.copy(self.saved_dbpath / 'sales_db.sqlite', self.tmpdir.name)
+        db.SQLiteDBAccess.SQLITEDBPATH = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        """Restore the db folder"""
+        db.SQLiteDBAccess.SQLITEDBPATH = self.saved_dbpath
+        self.tmpdir.cleanup()
+
+
+class TestConnectionPool(SQLiteTestCase):
+
+    def test_per_thread_connection(self):
+        """A pooled access keeps one connection per thread until closed"""
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            with sqlite_dbaccess._connection() as first, sqlite_dbaccess._connection() as second:
+                self.assertIs(first, second)
+            other = []
+            thread = threading.Thread(target=lambda: other.append(sqlite_dbaccess.retrieve_regions()))
+            thread.start()
+            thread.join()
+            self.assertEqual(len(other[0]), 4)
+            self.assertEqual(len(sqlite_dbaccess._pool), 2)
+        self.assertEqual(sqlite_dbaccess._pool, [])
+
+    def test_pragmas(self):
+        """Pooled connections get the configured pragmas"""
+        with db.SQLiteDBAccess(pooled=True, pragmas={"journal_mode": "WAL", "cache_size": -1234}) \
+                as sqlite_dbaccess:
+            with sqlite_dbaccess._connection() as connection:
+                self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+                self.assertEqual(connection.execute("PRAGMA cache_size").fetchone()[0], -1234)
+
+    def test_synchronous_follows_journal_mode(self):
+        """synchronous=NORMAL only on a db in WAL mode, FULL with a rollback journal"""
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            with sqlite_dbaccess._connection() as connection:
+                self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+                self.assertEqual(connection.execute("PRAGMA synchronous").fetchone()[0], 2)
+            with patch("builtins.print"):
+                sqlite_dbaccess.migrate()
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            with sqlite_dbaccess._connection() as connection:
+                self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+                self.assertEqual(connection.execute("PRAGMA synchronous").fetchone()[0], 1)
+
+    def test_same_results(self):
+        """Pooled and per-call modes read and write the same data"""
+        per_call = db.SQLiteDBAccess()
+        with db.SQLiteDBAccess(pooled=True) as pooled:
+            sales = pooled.retrieve_sales_by_date_region("2021-12-22", "w")
+            self.assertEqual(sales.amount, 23456.0)
+            sales["amount"] = 100.0
+            pooled.update_sales(sales)
+            self.assertEqual(per_call.retrieve_sales_by_date_region("2021-12-22", "w").amount, 100.0)
+
+
+class TestMigration(SQLiteTestCase):
+
+    def test_reads_do_not_migrate(self):
+        """Queries leave the schema alone until migrate() is called"""
+        sqlite_dbaccess = db.SQLiteDBAccess(pooled=True)
+        self.assertEqual(len(sqlite_dbaccess.retrieve_regions()), 4)
+        self.assertIsNotNone(sqlite_dbaccess.retrieve_sales_by_date_region("2021-12-22", "w"))
+        self.assertEqual(sqlite_dbaccess.pending_migrations(), sorted(db.SQLiteDBAccess.MIGRATIONS))
+        with sqlite_dbaccess._connection() as connection:
+            self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        with patch("builtins.print"):
+            self.assertFalse(sqlite_dbaccess.check_schema())
+            self.assertTrue(sqlite_dbaccess.check_schema(migrate=True))
+        self.assertEqual(sqlite_dbaccess.pending_migrations(), [])
+        sqlite_dbaccess.close()
+
+    def test_indexes(self):
+        """migrate() creates the indexes and the hot queries use them"""
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        sqlite_dbaccess.migrate()
+        with sqlite_dbaccess._connection() as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0],
+                             max(db.SQLiteDBAccess.MIGRATIONS))
+            indexes = {row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Sales'")}
+        self.assertIn("idx_Sales_salesDate_region", indexes)
+        self.assertIn("idx_Sales_region_salesDate", indexes)
+        self.assertIn("idx_Sales_salesDate", indexes)
+        self.assertEqual(sqlite_dbaccess.check_query_plans(), [])
+
+    def test_scan_warning(self):
+        """A hot query without an index is reported"""
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        sqlite_dbaccess.migrate()
+        with sqlite_dbaccess._connection() as connection:
+            connection.execute("DROP INDEX idx_Sales_salesDate_region")
+            connection.execute("DROP INDEX idx_Sales_region_salesDate")
+            connection.execute("DROP INDEX idx_Sales_salesDate")
+        self.assertEqual(sqlite_dbaccess.check_query_plans(), list(db.SQLiteDBAccess.HOT_QUERIES))
+
+
+class TestSharedModel(SQLiteTestCase):
+
+    def test_rows_are_shared_sales(self):
+        """Rows come back as the Sales and Region objects of p01_1da_sales"""
+        self.assertIs(db.Sales, da.Sales)
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        sales = sqlite_dbaccess.retrieve_sales_by_date_region(date(2021, 12, 22), "w")
+        self.assertIsInstance(sales, da.Sales)
+        self.assertEqual((sales.amount, sales.salesDate), (23456.0, date(2021, 12, 22)))
+        self.assertIs(sales.region, da.Regions().get("w"))
+        self.assertFalse(sales.has_bad_data)
+        self.assertIsInstance(sqlite_dbaccess.retrieve_regions()[0], da.Region)
+
+
+class TestRangeQueries(SQLiteTestCase):
+
+    def test_iter_sales(self):
+        """Filters combine and rows stream in (salesDate, ID) order"""
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        sales = list(sqlite_dbaccess.iter_sales(fetch_size=2))
+        self.assertEqual([s.id for s in sales], [3, 4, 5, 2, 1])
+        sales = sqlite_dbaccess.iter_sales(start=date(2020, 12, 1), end="2021-09-09", regions=["w", "e"],
+                                           min_amount=1_000)
+        self.assertEqual([(s.id, s.amount, s.salesDate, s.region) for s in sales],
+                         [(2, 1265.0, date(2021, 9, 9), da.Regions().get("e"))])
+        self.assertEqual(list(sqlite_dbaccess.iter_sales(regions=[])), [])
+
+    def test_pages(self):
+        """Keyset pages follow each other until the last one"""
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        page, after = sqlite_dbaccess.retrieve_sales_page(page_size=2)
+        self.assertEqual(([s.id for s in page], after), ([3, 4], ("2020-12-12", 4)))
+        page, after = sqlite_dbaccess.retrieve_sales_page(after, page_size=2)
+        self.assertEqual([s.id for s in page], [5, 2])
+        page, after = sqlite_dbaccess.retrieve_sales_page(after, page_size=2)
+        self.assertEqual(([s.id for s in page], after), ([1], None))
+        page, after = sqlite_dbaccess.retrieve_sales_page(page_size=1, regions=["m"])
+        self.assertEqual(([s.id for s in page], after), ([4], None))
+
+
+class TestBulkLoad(SQLiteTestCase):
+
+    def count(self, table: str) -> int:
+        with db.SQLiteDBAccess()._connection() as connection:
+            return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_load_saleslist(self):
+        """A SalesList is loaded in batches and its file recorded"""
+        sales_list = da.SalesList()
+        for day in range(1, 26):
+            sales_list.add(da.Sales(0, 100.0 + day, date(2022, 1, day), da.Regions().get("c")))
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        self.assertEqual(sqlite_dbaccess.bulk_load_sales(sales_list, "sales_q1_2022_c.csv", batch_size=10), 25)
+        self.assertEqual(self.count("Sales"), 30)
+        self.assertEqual(sqlite_dbaccess.retrieve_sales_by_date_region("2022-01-25", "c").amount, 125.0)
+        # the same file again is refused without adding rows
+        self.assertEqual(sqlite_dbaccess.bulk_load_sales(sales_list, "sales_q1_2022_c.csv"), 0)
+        self.assertEqual(self.count("Sales"), 30)
+
+    def test_load_csv_file(self):
+        """A csv file is loaded atomically, bad data rolls everything back"""
+        good = Path(self.tmpdir.name) / "sales_q4_2021_e.csv"
+        good.write_text("13761,2021-10-15\n9710,2021-11-15\n")
+        bad = Path(self.tmpdir.name) / "sales_q3_2021_e.csv"
+        bad.write_text("13761,2021-7-15\n8-934,2021-9-15\n")
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        self.assertEqual(sqlite_dbaccess.bulk_load_sales(good, batch_size=1), 2)
+        self.assertEqual(sqlite_dbaccess.bulk_load_sales(bad), 0)
+        self.assertEqual(self.count("Sales"), 7)
+        self.assertEqual(self.count("ImportedFiles"), 2)
+
+    def test_constraint_failure(self):
+        """A failing Sales row is reported as such, not as a file already imported"""
+        sales_list = da.SalesList()
+        sales_list.add(da.Sales(0, float("nan"), date(2022, 1, 1), da.Regions().get("c")))   # stored as NULL
+        with patch("builtins.print") as printed:
+            self.assertEqual(db.SQLiteDBAccess().bulk_load_sales(sales_list, "sales_q1_2022_c.csv"), 0)
+        self.assertIn("NOT NULL", str(printed.call_args))
+        self.assertNotIn("already been imported", str(printed.call_args))
+        self.assertEqual((self.count("Sales"), self.count("ImportedFiles")), (5, 1))
+
+
+class TestRegionCache(SQLiteTestCase):
+
+    def test_cached_until_invalidated(self):
+        """The Region table is read once, then again only after invalidate_regions"""
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            with patch.object(sqlite_dbaccess, "retrieve_regions",
+                              wraps=sqlite_dbaccess.retrieve_regions) as retrieve_regions:
+                codes = [region.code for region in sqlite_dbaccess.cached_regions()]
+                self.assertEqual(codes, ["w", "m", "c", "e"])
+                sqlite_dbaccess.cached_regions()
+                self.assertEqual(retrieve_regions.call_count, 1)
+                sqlite_dbaccess.invalidate_regions()
+                sqlite_dbaccess.cached_regions()
+                self.assertEqual(retrieve_regions.call_count, 2)
+
+    def test_ttl(self):
+        """An expired copy is read again"""
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        with patch.object(db.SQLiteDBAccess, "REGION_CACHE_TTL", 0.0), \
+                patch.object(sqlite_dbaccess, "retrieve_regions",
+                             wraps=sqlite_dbaccess.retrieve_regions) as retrieve_regions:
+            sqlite_dbaccess.cached_regions()
+            sqlite_dbaccess.cached_regions()
+            self.assertEqual(retrieve_regions.call_count, 2)
+
+
+class TestUpdateQueue(SQLiteTestCase):
+
+    def amounts(self) -> dict:
+        with db.SQLiteDBAccess()._connection() as connection:
+            return dict(connection.execute("SELECT ID, amount FROM Sales").fetchall())
+
+    def test_update_many(self):
+        """All updates go in one transaction, matched by id"""
+        sqlite_dbaccess = db.SQLiteDBAccess()
+        updates = [da.Sales(1, 1.0, date(2021, 12, 22), None), da.Sales(4, 4.0, date(2020, 12, 12), None),
+                   da.Sales(99, 9.0, date(2020, 1, 1), None)]
+        self.assertEqual(sqlite_dbaccess.update_many(updates), 2)
+        self.assertEqual(self.amounts(), {1: 1.0, 2: 1265.0, 3: 23757.0, 4: 4.0, 5: 393.0})
+        self.assertEqual(sqlite_dbaccess.retrieve_sales_by_date_region("2020-12-12", "m").salesDate,
+                         date(2020, 12, 12))
+
+    def test_queue(self):
+        """Edits wait in the queue, the latest per id wins, and flush writes them"""
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            update_queue = db.SalesUpdateQueue(sqlite_dbaccess)
+            update_queue.put(da.Sales(2, 2.0, date(2021, 9, 9), None))
+            update_queue.put(da.Sales(2, 22.0, date(2021, 9, 9), None))
+            update_queue.put(da.Sales(3, 3.0, date(2020, 11, 11), None))
+            self.assertEqual(update_queue.pending_count, 2)
+            self.assertEqual(update_queue.get(2).amount, 22.0)
+            self.assertEqual(self.amounts()[2], 1265.0)
+            self.assertEqual(update_queue.flush(), 2)
+            self.assertEqual(update_queue.pending_count, 0)
+            self.assertEqual(self.amounts()[2], 22.0)
+            self.assertEqual(update_queue.flush(), 0)
+
+    def test_failed_flush_keeps_edits(self):
+        """A rolled back flush leaves the edits pending"""
+        with db.SQLiteDBAccess(pooled=True) as sqlite_dbaccess:
+            update_queue = db.SalesUpdateQueue(sqlite_dbaccess)
+            update_queue.put(da.Sales(1, 1.0, date(2021, 12, 22), None))
+            update_queue.put(da.Sales(5, [], date(2021, 2, 2), None))    # cannot be bound
+            self.assertEqual(update_queue.flush(), 0)
+            self.assertEqual(update_queue.pending_count, 2)
+            self.assertEqual(self.amounts()[1], 23456.0)
+
+
+class TestSQLiteImportedFile(SQLiteTestCase):
+
+    def test_registry(self):
+        """Both modes read and write the ImportedFiles table"""
+        with db.SQLiteDBAccess(pooled=True) as pooled:
+            importedfile = db.SQLiteImportedFile(pooled)
+            self.assertTrue(importedfile.already_imported(Path("/any/folder/sales_q1_2021_w.csv")))
+            self.assertFalse(importedfile.already_imported("sales_q2_2021_w.csv"))
+            importedfile.add_imported_file("sales_q2_2021_w.csv")
+            self.assertTrue(importedfile.already_imported("sales_q2_2021_w.csv"))
+            per_call = db.SQLiteImportedFile(db.SQLiteDBAccess())
+            self.assertTrue(per_call.already_imported("sales_q2_2021_w.csv"))
+            per_call.add_imported_file("sales_q3_2021_w.csv")     # another connection
+            self.assertTrue(importedfile.already_imported("sales_q3_2021_w.csv"))
+
+
+if __name__ == "__main__":
+    unittest.main()
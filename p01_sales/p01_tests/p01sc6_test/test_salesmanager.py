@@ -0,0 +1,81 @@
+# Unit tests for the sales table of p01sc06_OOPDBGUI3tier (needs the en_US locale).
+import unittest
+import sys
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import Sales, SalesList, ColumnarSalesList, Regions
+from p01_2bl_salesmanager import SalesReport, SalesManager
+
+HEADER = ("     Date           Quarter        Region                  Amount\n"
+          "-----------------------------------------------------------------\n")
+ROWS = [f"{'1.':5}{'2021-01-05':15}{'1':15}{'West':15}{'$100.00':>15}\n",
+        f"{'2.*':5}{'?':15}{'0':15}{'East':15}{'$1,250.50':>15}\n",     # quarter 0: bad date
+        f"{'3.':5}{'2021-07-15':15}{'3':15}{'Central':15}{'$50.00':>15}\n",
+        f"{'4.*':5}{'2021-11-30':15}{'4':15}{'West':15}{'?':>15}\n"]
+
+
+def footer(total: str) -> str:
+    return ("-----------------------------------------------------------------\n"
+            f"TOTAL{total:>60}\n\n")
+
+
+class TestSalesReport(unittest.TestCase):
+
+    def setUp(self):
+        """The same four sales, two with bad data, in both list layouts"""
+        rows = [Sales(1, 100.0, date(2021, 1, 5), Regions().get("w")),
+                Sales(2, 1250.5, "?", Regions().get("e")),
+                Sales(3, 50.0, date(2021, 7, 15), Regions().get("c")),
+                Sales(4, "?", date(2021, 11, 30), Regions().get("w"))]
+        self.lists = [SalesList(), ColumnarSalesList()]
+        for sales_list in self.lists:
+            for sales in rows:
+                sales_list.add(sales)
+
+    def render(self, sales_list, limit=None, offset=0, page_size=0, more=None) -> tuple[str, bool]:
+        output = StringIO()
+        bad_data_flag = SalesReport(sales_list, limit, offset).render(output.write, page_size, more)
+        return output.getvalue(), bad_data_flag
+
+    def test_all_rows(self):
+        """Every row, bad ones flagged with *, and the total of the good amounts"""
+        for sales_list in self.lists:
+            with self.subTest(type(sales_list).__name__):
+                self.assertEqual(self.render(sales_list),
+                                 (HEADER + "".join(ROWS) + footer("$1,400.50"), True))
+
+    def test_limit_and_offset(self):
+        """Rows keep their numbers and the total covers only the rows shown"""
+        for sales_list in self.lists:
+            with self.subTest(type(sales_list).__name__):
+                self.assertEqual(self.render(sales_list, limit=1, offset=2),
+                                 (HEADER + ROWS[2] + footer("$50.00"), False))
+                # the last page is shorter than the limit
+                self.assertEqual(self.render(sales_list, limit=3, offset=3)[0], HEADER + ROWS[3] + footer("$0.00"))
+                self.assertEqual(SalesReport(sales_list, limit=5, offset=4).row_count, 0)
+                self.assertEqual(SalesReport(sales_list, offset=99).row_count, 0)
+
+    def test_pages(self):
+        """more() is asked between pages, not after the last one, and can stop the table"""
+        for sales_list in self.lists:
+            with self.subTest(type(sales_list).__name__):
+                asked = []
+                output, _ = self.render(sales_list, page_size=3, more=lambda: asked.append(1) or True)
+                self.assertEqual((output, len(asked)), (HEADER + "".join(ROWS) + footer("$1,400.50"), 1))
+                output, _ = self.render(sales_list, page_size=2, more=lambda: False)
+                self.assertEqual(output, HEADER + "".join(ROWS[:2]) + footer("$1,350.50"))
+
+    def test_view_sales_out_of_range(self):
+        """An offset past the end shows no table"""
+        with patch("builtins.print") as printed, patch("sys.stdout", new=StringIO()) as stdout:
+            self.assertFalse(SalesManager.view_sales(self.lists[1], limit=10, offset=4))
+        printed.assert_called_once_with("No sales to view.")
+        self.assertEqual(stdout.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
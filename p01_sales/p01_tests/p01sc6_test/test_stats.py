@@ -0,0 +1,73 @@
+# Unit tests for the hot-path timers of p01sc06_OOPDBGUI3tier.
+import unittest
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'p01sc06_OOPDBGUI3tier'))
+from p01_1da_sales import DataFileAccess, SalesSnapshot
+from p01_1da_stats import Stats
+
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        """Start from nothing recorded, stats on"""
+        self.saved = Stats.enabled
+        Stats.reset()
+        Stats.enable()
+
+    def tearDown(self):
+        """Restore the switch and forget what the test recorded"""
+        Stats.enable(self.saved)
+        Stats.reset()
+
+    def test_off(self):
+        """While off nothing is recorded and the decorated function still runs"""
+        Stats.enable(False)
+        with Stats.timer("stage", 5) as timer:
+            timer.rows = 7
+        Stats.count("bad_amounts", 3)
+        self.assertEqual(Stats.timed("double")(lambda x: 2 * x)(21), 42)
+        self.assertEqual(Stats.report()["stages"], {})
+        self.assertEqual(Stats.report()["counters"], {})
+
+    def test_timer_and_timed(self):
+        """Calls, rows and percentiles per stage; rows may be set at the end of the block"""
+        for rows in (10, 20):
+            with Stats.timer("stage") as timer:
+                timer.rows = rows
+        Stats.record("stage", 0.5, 30)
+        double = Stats.timed("double", rows=len)(lambda items: items * 2)
+        self.assertEqual(double([1, 2]), [1, 2, 1, 2])
+        stages = Stats.report()["stages"]
+        self.assertEqual((stages["stage"]["calls"], stages["stage"]["rows"]), (3, 60))
+        self.assertEqual(stages["stage"]["max_ms"], 500.0)
+        self.assertEqual(stages["stage"]["p99_ms"], 500.0)
+        self.assertLess(stages["stage"]["p50_ms"], 500.0)
+        self.assertEqual((stages["double"]["calls"], stages["double"]["rows"]), (1, 4))
+
+    def test_load_and_dump(self):
+        """Loading all_sales.csv times each step and counts the bad rows; dump writes the report"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            saved_filepath = DataFileAccess.FILEPATH
+            DataFileAccess.FILEPATH = Path(tmpdir)
+            try:
+                (Path(tmpdir) / "all_sales.csv").write_text("100.0,2021-01-05,w\n8-934,2021-02-01,e\n"
+                                                            "250.0,20021-8-15,e\n300.0,2021-03-01,m\n")
+                SalesSnapshot(Path(tmpdir) / "all_sales.csv").remove()
+                DataFileAccess(columnar=True)
+                Stats.dump(Path(tmpdir) / "stats.json")
+                report = json.loads((Path(tmpdir) / "stats.json").read_text())
+            finally:
+                DataFileAccess.FILEPATH = saved_filepath
+        for stage in ("csv_read", "correct_data_columns", "load_all_sales"):
+            self.assertEqual(report["stages"][stage]["rows"], 4)
+        self.assertEqual(report["counters"], {"bad_amounts": 1, "bad_dates": 1})
+        Stats.reset()
+        self.assertEqual(Stats.report()["stages"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
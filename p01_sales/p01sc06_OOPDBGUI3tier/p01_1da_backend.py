@@ -0,0 +1,217 @@
+from datetime import date
+from pathlib import Path
+from typing import Protocol, Optional, List, Iterator, Iterable, Union, runtime_checkable
+
+from p01_1da_sales import (Sales, SalesList, ColumnarSalesList, SalesSummary, Region, Regions,
+                           DataFileAccess, SalesFile, ImportedFile)
+from p01_1da_sales_db import SQLiteDBAccess, SQLiteImportedFile
+
+
+@runtime_checkable
+class SalesBackend(Protocol):
+    '''Where the sales of SalesManager and SalesFrame are stored. CsvSalesBackend keeps them in
+    all_sales.csv, SQLiteSalesBackend in the Sales table of sales_db.sqlite; both take and hand out
+    the Sales and Region objects of p01_1da_sales, so the layers above work on either.'''
+    name: str
+
+    def bulk_load(self, sales_source: Union[Iterable[Sales], str, Path],
+                  filepath_name: Union[Path, str, None]=None) -> int:
+        '''Add the sales of an iterable or of a quarterly csv file, and record filepath_name
+        (default: the csv file) as imported. Nothing is added when the file was already imported
+        or a sales has bad data. Returns the number of sales added.'''
+        ...
+
+    def already_imported(self, filepath_name: Union[Path, str]) -> bool:
+        ...
+
+    def all_sales(self) -> SalesList:
+        '''Every sales, bad data included, for viewing.'''
+        ...
+
+    def iter_sales(self, start: Optional[date]=None, end: Optional[date]=None,
+                   regions: Optional[Iterable[str]]=None) -> Iterator[Sales]:
+        '''Stream the sales with a good date from start to end (inclusive) in the region codes,
+        ordered by salesDate and ID. None means no limit.'''
+        ...
+
+    def sales_page(self, after: Optional[tuple]=None, page_size: int=100, start: Optional[date]=None,
+                   end: Optional[date]=None, regions: Optional[Iterable[str]]=None) -> tuple[List[Sales], Optional[tuple]]:
+        '''One page of iter_sales after the (salesDate text, ID) key of the previous page, and the
+        key of the next page (None after the last page).'''
+        ...
+
+    def find(self, salesDate: date, code: str) -> List[Sales]:
+        '''The sales of one date and region code, ordered by ID.'''
+        ...
+
+    def write_updates(self, sales_iterable: Iterable[Sales]) -> int:
+        '''Set amount and salesDate of the stored sales with the same ids, all or nothing.
+        Returns the number of sales updated; raises sqlite3.Error or ValueError when nothing was written.'''
+        ...
+
+    def summary(self) -> SalesSummary:
+        ...
+
+    def regions(self) -> List[Region]:
+        ...
+
+    def save(self) -> None:
+        '''Make the changes durable.'''
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def _page_key(sales: Sales) -> tuple:
+    return f"{sales.salesDate:{Sales.DATE_FORMAT}}", sales.id
+
+
+class CsvSalesBackend:
+    '''SalesBackend on DataFileAccess: the sales are held in a SalesList, lookups use its
+    indexes and save() writes all_sales.csv. Imported files are listed in imported_files.txt.'''
+    name = "csv"
+
+    def __init__(self, datafileaccess: Optional[DataFileAccess]=None):
+        # loaded on first use, from the binary snapshot when all_sales.csv is unchanged
+        self._datafileaccess = datafileaccess or DataFileAccess(columnar=True, lazy=True)
+        self._importedfile = ImportedFile()
+
+    def bulk_load(self, sales_source, filepath_name=None) -> int:
+        if isinstance(sales_source, (str, Path)):
+            salesfile = SalesFile(str(sales_source))
+            filepath_name = filepath_name or salesfile._sales_filepath_name
+            sales_source = salesfile.iter_sales_batches()
+        else:
+            sales_source = [sales_source]
+        if filepath_name and self.already_imported(filepath_name):
+            print(f"File '{Path(filepath_name).name}' has already been imported.")
+            return 0
+        loaded_list = SalesList()
+        try:
+            for batch in sales_source:
+                loaded_list.concat(batch)
+        except OSError as e:
+            print(f"{type(e)}. Fail to load sales: {e}")
+            return 0
+        if any(sales.has_bad_data or sales.region is None for sales in loaded_list):
+            print("Fail to load sales: they contain bad data.")
+            return 0
+        self._datafileaccess.concat_saleslist(loaded_list)
+        if filepath_name:
+            self._importedfile.add_imported_file(filepath_name)
+        return loaded_list.count
+
+    def already_imported(self, filepath_name) -> bool:
+        return self._importedfile.already_imported(filepath_name)
+
+    def all_sales(self) -> SalesList:
+        return self._datafileaccess._all_sales_list
+
+    def iter_sales(self, start=None, end=None, regions=None) -> Iterator[Sales]:
+        yield from self._datafileaccess._all_sales_list.find_range(start, end, None if regions is None
+                                                                   else list(regions))
+
+    def sales_page(self, after=None, page_size=100, start=None, end=None, regions=None) -> tuple:
+        # one more than the page tells whether there is a next page
+        page = self._datafileaccess._all_sales_list.find_page(after, page_size + 1, start, end,
+                                                              None if regions is None else list(regions))
+        if len(page) <= page_size:
+            return page, None
+        del page[page_size:]
+        return page, _page_key(page[-1])
+
+    def find(self, salesDate: date, code: str) -> List[Sales]:
+        return list(self._datafileaccess._all_sales_list.find(salesDate, code))
+
+    def write_updates(self, sales_iterable) -> int:
+        all_sales_list = self._datafileaccess._all_sales_list
+        updates = []
+        for sales in sales_iterable:    # checked first so a bad edit changes nothing
+            if not isinstance(sales.amount, (int, float)) or not isinstance(sales.salesDate, date):
+                raise ValueError(f"{sales} contains bad data")
+            position = all_sales_list.position_of(sales.id)
+            if position is not None:
+                updates.append((position, sales))
+        for position, sales in updates:
+            stored = all_sales_list[position]
+            stored["amount"] = sales.amount
+            stored["salesDate"] = sales.salesDate
+        if updates:
+            self._datafileaccess.mark_modified(position for position, _ in updates)
+        return len(updates)
+
+    def summary(self) -> SalesSummary:
+        return self._datafileaccess.summary()
+
+    def regions(self) -> List[Region]:
+        return list(Regions())
+
+    def save(self) -> None:
+        self._datafileaccess.save_all_sales()
+
+    def close(self) -> None:
+        pass    # nothing is kept open; unsaved changes are left to save()
+
+
+class SQLiteSalesBackend:
+    '''SalesBackend on SQLiteDBAccess: every change is committed when it is made, so save()
+    has nothing left to do. Imported files are listed in the ImportedFiles table.'''
+    name = "sqlite"
+
+    def __init__(self, sqlite_dbaccess: Optional[SQLiteDBAccess]=None):
+        self._sqlite_dbaccess = sqlite_dbaccess or SQLiteDBAccess(pooled=True)   # one connection kept open
+        self._importedfile = SQLiteImportedFile(self._sqlite_dbaccess)
+        self._advance_sales_id()
+
+    def _advance_sales_id(self) -> None:
+        # SQLite numbers the sales it stores (AUTOINCREMENT); the ids DataFileAccess hands out
+        # from now on come after them, so the two never give one id to different sales
+        DataFileAccess.ID_ALLOCATOR.advance_to_sqlite(self._sqlite_dbaccess._dbpath_sqlite_sales_db)
+
+    def bulk_load(self, sales_source, filepath_name=None) -> int:
+        if filepath_name is None and isinstance(sales_source, (str, Path)):
+            filepath_name = sales_source
+        filename = Path(filepath_name).name if filepath_name else ""
+        count = self._sqlite_dbaccess.bulk_load_sales(sales_source, filename)
+        if count:
+            self._advance_sales_id()
+        if count and filename:  # already in ImportedFiles; this also puts it in the registry's cached set
+            self._importedfile.add_imported_file(filename)
+        return count
+
+    def already_imported(self, filepath_name) -> bool:
+        return self._importedfile.already_imported(filepath_name)
+
+    def all_sales(self) -> SalesList:
+        all_sales_list = ColumnarSalesList()
+        for sales in self._sqlite_dbaccess.iter_sales():
+            all_sales_list.add(sales)
+        return all_sales_list
+
+    def iter_sales(self, start=None, end=None, regions=None) -> Iterator[Sales]:
+        return self._sqlite_dbaccess.iter_sales(start, end, regions)
+
+    def sales_page(self, after=None, page_size=100, start=None, end=None, regions=None) -> tuple:
+        return self._sqlite_dbaccess.retrieve_sales_page(after, page_size, start, end, regions)
+
+    def find(self, salesDate: date, code: str) -> List[Sales]:
+        return list(self._sqlite_dbaccess.iter_sales(salesDate, salesDate, [code]))
+
+    def write_updates(self, sales_iterable) -> int:
+        return self._sqlite_dbaccess.write_updates(sales_iterable)
+
+    def summary(self) -> SalesSummary:
+        return self._sqlite_dbaccess.sales_summary()
+
+    def regions(self) -> List[Region]:
+        return self._sqlite_dbaccess.cached_regions()
+
+    def save(self) -> None:
+        pass    # already committed
+
+    def close(self) -> None:
+        self._sqlite_dbaccess.close()
+
+
+BACKENDS = {backend.name: backend for backend in (CsvSalesBackend, SQLiteSalesBackend)}
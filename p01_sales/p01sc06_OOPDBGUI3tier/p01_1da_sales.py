@@ -2,9 +2,25 @@
 
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Optional
+from typing import Optional, Iterator, Iterable, MutableMapping
+from itertools import islice, repeat
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 from pathlib import Path
+from array import array
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
 import csv
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+
+from p01_1da_stats import Stats
 
 @dataclass
 class Region:
@@ -13,84 +29,156 @@ class Region:
 
 
 class Regions:
+    # One registry shared by every Regions(): the list keeps the order for display,
+    # the dict gives O(1) lookup by code and always hands out the same Region object.
+    SQLITE_DB: Optional[Path] = None    # set to load the regions from the Region table of this db
+    _VALID_REGIONS = [Region("w", "West"), Region("m", "Mountain"),
+                      Region("c", "Central"), Region("e", "East")]
+    _REGION_BY_CODE = {region.code: region for region in _VALID_REGIONS}
+    _loaded_from_db = False
 
     def __init__(self):
-        self._VALID_REGIONS = [Region("w", "West"), Region("m", "Mountain"),
-                               Region("c", "Central"), Region("e", "East")]
+        if Regions.SQLITE_DB is not None and not Regions._loaded_from_db:
+            Regions._loaded_from_db = True     # only once, even if loading fails
+            Regions.load_from_sqlite(Regions.SQLITE_DB)
 
     def __iter__(self):
-        return iter(self._VALID_REGIONS)
+        return iter(Regions._VALID_REGIONS)
+
+    def __len__(self):
+        return len(Regions._VALID_REGIONS)
 
     def get(self, code: str) -> Optional[Region]:
-        for region_obj in self._VALID_REGIONS:
-            if code == region_obj.code:
-                return region_obj
-        return None  # Explicitly return None if the region is not found
+        return Regions._REGION_BY_CODE.get(code)  # None if the region is not found
 
     def set_VALID_REGION(self, regions_list: list):
-        self._VALID_REGIONS = regions_list
+        Regions._VALID_REGIONS = list(regions_list)
+        Regions._REGION_BY_CODE = {}
+        for region_obj in Regions._VALID_REGIONS:
+            Regions._REGION_BY_CODE.setdefault(region_obj.code, region_obj)  # first one wins
 
     def add_region(self, region: Region):
-        self._VALID_REGIONS.append(region)
+        Regions._VALID_REGIONS.append(region)
+        Regions._REGION_BY_CODE.setdefault(region.code, region)
+
+    @staticmethod
+    def load_from_sqlite(dbpath: Path) -> None:
+        try:
+            with closing(sqlite3.connect(dbpath)) as connection:
+                rows = connection.execute("SELECT code, name FROM Region").fetchall()
+        except sqlite3.Error as e:
+            print(f"Error retrieving regions: {e}")
+        else:
+            if rows:    # keep the default regions if the table is empty
+                Regions().set_VALID_REGION([Region(code, name) for code, name in rows])
 
 
 class Sales:
     DATE_FORMAT = "%Y-%m-%d"            # Class constants
     MIN_YEAR, MAX_YEAR = 2000, 2_999
+    DATE_CACHE_SIZE = 8_192             # distinct date strings remembered by parse_date
+
+    # fields live in slots: no __dict__ per instance, which matters with millions of sales
+    __slots__ = ("_id", "_amount", "_salesDate", "_region")
+    _SLOT_BY_KEY = {"ID": "_id", "amount": "_amount", "salesDate": "_salesDate", "region": "_region"}
 
     def __init__(self, id: int, amount: float=0.0, salesDate: date=None, region: Region=None):
-        self._salesdata = {"ID": id, "amount": amount, "salesDate": salesDate, "region": region}
+        self._id = id
+        self._amount = amount
+        self._salesDate = salesDate
+        self._region = region
 
     def __str__(self):
-        return (f"Sales(ID={self._salesdata["ID"]}, amount={self._salesdata["amount"]}, "
-                f"date={self._salesdata["salesDate"]}, region={self._salesdata["region"]})")
+        return (f"Sales(ID={self._id}, amount={self._amount}, "
+                f"date={self._salesDate}, region={self._region})")
 
     def __setitem__(self, key, value):
-        self._salesdata[key] = value
+        setattr(self, Sales._SLOT_BY_KEY[key], value)   # KeyError for an unknown field
 
     @property
     def id(self):
-        return self._salesdata["ID"]
+        return self._id
 
     @id.setter
     def id(self, value):
-        self._salesdata["ID"] = value
+        self["ID"] = value
 
     @property
     def amount(self):
-        return self._salesdata["amount"]
+        return self._amount
 
     @property
     def salesDate(self):
-        return self._salesdata["salesDate"]
+        return self._salesDate
 
     @property
     def region(self):
-        return self._salesdata["region"]
+        return self._region
 
     @property
     def has_bad_amount(self) -> bool:
-        return self._salesdata["amount"] == "?" # or self.amount <= 0
+        return self._amount == "?" # or self.amount <= 0
 
     @property
     def has_bad_date(self) -> bool:
-        return self._salesdata["salesDate"] == "?" # or not isinstance(self.salesDate, date)
+        return self._salesDate == "?" # or not isinstance(self.salesDate, date)
 
     @property
     def has_bad_data(self) -> bool:
-        return self.has_bad_amount or self.has_bad_date
+        return self._amount == "?" or self._salesDate == "?"
 
     @staticmethod
-    def correct_data_types(row):
-        try:  # amount
-            row[0] = float(row[0]) # convert to float
+    def parse_amount(text):
+        try:
+            return float(text)
         except ValueError:
-            row[0] = "?"    # Mark invalid amount as bad
-        try:  # date
-            salesDate = datetime.strptime(row[1], Sales.DATE_FORMAT)
-            row[1] = salesDate.date()  # convert to date
+            return "?"      # Mark invalid amount as bad
+
+    @staticmethod
+    @lru_cache(maxsize=DATE_CACHE_SIZE)
+    def parse_date(text):
+        # Fast path for zero-padded yyyy-mm-dd: slice and convert, no strptime.
+        # Anything else (e.g. 2021-7-15) goes through strptime, so exactly the
+        # same strings are accepted as with DATE_FORMAT. isdecimal() also takes other
+        # scripts' digits, which strptime does not, hence isascii().
+        if len(text) == 10 and text[4] == '-' and text[7] == '-' and text.isascii():
+            year, month, day = text[:4], text[5:7], text[8:]
+            if year.isdecimal() and month.isdecimal() and day.isdecimal():
+                try:
+                    return date(int(year), int(month), int(day))
+                except ValueError:
+                    return "?"      # e.g. 2021-02-30
+        try:
+            return datetime.strptime(text, Sales.DATE_FORMAT).date()
         except ValueError:
-            row[1] = "?"    # Mark invalid date as bad
+            return "?"      # Mark invalid date as bad
+
+    @staticmethod
+    @lru_cache(maxsize=DATE_CACHE_SIZE)
+    def parse_date_bytes(raw: bytes):
+        # parse_date for a field read as bytes (MappedCsvReader), decoded only on a cache miss
+        return Sales.parse_date(raw.decode(errors="replace"))
+
+    @staticmethod
+    def correct_data_types(row):
+        row[0] = Sales.parse_amount(row[0])     # amount: float or "?"
+        row[1] = Sales.parse_date(row[1])       # date: date or "?"
+
+    @staticmethod
+    def correct_data_columns(amounts: list, dates: list) -> tuple[list, list]:
+        # Batch version of correct_data_types working on whole columns
+        with Stats.timer("correct_data_columns", len(amounts)):
+            try:
+                amounts = list(map(float, amounts))     # whole column at once when all are valid
+            except ValueError:
+                amounts = list(map(Sales.parse_amount, amounts))
+                if Stats.enabled:
+                    Stats.count("bad_amounts", amounts.count("?"))
+            dates = list(map(Sales.parse_date_bytes if dates and isinstance(dates[0], bytes)
+                             else Sales.parse_date, dates))
+        if Stats.enabled:
+            Stats.count("bad_dates", dates.count("?"))
+        return amounts, dates
 
     @staticmethod
     def cal_quarter(month: int) -> int:
@@ -131,9 +219,117 @@ class Sales:
 
 # ------------------------------------------------------
 
+class SalesSummary:
+    # Running amount totals and counts per (region code, year, quarter).
+    # Kept up to date by SalesList.add/concat, so a summary costs O(groups), not O(sales).
+    def __init__(self):
+        self._groups = {}   # (region code, year, quarter) -> [total amount, count]
+        self.bad_count = 0  # sales with a bad amount or date are not in any group
+
+    def add(self, sales_obj) -> None:
+        if sales_obj.has_bad_data:
+            self.bad_count += 1
+        else:
+            self.add_values(sales_obj.region.code if sales_obj.region else "",
+                            sales_obj.salesDate, sales_obj.amount)
+
+    def add_values(self, code: str, salesDate: date, amount: float) -> None:
+        key = (code, salesDate.year, Sales.cal_quarter(salesDate.month))
+        group = self._groups.get(key)
+        if group is None:
+            self._groups[key] = [amount, 1]
+        else:
+            group[0] += amount
+            group[1] += 1
+
+    def add_group(self, key: tuple, total: float, count: int) -> None:
+        # total and count of many sales of one (region code, year, quarter) at once
+        group = self._groups.setdefault(key, [0.0, 0])
+        group[0] += total
+        group[1] += count
+
+    def merge(self, other: "SalesSummary") -> None:
+        for key, (total, count) in other._groups.items():
+            self.add_group(key, total, count)
+        self.bad_count += other.bad_count
+
+    def groups(self) -> list[tuple]:
+        # (region code, year, quarter, total, count), sorted
+        return [(*key, total, count) for key, (total, count) in sorted(self._groups.items())]
+
+    def totals_by(self, *fields: str) -> dict:
+        # e.g. totals_by("region") or totals_by("year", "quarter") -> {key: [total, count]}
+        positions = [("region", "year", "quarter").index(field) for field in fields]
+        totals = {}
+        for key, (total, count) in self._groups.items():
+            group = totals.setdefault(tuple(key[pos] for pos in positions), [0.0, 0])
+            group[0] += total
+            group[1] += count
+        return totals
+
+
+class SalesIndex:
+    # Secondary indexes of a SalesList: (date, region code) -> row positions for point lookups,
+    # and the row positions sorted by date for range lookups with bisect. Rows with a bad date
+    # are not indexed; region code "" stands for no region.
+    def __init__(self):
+        self._by_date_region = {}   # (date, region code) -> [row position, ...]
+        self._ordinals = []         # date.toordinal() of the indexed rows, sorted
+        self._positions = []        # row position of each entry of _ordinals
+
+    def add(self, position: int, salesDate: date, code: str) -> None:
+        positions = self._by_date_region.get((salesDate, code))
+        if positions is None:
+            self._by_date_region[(salesDate, code)] = [position]
+        else:
+            positions.append(position)
+        ordinal = salesDate.toordinal()
+        if not self._ordinals or ordinal >= self._ordinals[-1]:    # sales mostly come in date order
+            self._ordinals.append(ordinal)
+            self._positions.append(position)
+        else:
+            i = bisect_right(self._ordinals, ordinal)
+            self._ordinals.insert(i, ordinal)
+            self._positions.insert(i, position)
+
+    def add_many(self, entries) -> None:
+        # (position, date, code) of many rows, e.g. a whole list: one sort instead of an insert
+        # per row that is out of date order
+        by_date_region = self._by_date_region
+        added = []
+        for position, salesDate, code in entries:
+            positions = by_date_region.get((salesDate, code))
+            if positions is None:
+                by_date_region[(salesDate, code)] = [position]
+            else:
+                positions.append(position)
+            added.append((salesDate.toordinal(), position))
+        if not added:
+            return
+        added.sort()
+        merged = list(zip(self._ordinals, self._positions))
+        out_of_order = merged and added[0] < merged[-1]
+        merged += added
+        if out_of_order:
+            merged.sort()   # two sorted runs: a single merge
+        self._ordinals = [ordinal for ordinal, _ in merged]
+        self._positions = [position for _, position in merged]
+
+    def positions(self, salesDate: date, code: str) -> list[int]:
+        return self._by_date_region.get((salesDate, code), [])
+
+    def range_positions(self, start: Optional[date]=None, end: Optional[date]=None) -> list[int]:
+        # positions of the rows from start to end (both included, None: no limit), in date order
+        low = bisect_left(self._ordinals, start.toordinal()) if start else 0
+        high = bisect_right(self._ordinals, end.toordinal()) if end else len(self._ordinals)
+        return self._positions[low:high]
+
+
 class SalesList:
     def __init__(self):
         self._sales_list = []  # Use a single underscore for protected attributes
+        self._summary = None   # SalesSummary, built on first use and then kept up to date
+        self._index = None     # SalesIndex, built on the first find and then kept up to date
 
     def __iter__(self):
         return iter(self._sales_list)
@@ -149,76 +345,786 @@ class SalesList:
     def add(self, sales_obj):
         # Add a sales object to the list
         self._sales_list.append(sales_obj)
+        if self._summary is not None:
+            self._summary.add(sales_obj)
+        if self._index is not None:
+            SalesList._index_sales(self._index, len(self._sales_list) - 1, sales_obj)
 
     def concat(self, other_list):
-        # Concatenate another SalesList into this one by iterating over it
+        # Concatenate another SalesList into this one by iterating over it. A built index takes
+        # the new rows in one add_many: add would insert each row older than the newest one.
+        index, self._index = self._index, None
+        first = self.count
         for sales in other_list:
             self.add(sales)
+        if index is not None:
+            self._index = index
+            self._index_rows(index, range(first, self.count))
+
+    @property
+    def summary(self) -> SalesSummary:
+        if self._summary is None:
+            self._summary = self._build_summary()
+        return self._summary
+
+    def _build_summary(self) -> SalesSummary:
+        summary = SalesSummary()
+        for sales in self:
+            summary.add(sales)
+        return summary
+
+    def invalidate_summary(self) -> None:
+        # Call after changing sales in the list; the summary is rebuilt when next used
+        self._summary = None
+
+    @property
+    def index(self) -> SalesIndex:
+        if self._index is None:
+            self._index = self._build_index()
+        return self._index
+
+    def _build_index(self) -> SalesIndex:
+        index = SalesIndex()
+        self._index_rows(index, range(self.count))
+        return index
+
+    def _index_rows(self, index: SalesIndex, positions: range) -> None:
+        index.add_many((position, sales.salesDate, sales.region.code if sales.region else "")
+                       for position, sales in zip(positions, self._sales_list[positions.start:positions.stop])
+                       if not sales.has_bad_date and sales.salesDate is not None)
+
+    @staticmethod
+    def _index_sales(index: SalesIndex, position: int, sales_obj) -> None:
+        if not sales_obj.has_bad_date and sales_obj.salesDate is not None:
+            index.add(position, sales_obj.salesDate, sales_obj.region.code if sales_obj.region else "")
+
+    def invalidate_index(self) -> None:
+        # Call after changing the date or region of sales in the list; rebuilt on the next find
+        self._index = None
+
+    def find(self, salesDate: date, code: str) -> "SalesList":
+        # sales of one date and region code ("" for no region), O(1) with the index
+        found = SalesList()
+        for position in self.index.positions(salesDate, code):
+            found.add(self[position])
+        return found
+
+    def find_page(self, after: Optional[tuple]=None, page_size: int=100, start: Optional[date]=None,
+                  end: Optional[date]=None, codes: Optional[list]=None) -> list[Sales]:
+        # at most page_size sales of find_range that come after the (date text, ID) key of the
+        # previous page: a bisect to the key instead of building the whole range
+        index = self.index
+        low = bisect_left(index._ordinals, start.toordinal()) if start else 0
+        high = bisect_right(index._ordinals, end.toordinal()) if end else len(index._ordinals)
+        if after is not None:
+            ordinal = date.fromisoformat(after[0]).toordinal()
+            first = bisect_left(index._ordinals, ordinal, low, high)
+            last = bisect_right(index._ordinals, ordinal, first, high)
+            # the sales of one date are in position order, and ids grow with the position
+            low = bisect_right(index._positions, after[1], first, last, key=self._id_at)
+        page = []
+        for position in islice(index._positions, low, high):
+            sales = self[position]
+            if codes is None or (sales.region.code if sales.region else "") in codes:
+                page.append(sales)
+                if len(page) == page_size:
+                    break
+        return page
+
+    def _id_at(self, position: int) -> int:
+        return self._sales_list[position].id
+
+    def position_of(self, id: int) -> Optional[int]:
+        # row position of the sales with this id, None if there is none. DataFileAccess hands
+        # out the position + 1 as id, so that is tried before looking through the list.
+        if 0 < id <= self.count and self._id_at(id - 1) == id:
+            return id - 1
+        return next((position for position in range(self.count) if self._id_at(position) == id), None)
+
+    def find_range(self, start: Optional[date]=None, end: Optional[date]=None,
+                   codes: Optional[list]=None) -> "SalesList":
+        # sales from start to end (both included), in date order, optionally only some region codes
+        found = SalesList()
+        for position in self.index.range_positions(start, end):
+            sales = self[position]
+            if codes is None or (sales.region.code if sales.region else "") in codes:
+                found.add(sales)
+        return found
+
+
+class _SalesRowView(Sales):
+    # Sales built on demand from one row of a ColumnarSalesList; writes go back to the columns.
+    __slots__ = ("_owner", "_index")
+
+    def __init__(self, owner, index: int):
+        self._owner = owner
+        self._index = index
+        super().__init__(*owner._row(index))
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._owner._set_field(self._index, key, value)
+
+
+class ColumnarSalesList(SalesList):
+    # Same interface as SalesList, but every field lives in a typed array
+    # and Sales objects are only created when a row is iterated or indexed.
+    BAD_AMOUNT, BAD_DATE = 1, 2     # bits of the _flags column
+    NO_REGION = -1
+
+    def __init__(self):
+        self._ids = array('q')
+        self._amounts = array('d')
+        self._dates = array('i')    # date.toordinal()
+        self._region_idx = array('h')   # position in self._regions
+        self._flags = array('B')
+        self._regions = []              # each distinct Region stored once
+        self._region_pos = {}           # (code, name) -> position in self._regions
+        self._summary = None
+        self._index = None
+
+    def __iter__(self):
+        for index in range(len(self._ids)):
+            yield _SalesRowView(self, index)
+
+    @property
+    def count(self):
+        return len(self._ids)
+
+    def __getitem__(self, index) -> Sales:
+        if isinstance(index, slice):
+            return [_SalesRowView(self, i) for i in range(len(self._ids))[index]]
+        return _SalesRowView(self, range(len(self._ids))[index])  # IndexError like a list
+
+    def add(self, sales_obj):
+        flags = 0
+        amount = sales_obj.amount
+        if sales_obj.has_bad_amount:
+            flags |= ColumnarSalesList.BAD_AMOUNT
+            amount = 0.0
+        salesDate = sales_obj.salesDate
+        if sales_obj.has_bad_date or salesDate is None:
+            flags |= ColumnarSalesList.BAD_DATE
+            ordinal = 0
+        else:
+            ordinal = salesDate.toordinal()
+        self._ids.append(sales_obj.id)
+        self._amounts.append(amount)
+        self._dates.append(ordinal)
+        self._region_idx.append(self._region_index(sales_obj.region))
+        self._flags.append(flags)
+        if self._summary is not None:
+            self._summary.add(sales_obj)
+        if self._index is not None:
+            SalesList._index_sales(self._index, len(self._ids) - 1, sales_obj)
+
+    def concat(self, other_list):
+        if not isinstance(other_list, ColumnarSalesList):
+            super().concat(other_list)
+            return
+        # copy whole columns, only the region positions need remapping
+        remap = [self._region_index(region) for region in other_list._regions]
+        first = len(self._ids)
+        self._ids.extend(other_list._ids)
+        self._amounts.extend(other_list._amounts)
+        self._dates.extend(other_list._dates)
+        self._region_idx.extend(array('h', [remap[i] if i >= 0 else i
+                                            for i in other_list._region_idx]))
+        self._flags.extend(other_list._flags)
+        if self._summary is not None:
+            self._summary.merge(other_list.summary)
+        if self._index is not None:
+            self._index_rows(self._index, range(first, len(self._ids)))
+
+    def _build_summary(self) -> SalesSummary:
+        # straight from the columns, without creating Sales views
+        summary = SalesSummary()
+        codes = [region.code for region in self._regions]
+        salesDates = {}     # ordinal -> date, most sales share a few thousand dates
+        for amount, ordinal, region_idx, flags in zip(self._amounts, self._dates,
+                                                      self._region_idx, self._flags):
+            if flags:
+                summary.bad_count += 1
+                continue
+            salesDate = salesDates.get(ordinal)
+            if salesDate is None:
+                salesDate = salesDates[ordinal] = date.fromordinal(ordinal)
+            summary.add_values(codes[region_idx] if region_idx >= 0 else "", salesDate, amount)
+        return summary
+
+    def _build_index(self) -> SalesIndex:
+        index = SalesIndex()
+        self._index_rows(index, range(len(self._ids)))
+        return index
+
+    def _index_rows(self, index: SalesIndex, positions: range) -> None:
+        # straight from the columns, without creating Sales views
+        codes = [region.code for region in self._regions] + [""]    # so that -1 is ""
+        salesDates = {}     # ordinal -> date
+        for ordinal in set(self._dates[positions.start:positions.stop]):
+            if ordinal > 0:     # 0: bad date
+                salesDates[ordinal] = date.fromordinal(ordinal)
+        flags, dates, region_idx = self._flags, self._dates, self._region_idx
+        index.add_many((position, salesDates[dates[position]], codes[region_idx[position]])
+                       for position in positions if not flags[position] & ColumnarSalesList.BAD_DATE)
+
+    def _id_at(self, position: int) -> int:
+        return self._ids[position]
+
+    def position_of(self, id: int) -> Optional[int]:
+        if 0 < id <= self.count and self._ids[id - 1] == id:
+            return id - 1
+        try:
+            return self._ids.index(id)
+        except ValueError:
+            return None
+
+    def _region_index(self, region: Optional[Region]) -> int:
+        if region is None:
+            return ColumnarSalesList.NO_REGION
+        key = (region.code, region.name)
+        if key not in self._region_pos:
+            self._region_pos[key] = len(self._regions)
+            self._regions.append(region)
+        return self._region_pos[key]
+
+    def _row(self, index: int) -> tuple:
+        flags = self._flags[index]
+        amount = "?" if flags & ColumnarSalesList.BAD_AMOUNT else self._amounts[index]
+        salesDate = "?" if flags & ColumnarSalesList.BAD_DATE else date.fromordinal(self._dates[index])
+        region_idx = self._region_idx[index]
+        region = self._regions[region_idx] if region_idx >= 0 else None
+        return self._ids[index], amount, salesDate, region
+
+    def _set_field(self, index: int, key: str, value) -> None:
+        if key != "ID":
+            self.invalidate_summary()
+        if key in ("salesDate", "region"):
+            self.invalidate_index()
+        if key == "ID":
+            self._ids[index] = value
+        elif key == "amount":
+            if value == "?":
+                self._flags[index] |= ColumnarSalesList.BAD_AMOUNT
+            else:
+                self._flags[index] &= ~ColumnarSalesList.BAD_AMOUNT
+                self._amounts[index] = value
+        elif key == "salesDate":
+            if value == "?":
+                self._flags[index] |= ColumnarSalesList.BAD_DATE
+            else:
+                self._flags[index] &= ~ColumnarSalesList.BAD_DATE
+                self._dates[index] = value.toordinal()
+        elif key == "region":
+            self._region_idx[index] = self._region_index(value)
 
 
 # -------------- Data Access (File) --------------------------
 
+class SalesSnapshot:
+    # Binary copy of all_sales.csv as ColumnarSalesList columns, loaded with mmap instead of
+    # re-parsing the csv. The header remembers the (mtime, size) of the csv it was made from;
+    # once those no longer match the snapshot is ignored. Ids are not stored, they are
+    # handed out on load like for the csv. Columns are in native byte order: it is a local
+    # cache next to the csv, not an exchange format.
+    # The rows come in blocks, each with the regions it adds and its columns, so the rows an
+    # append-only save adds to the csv are added as one more block (see append).
+    MAGIC = b"SALESNP2"
+    HEADER = struct.Struct("<8sqqq")    # magic, csv mtime_ns, csv size, rows
+    BLOCK = struct.Struct("<qq")        # rows, bytes of the regions added by the block
+    SUFFIX = ".snapshot"
+    COLUMNS = ("_amounts", "_dates", "_region_idx", "_flags")
+    ROW_SIZE = sum(array(typecode).itemsize for typecode in "dihB")
+
+    def __init__(self, csv_filepath_name: Path):
+        self._filepath_name = csv_filepath_name.with_suffix(SalesSnapshot.SUFFIX)
+        self._state = None      # (csv state, rows, regions, file size) of the last load or save
+
+    def load(self, csv_state: tuple) -> Optional[ColumnarSalesList]:
+        # None when there is no snapshot or it does not belong to csv_state
+        self._state = None
+        try:
+            with open(self._filepath_name, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if len(mm) < SalesSnapshot.HEADER.size:
+                    return None
+                magic, mtime, size, rows = SalesSnapshot.HEADER.unpack_from(mm)
+                if magic != SalesSnapshot.MAGIC or (mtime, size) != tuple(csv_state):
+                    return None
+                sales_list = ColumnarSalesList()
+                regions = Regions()
+                offset, loaded = SalesSnapshot.HEADER.size, 0
+                with memoryview(mm) as view:
+                    while offset < len(mm):
+                        block_rows, regions_size = SalesSnapshot.BLOCK.unpack_from(mm, offset)
+                        offset += SalesSnapshot.BLOCK.size
+                        if offset + regions_size + block_rows * SalesSnapshot.ROW_SIZE > len(mm):
+                            return None     # cut short, e.g. by a crash while appending
+                        for line in mm[offset:offset + regions_size].decode().splitlines():
+                            code, name = line.split("\t")
+                            region = regions.get(code)
+                            sales_list._region_index(region if region and region.name == name
+                                                     else Region(code, name))
+                        offset += regions_size
+                        for column in SalesSnapshot.COLUMNS:
+                            values = getattr(sales_list, column)
+                            end = offset + block_rows * values.itemsize
+                            values.frombytes(view[offset:end])
+                            offset = end
+                        loaded += block_rows
+                if loaded != rows or offset != len(mm):
+                    return None
+        except (FileNotFoundError, ValueError, struct.error) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Error reading {self._filepath_name.name}: {e}")
+            return None
+        sales_list._ids = array('q', range(1, rows + 1))     # file order, as DataFileAccess numbers them
+        self._state = (tuple(csv_state), rows, list(sales_list._regions), offset)
+        return sales_list
+
+    @staticmethod
+    def _write_block(file, sales_list: "ColumnarSalesList", known_regions: int) -> int:
+        # one block with the rows of sales_list and its regions after the first known_regions;
+        # returns the bytes written
+        regions = "".join(f"{region.code}\t{region.name}\n"
+                          for region in sales_list._regions[known_regions:]).encode()
+        file.write(SalesSnapshot.BLOCK.pack(sales_list.count, len(regions)))
+        file.write(regions)
+        for column in SalesSnapshot.COLUMNS:
+            getattr(sales_list, column).tofile(file)
+        return SalesSnapshot.BLOCK.size + len(regions) + sales_list.count * SalesSnapshot.ROW_SIZE
+
+    def save(self, sales_list: SalesList, csv_state: tuple) -> None:
+        # write to a temporary file, then swap it in, so a reader never sees half a snapshot
+        self._state = None
+        if not isinstance(sales_list, ColumnarSalesList):
+            columnar = ColumnarSalesList()
+            columnar.concat(sales_list)
+            sales_list = columnar
+        with tempfile.NamedTemporaryFile('wb', dir=self._filepath_name.parent,
+                                         prefix=self._filepath_name.name, suffix='.tmp',
+                                         delete=False) as file:
+            try:
+                file.write(SalesSnapshot.HEADER.pack(SalesSnapshot.MAGIC, *csv_state, sales_list.count))
+                size = SalesSnapshot.HEADER.size + SalesSnapshot._write_block(file, sales_list, 0)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, self._filepath_name)
+        self._state = (tuple(csv_state), sales_list.count, list(sales_list._regions), size)
+
+    def append(self, sales_iterable, previous_csv_state: tuple, csv_state: tuple) -> bool:
+        # Add the sales appended to the csv (previous_csv_state -> csv_state) as one more block,
+        # then stamp the header with csv_state. Only when the snapshot file is still the one this
+        # object loaded or saved for previous_csv_state; returns False otherwise (it stays stale
+        # and is rebuilt on the next load). A crash before the header is written leaves the old
+        # header, which no longer matches the csv, so a half-appended snapshot is never used.
+        if self._state is None or self._state[0] != tuple(previous_csv_state):
+            return False
+        _, rows, regions, size = self._state
+        delta = ColumnarSalesList()
+        for region in regions:  # same region positions as the blocks already written
+            delta._region_index(region)
+        delta.concat(sales_iterable)
+        self._state = None
+        with open(self._filepath_name, 'r+b') as file:
+            header = file.read(SalesSnapshot.HEADER.size)
+            if (header != SalesSnapshot.HEADER.pack(SalesSnapshot.MAGIC, *previous_csv_state, rows)
+                    or file.seek(0, os.SEEK_END) != size):
+                return False    # replaced or changed by someone else
+            size += SalesSnapshot._write_block(file, delta, len(regions))
+            file.flush()
+            file.seek(0)
+            file.write(SalesSnapshot.HEADER.pack(SalesSnapshot.MAGIC, *csv_state, rows + delta.count))
+        self._state = (tuple(csv_state), rows + delta.count, list(delta._regions), size)
+        return True
+
+    def remove(self) -> None:
+        self._state = None
+        self._filepath_name.unlink(missing_ok=True)
+
+
+class MappedCsvReader:
+    # Reads a sales csv through mmap, one block of whole lines at a time. When every line of
+    # a block has the same number of fields, the block is split once on the delimiter and the
+    # columns are taken with slice steps: no list and str per line like with csv.reader.
+    # Other blocks go through a compiled pattern. Quoted fields are not supported; sales files
+    # never quote these columns. Rows that are too short get "?" like bad values.
+    BLOCK_SIZE = 1 << 18    # bytes read from the mapping at a time, cut at a line end
+
+    def __init__(self, filepath_name: Path, delimiter: str=','):
+        self._filepath_name = filepath_name
+        self._delimiter = delimiter.encode()
+        field = rb"([^%s\r\n]*)" % re.escape(self._delimiter)
+        delimiter = re.escape(self._delimiter)
+        # first field, optional second field, optional last field of every non-empty line
+        self._pattern = re.compile(rb"^(?=[^\r\n])" + field + rb"(?:" + delimiter + field + rb")?"
+                                   rb"(?:" + delimiter + rb"(?:[^\r\n]*" + delimiter + rb")?" + field + rb")?"
+                                   rb"\r?$", re.MULTILINE)
+
+    def _split_block(self, block: bytes) -> tuple[list, list, list]:
+        # raw (amounts, dates, region codes) of the non-empty lines of block
+        delimiter = self._delimiter
+        lines = block.split(b"\n")
+        if b"\r" in block:
+            lines = [line.rstrip(b"\r") for line in lines]
+        lines = list(filter(None, lines))
+        counts = set(map(bytes.count, lines, repeat(delimiter)))
+        if len(counts) == 1 and (width := counts.pop() + 1) >= 2:
+            fields = delimiter.join(lines).split(delimiter)
+            codes = fields[width - 1::width] if width >= 3 else [b""] * len(lines)
+            return fields[0::width], fields[1::width], codes
+        if not lines:
+            return [], [], []
+        amounts, salesDates, codes = map(list, zip(*self._pattern.findall(block)))
+        return amounts, salesDates, codes
+
+    def iter_columns(self, chunk_size: int=0) -> Iterator[tuple[list, list, list]]:
+        # (amounts, dates, region codes as bytes) of at most chunk_size rows, empty lines skipped.
+        # The region code is the last field of rows with three or more fields, else b"".
+        chunk_size = chunk_size or DataFileAccess.CHUNK_SIZE
+        with open(self._filepath_name, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:    # mmap cannot map an empty file
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                amounts, salesDates, codes = [], [], []
+                start, size = 0, len(mm)
+                while start < size:
+                    end = mm.find(b"\n", start + MappedCsvReader.BLOCK_SIZE)
+                    end = size if end < 0 else end + 1
+                    with Stats.timer("csv_read") as timer:
+                        block_columns = self._split_block(mm[start:end])
+                        timer.rows = len(block_columns[0])
+                    for column, values in zip((amounts, salesDates, codes), block_columns):
+                        column.extend(values)
+                    start = end
+                    done = 0
+                    while len(amounts) - done >= chunk_size or (start >= size and done < len(amounts)):
+                        chunk = slice(done, done + chunk_size)
+                        yield (*Sales.correct_data_columns(amounts[chunk], salesDates[chunk]), codes[chunk])
+                        done += chunk_size
+                    del amounts[:done], salesDates[:done], codes[:done]
+
+
+class SalesIdAllocator:
+    # Hands out sales ids in contiguous blocks: reserve(n) takes range(first, first + n) in one
+    # locked step, so concurrent imports never share an id and a big import costs one call.
+    # Nothing is persisted: all_sales.csv stores no ids, so its rows are numbered by position
+    # on every load (see DataFileAccess), and advance_to_sqlite follows the database.
+    def __init__(self, start: int=1):
+        self._lock = threading.Lock()
+        self._next_id = start
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    def reserve(self, count: int) -> range:
+        with Stats.timer("id_reserve", count), self._lock:
+            ids = range(self._next_id, self._next_id + count)
+            self._next_id = ids.stop
+        return ids
+
+    def reset(self, next_id: int) -> None:
+        # start again at next_id (e.g. in tests); the next reserve starts there
+        with self._lock:
+            self._next_id = next_id
+
+    def advance_to(self, next_id: int) -> None:
+        # make sure the ids handed out from now on are at least next_id; never goes back
+        with self._lock:
+            if next_id > self._next_id:
+                self._next_id = next_id
+
+    def advance_to_sqlite(self, dbpath: Path) -> None:
+        # continue after the last id of the Sales table of a sales_db.sqlite (AUTOINCREMENT)
+        try:
+            with closing(sqlite3.connect(dbpath)) as connection:
+                row = connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Sales'").fetchone()
+                if row is None:
+                    row = connection.execute("SELECT MAX(ID) FROM Sales").fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading the last sales id: {e}")
+            return
+        if row and row[0] is not None:
+            self.advance_to(int(row[0]) + 1)
+
+
+class _SalesIdView(MutableMapping):
+    # DataFileAccess.SALES_ID as it used to be ({"Sales": next id}), backed by
+    # DataFileAccess.ID_ALLOCATOR. Reading and setting work as before; use reserve() to take ids.
+    def __getitem__(self, key):
+        if key != "Sales":
+            raise KeyError(key)
+        return DataFileAccess.ID_ALLOCATOR.next_id
+
+    def __setitem__(self, key, value):
+        if key != "Sales":
+            raise KeyError(key)
+        DataFileAccess.ID_ALLOCATOR.reset(value)
+
+    def __delitem__(self, key):
+        raise TypeError("SALES_ID keys cannot be deleted")
+
+    def __iter__(self):
+        return iter(("Sales",))
+
+    def __len__(self):
+        return 1
+
+
 class DataFileAccess:
     FILEPATH = Path(__file__).parent.parent / 'p01_files'
-    SALES_ID = {"Sales": 1}
-
-    def __init__(self, filename: str=""):
+    # all_sales.csv does not store ids: its rows are numbered 1, 2, ... in file order on every load,
+    # so a loaded sales has the same id in every run. ID_ALLOCATOR hands out the ids of new sales
+    # after the loaded rows, i.e. the positions they are saved at, so they keep them too (as long
+    # as the process works on one sales file: the allocator is shared, see SQLiteSalesBackend).
+    ID_ALLOCATOR = SalesIdAllocator()
+    SALES_ID = _SalesIdView()     # {"Sales": next id}, kept for existing callers
+    CHUNK_SIZE = 10_000     # rows per batch when streaming a csv file
+
+    def __init__(self, filename: str="", columnar: bool=False, lazy: bool=False, mapped: bool=False):
         self._ALL_SALES = filename if filename else 'all_sales.csv'
         self._all_sale_filepath_name = DataFileAccess.FILEPATH / self._ALL_SALES
-        self._all_sales_list = self.__import_all_sales()
+        self._saleslist_type = ColumnarSalesList if columnar else SalesList
+        self._mapped = mapped       # read the csv with MappedCsvReader instead of csv.reader
+        self.__all_sales_list = None
+        self._saved_count = 0       # rows of the list that are already in the file
+        self._modified = set()      # positions of saved rows that changed, None for all of them
+        self._file_state = None     # (mtime, size) of the file after the last load or save
+        self._snapshot = SalesSnapshot(self._all_sale_filepath_name)   # binary copy for fast loading
+        if not lazy:    # lazy: parse all_sales.csv only when the list is first needed
+            self.__all_sales_list = self.__import_all_sales()
+
+    @property
+    def _all_sales_list(self) -> SalesList:
+        if self.__all_sales_list is None:
+            self.__all_sales_list = self.__import_all_sales()
+        return self.__all_sales_list
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__all_sales_list is not None
+
+    @staticmethod
+    def _read_batches(reader, chunk_size: int) -> Iterator[list]:
+        # Pull at most chunk_size rows at a time from a csv reader
+        while True:
+            with Stats.timer("csv_read") as timer:
+                rows = list(islice(reader, chunk_size))
+                timer.rows = len(rows)
+            if not rows:
+                return
+            yield rows
+
+    def _iter_columns(self, chunk_size: int) -> Iterator[tuple[list, list, list]]:
+        # (amounts, dates, region codes) of at most chunk_size rows of all_sales.csv
+        if self._mapped:
+            yield from MappedCsvReader(self._all_sale_filepath_name).iter_columns(chunk_size)
+            return
+        with open(self._all_sale_filepath_name, newline='') as csvfile:
+            reader = csv.reader(csvfile)
+            for rows in DataFileAccess._read_batches(reader, chunk_size):
+                rows = [line for line in rows if len(line) > 0]
+                amounts, salesDates = Sales.correct_data_columns([line[0] for line in rows],
+                                                                 [line[1] for line in rows])
+                yield amounts, salesDates, [line[-1] for line in rows]
+
+    def iter_sales_batches(self, chunk_size: int=0) -> Iterator[SalesList]:
+        # Stream all_sales.csv as SalesList batches; ids are temporary (0) like SalesFile.import_sales
+        regions = Regions()
+        region_by_code = {}     # code (str, or bytes when mapped) -> Region
+        for amounts, salesDates, codes in self._iter_columns(chunk_size or DataFileAccess.CHUNK_SIZE):
+            batch = self._saleslist_type()
+            for amount, salesDate, code in zip(amounts, salesDates, codes):
+                if code not in region_by_code:
+                    region_by_code[code] = regions.get(code if isinstance(code, str)
+                                                       else code.decode(errors="replace"))
+                kwarg = {"id": 0,   # temporary id, will be updated later
+                    "amount": amount,
+                    "salesDate": salesDate,
+                    "region": region_by_code[code],
+                }
+                batch.add(Sales(**kwarg))
+            yield batch
 
     def __import_all_sales(self) -> SalesList:
+        with Stats.timer("load_all_sales") as timer:
+            csv_state = self._stat_all_sales()
+            all_sales_list = self.__load_snapshot(csv_state) if csv_state else None
+            if all_sales_list is None:  # no snapshot, or the csv changed since it was written
+                all_sales_list = self._saleslist_type()
+                try:
+                    for batch in self.iter_sales_batches():
+                        ids = range(all_sales_list.count + 1, all_sales_list.count + batch.count + 1)
+                        if isinstance(batch, ColumnarSalesList):
+                            batch._ids = array('q', ids)
+                        else:
+                            for sales, id in zip(batch, ids):
+                                sales["ID"] = id
+                        all_sales_list.concat(batch)
+                except FileNotFoundError:
+                    print("Sales file not found.")
+                else:
+                    self.__save_snapshot(all_sales_list, csv_state)
+            DataFileAccess.ID_ALLOCATOR.advance_to(all_sales_list.count + 1)   # new sales come after them
+            self._saved_count = timer.rows = all_sales_list.count
+            self._file_state = self._stat_all_sales()
+        return all_sales_list  # an empty list if file not found
+
+    def __load_snapshot(self, csv_state: tuple) -> Optional[SalesList]:
+        with Stats.timer("snapshot_load") as timer:
+            columnar = self._snapshot.load(csv_state)
+            timer.rows = columnar.count if columnar is not None else 0
+        if columnar is None or self._saleslist_type is ColumnarSalesList:
+            return columnar
+        all_sales_list = self._saleslist_type()
+        for index in range(columnar.count):
+            all_sales_list.add(Sales(*columnar._row(index)))
+        return all_sales_list
+
+    def __save_snapshot(self, all_sales_list: SalesList, csv_state: Optional[tuple]) -> None:
+        # the snapshot only speeds up the next start, so a failure is not fatal
+        if csv_state is None:
+            return
         try:
-            with open(self._all_sale_filepath_name, newline='') as csvfile:
-                reader = csv.reader(csvfile)
-                all_sales_list = SalesList()
-                for line in reader:
-                    if len(line) > 0:
-                        *amount_salesDate, code = line
-                        Sales.correct_data_types(amount_salesDate)
-                        amount, salesDate = amount_salesDate[0], amount_salesDate[1]
-                        kwarg = {"id": DataFileAccess.SALES_ID["Sales"],
-                            "amount": amount,
-                            "salesDate": salesDate,
-                            "region": Regions().get(code),
-                        }
-                        sales = Sales(**kwarg)
-                        all_sales_list.add(sales)
-                        DataFileAccess.SALES_ID["Sales"] += 1
-                return all_sales_list
+            with Stats.timer("snapshot_save", all_sales_list.count):
+                self._snapshot.save(all_sales_list, csv_state)
+        except OSError as e:
+            print(f"Error writing snapshot: {e}")
+
+    def __append_snapshot(self, new_sales: list, previous_csv_state: tuple, csv_state: tuple) -> None:
+        # the rows just appended to the csv go to the snapshot as well, so the next start can
+        # still load it; if it cannot be appended to, it is rebuilt on the next load
+        try:
+            with Stats.timer("snapshot_append", len(new_sales)):
+                self._snapshot.append(new_sales, previous_csv_state, csv_state)
+        except OSError as e:
+            print(f"Error writing snapshot: {e}")
+
+    def _stat_all_sales(self) -> Optional[tuple]:
+        try:
+            stat = self._all_sale_filepath_name.stat()
+            return stat.st_mtime_ns, stat.st_size
         except FileNotFoundError:
-            print("Sales file not found.")
-            return SalesList()  # Return an empty list if file not found
+            return None
 
     def add_sales(self, sales_obj):
-        sales_obj["ID"] = DataFileAccess.SALES_ID["Sales"]
-        self._all_sales_list.add(sales_obj)
-        DataFileAccess.SALES_ID["Sales"] += 1
+        all_sales_list = self._all_sales_list   # load first (lazy mode) so existing sales get ids first
+        sales_obj["ID"] = DataFileAccess.ID_ALLOCATOR.reserve(1)[0]
+        all_sales_list.add(sales_obj)
 
     def concat_saleslist(self, other_list):
-        for sales in other_list:
-            sales["ID"] = DataFileAccess.SALES_ID["Sales"]
-            DataFileAccess.SALES_ID["Sales"] += 1
-        self._all_sales_list.concat(other_list)
+        all_sales_list = self._all_sales_list   # load first (lazy mode) so existing sales get ids first
+        for sales, id in zip(other_list, DataFileAccess.ID_ALLOCATOR.reserve(other_list.count)):
+            sales["ID"] = id
+        all_sales_list.concat(other_list)
+
+
+    def mark_modified(self, positions: Optional[Iterable[int]]=None) -> None:
+        # Call after changing sales that were already saved (at positions, None: unknown), so the
+        # next save rewrites the file
+        if positions is None or self._modified is None:
+            self._modified = None
+        else:
+            self._modified.update(positions)
+        self._all_sales_list.invalidate_summary()
+        self._all_sales_list.invalidate_index()
 
+    def summary(self) -> SalesSummary:
+        return self._all_sales_list.summary
 
-    def save_all_sales(self, delimiter: str = ',') -> None:
-        sales_records = [[sales.amount, f"{sales.salesDate:{Sales.DATE_FORMAT}}", sales.region.code]
-                         for sales in self._all_sales_list] # do not include sales.id in csv file.
+    @staticmethod
+    def _sales_record(sales) -> list:
+        # do not include sales.id in csv file.
+        salesDate = sales.salesDate if sales.has_bad_date else f"{sales.salesDate:{Sales.DATE_FORMAT}}"
+        return [sales.amount, salesDate, sales.region.code if sales.region else ""]
+
+    def save_all_sales(self, delimiter: str = ',', compact: bool = False) -> None:
+        # Append only the sales added since the last load/save. The whole file is rewritten
+        # (compacted) when saved rows were modified or when compact is True. A file changed by
+        # someone else in the meantime is only appended to: a rewrite would lose that change.
+        if not self.is_loaded:  # lazy and never used: nothing can have changed
+            print("Saved sales records.")
+            return
+        all_sales_list = self._all_sales_list
+        file_state = self._stat_all_sales()
+        compact = (compact or self._modified is None or bool(self._modified) or file_state is None
+                   or self._saved_count > all_sales_list.count)
+        if compact and file_state is not None and file_state != self._file_state:
+            print(f"{self._ALL_SALES} was changed by another program after it was loaded. "
+                  "Sales data could not be saved: restart to load the file again.")
+            return
+        new_sales = all_sales_list[self._saved_count:]
         try:
-            with open(self._all_sale_filepath_name, 'w', newline='') as csvfile:
-                writer.writerows(sales_records)
-                print("Saved sales records.")
+            if compact:
+                with Stats.timer("save_compact", all_sales_list.count):
+                    self.__compact_all_sales(delimiter)
+            elif new_sales:
+                with Stats.timer("save_append", len(new_sales)):
+                    self.__append_all_sales(new_sales, delimiter)
         except Exception as e:
             print(type(e), "Sales data could not be saved.")
+        else:
+            previous_state, self._file_state = self._file_state, self._stat_all_sales()
+            self._saved_count = all_sales_list.count
+            self._modified = set()
+            if compact:
+                self.__save_snapshot(all_sales_list, self._file_state)
+            elif new_sales and file_state == previous_state:    # not after someone else's change
+                self.__append_snapshot(new_sales, previous_state, self._file_state)
+            print("Saved sales records.")
+
+    def __append_all_sales(self, new_sales: list, delimiter: str) -> None:
+        with open(self._all_sale_filepath_name, 'rb+') as file:   # the last line may lack its newline
+            if file.seek(0, os.SEEK_END) > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+        with open(self._all_sale_filepath_name, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile, delimiter=delimiter)
+            writer.writerows(map(DataFileAccess._sales_record, new_sales))
+
+    def __saved_rows(self) -> Iterator[list]:
+        # the rows of all_sales.csv as they are in the file, in the order they were loaded
+        try:
+            with open(self._all_sale_filepath_name, newline='') as csvfile:
+                yield from (line for line in csv.reader(csvfile) if len(line) > 0)
+        except FileNotFoundError:
+            return
+
+    def __compact_all_sales(self, delimiter: str) -> None:
+        # write a temporary file next to all_sales.csv, then swap it in with an atomic rename.
+        # Saved rows that were not modified are copied from the file as they are: a bad value
+        # (e.g. 2021-02-30 or an unknown region) keeps its text until someone fixes it there.
+        all_sales_list, modified = self._all_sales_list, self._modified
+        with closing(self.__saved_rows()) as saved_rows, \
+                tempfile.NamedTemporaryFile('w', newline='', dir=self._all_sale_filepath_name.parent,
+                                            prefix=self._ALL_SALES, suffix='.tmp', delete=False) as csvfile:
+            try:
+                writer = csv.writer(csvfile, delimiter=delimiter)
+                for position in range(all_sales_list.count):
+                    row = next(saved_rows, None) if position < self._saved_count else None
+                    if row is None or modified is None or position in modified:
+                        row = DataFileAccess._sales_record(all_sales_list[position])
+                    writer.writerow(row)
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+            except BaseException:
+                csvfile.close()
+                os.remove(csvfile.name)
+                raise
+        os.replace(csvfile.name, self._all_sale_filepath_name)
 
 
 class SalesFile:
     NAMING_CONVENTION = "sales_qn_yyyy_r.csv"
 
-    def __init__(self, filename: str=""):
+    def __init__(self, filename: str="", mapped: bool=False):
         self._sales_filename: str = filename
         self._sales_filepath_name = DataFileAccess.FILEPATH / self._sales_filename
+        self._mapped = mapped       # read with MappedCsvReader instead of csv.reader
 
     @property
     def is_valid_filename_format(self) -> bool:
@@ -233,43 +1139,129 @@ class SalesFile:
     def get_code(self) -> str:
         return self._sales_filename[self._sales_filename.rfind('.') - 1]
 
-    def import_sales(self, delimiter: str=',') -> SalesList:   #Optional[SalesList]:
+    def _iter_columns(self, delimiter: str, chunk_size: int) -> Iterator[tuple[list, list]]:
+        # (amounts, dates) of at most chunk_size rows, converted like correct_data_types
+        if self._mapped:
+            reader = MappedCsvReader(self._sales_filepath_name, delimiter)
+            for amounts, salesDates, _ in reader.iter_columns(chunk_size):
+                yield amounts, salesDates
+            return
         with open(self._sales_filepath_name, newline='') as csvfile:
             reader = csv.reader(csvfile, delimiter=delimiter)
-            code = self.get_code()
-            imported_sales_list = SalesList()
-            for amount_salesDate in reader:
-                Sales.correct_data_types(amount_salesDate)
-                amount, salesDate = amount_salesDate[0], amount_salesDate[1]
+            for rows in DataFileAccess._read_batches(reader, chunk_size):
+                yield Sales.correct_data_columns([row[0] for row in rows], [row[1] for row in rows])
+
+    def iter_sales_batches(self, delimiter: str=',', chunk_size: int=0) -> Iterator[SalesList]:
+        # Stream the file as SalesList batches of at most chunk_size sales
+        region = Regions().get(self.get_code())
+        for amounts, salesDates in self._iter_columns(delimiter, chunk_size or DataFileAccess.CHUNK_SIZE):
+            batch = SalesList()
+            for amount, salesDate in zip(amounts, salesDates):
                 kwarg = {"id": 0,   # temporary id, will be updated later
                         "amount": amount,
                         "salesDate": salesDate,
-                        "region": Regions().get(code),
+                        "region": region,
                         }
-                sales = Sales(**kwarg)
-                imported_sales_list.add(sales)
-            return imported_sales_list  # within with statement
+                batch.add(Sales(**kwarg))
+            yield batch
+
+    def import_columns(self, delimiter: str=',') -> tuple[list, list]:
+        # amounts and dates of the whole file, converted like correct_data_types
+        amounts, salesDates = [], []
+        for batch_amounts, batch_salesDates in self._iter_columns(delimiter, DataFileAccess.CHUNK_SIZE):
+            amounts.extend(batch_amounts)
+            salesDates.extend(batch_salesDates)
+        return amounts, salesDates
+
+    @staticmethod
+    def discover() -> list[str]:
+        # names of the files in DataFileAccess.FILEPATH that follow NAMING_CONVENTION, sorted
+        return sorted(path.name for path in DataFileAccess.FILEPATH.iterdir()
+                      if path.is_file() and SalesFile(path.name).is_valid_filename_format)
+
+    @staticmethod
+    def import_sales_files(filenames: list, max_workers: Optional[int]=None,
+                           mapped: bool=False) -> list[tuple]:
+        # Parse the files in a process pool. Returns (filename, SalesList or None, seconds,
+        # exception or None) in the order of filenames; ids are temporary (0).
+        filepath_names = [str(SalesFile(filename)._sales_filepath_name) for filename in filenames]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed = list(executor.map(_parse_sales_file, filepath_names, repeat(mapped)))
+        results = []
+        for filename, (columns, seconds, error) in zip(filenames, parsed):
+            imported_sales_list = None
+            if error is None:   # Sales are built here so regions stay the registry's objects
+                region = Regions().get(SalesFile(filename).get_code())
+                imported_sales_list = SalesList()
+                for amount, salesDate in zip(*columns):
+                    imported_sales_list.add(Sales(0, amount, salesDate, region))
+                if Stats.enabled:   # timed in the worker, whose own Stats are lost
+                    Stats.record("import_sales_file", seconds, imported_sales_list.count)
+            results.append((filename, imported_sales_list, seconds, error))
+        return results
+
+    def import_sales(self, delimiter: str=',') -> SalesList:   #Optional[SalesList]:
+        imported_sales_list = SalesList()
+        with Stats.timer("import_sales_file") as timer:
+            for batch in self.iter_sales_batches(delimiter):
+                imported_sales_list.concat(batch)
+            timer.rows = imported_sales_list.count
+        return imported_sales_list
+
+
+def _parse_sales_file(filepath_name: str, mapped: bool=False) -> tuple:
+    # runs in a worker process of SalesFile.import_sales_files
+    start = time.perf_counter()
+    try:
+        columns = SalesFile(filepath_name, mapped).import_columns()
+    except Exception as e:
+        return None, time.perf_counter() - start, e
+    return columns, time.perf_counter() - start, None
 
 
 class ImportedFile:
+    # imported file names are kept in a set shared by every ImportedFile of the same txt file;
+    # it is read once and read again only when the file's mtime or size changes.
+    _REGISTRY = {}  # txt file path -> ((mtime, size), set of imported file names)
+
     def __init__(self, filename: str=""):
         self._IMPORTED_FILES = filename if filename else 'imported_files.txt'
         self._imported_filepath_name = DataFileAccess.FILEPATH / self._IMPORTED_FILES
 
-    def already_imported(self, filepath_name: Path) -> bool:
+    def _file_state(self) -> Optional[tuple]:
         try:
-            with open(DataFileAccess.FILEPATH / self._IMPORTED_FILES) as file:
-                files = [line.strip() for line in file.readlines()]  # Strip newlines
-                return str(filepath_name) in files
+            stat = self._imported_filepath_name.stat()
+            return stat.st_mtime_ns, stat.st_size
         except FileNotFoundError:
-            return False  # Returning False if file doesn't exist
+            return None
+
+    def _imported_files(self) -> set:
+        state = self._file_state()
+        cached = ImportedFile._REGISTRY.get(self._imported_filepath_name)
+        if cached is None or cached[0] != state:    # first use, or changed outside this object
+            files = set()
+            if state is not None:
+                try:
+                    with open(self._imported_filepath_name) as file:
+                        files = {line.strip() for line in file}  # Strip newlines
+                except FileNotFoundError:
+                    state = None
+            cached = ImportedFile._REGISTRY[self._imported_filepath_name] = (state, files)
+        return cached[1]
+
+    def already_imported(self, filepath_name: Path) -> bool:
+        return str(filepath_name) in self._imported_files()
 
     def add_imported_file(self, filepath_name: Path) -> None:
+        files = self._imported_files()
         try:
-            with open(DataFileAccess.FILEPATH / self._IMPORTED_FILES, "a") as file:
+            with open(self._imported_filepath_name, "a") as file:
                 file.write(f"{filepath_name}\n")   # add newlines
         except Exception as e:
             print(f"{type(e)} - The imported file could not be documented.")
+        else:
+            files.add(str(filepath_name))
+            ImportedFile._REGISTRY[self._imported_filepath_name] = (self._file_state(), files)
 
 
 # ---------------- Data Access (Input) ---------------------------
@@ -1,30 +1,80 @@
 import sqlite3
-from typing import Optional, List
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Optional, List, Iterator, Iterable, Union
 from datetime import date
 from pathlib import Path
 
-
-class Sales:
-    def __init__(self, id: int, amount: float, salesDate: str, region: str):
-        self.id = id
-        self.amount = amount
-        self.salesDate = salesDate
-        self.region = region
-
-
-class Region:
-    def __init__(self, code: str, name: str):
-        self.code = code
-        self.name = name
+import p01_1da_sales as da
+from p01_1da_sales import Sales, Region, Regions    # the same model as the csv data access
+from p01_1da_stats import Stats
 
 
 # -------------- Data Access (SQLite) --------------------------
 class SQLiteDBAccess:
     SQLITEDBPATH = Path(__file__).parent.parent / 'p01_db'
+    PRAGMAS = {"cache_size": -16_000,       # in KiB when negative
+               "mmap_size": 268_435_456}
+    # only once the db is in WAL mode: with a rollback journal, synchronous=NORMAL may corrupt
+    # the db on power loss, so an unmigrated db keeps the default FULL
+    WAL_PRAGMAS = {"synchronous": "NORMAL"}     # fewer fsyncs
+    # pragmas stored in the db file itself: set by migrate(), so that reading never changes the file
+    DB_PRAGMAS = {"journal_mode": "WAL"}    # readers do not block the writer
+    # schema migrations: PRAGMA user_version -> statements that bring the db to that version
+    MIGRATIONS = {
+        1: ["CREATE INDEX IF NOT EXISTS idx_Sales_salesDate_region "
+            "ON Sales (salesDate, region, amount)",        # covers retrieve_sales_by_date_region
+            "CREATE INDEX IF NOT EXISTS idx_Sales_region_salesDate "
+            "ON Sales (region, salesDate)",                # region/date range reports
+            "ANALYZE"],
+        2: ["CREATE INDEX IF NOT EXISTS idx_Sales_salesDate "
+            "ON Sales (salesDate)",         # (salesDate, ID) order of iter_sales and keyset pages
+            "ANALYZE"],
+    }
+    BATCH_SIZE = 10_000     # rows per executemany call in bulk_load_sales
+    FETCH_SIZE = 1_000      # rows per fetchmany call in iter_sales
+    REGION_CACHE_TTL = 300.0    # seconds cached_regions() trusts its copy of the Region table
+    # queries that must be answered from an index, checked by check_query_plans()
+    HOT_QUERIES = {
+        "sales by date and region": ("SELECT ID, amount, salesDate, region FROM Sales "
+                                     "WHERE salesDate = ? AND region = ?", ("2021-01-01", "w")),
+        "sales by region and date range": ("SELECT ID, amount, salesDate, region FROM Sales "
+                                           "WHERE region = ? AND salesDate BETWEEN ? AND ?",
+                                           ("w", "2021-01-01", "2021-12-31")),
+        "sales page after a key": ("SELECT ID, amount, salesDate, region FROM Sales "
+                                   "WHERE (salesDate, ID) > (?, ?) ORDER BY salesDate, ID LIMIT 100",
+                                   ("2021-01-01", 0)),
+    }
 
-    def __init__(self):
-        self._sqlite_sales_db = 'sales_db.sqlite'
+    def __init__(self, filename: str="", pooled: bool=False, pragmas: Optional[dict]=None):
+        self._sqlite_sales_db = filename if filename else 'sales_db.sqlite'
         self._dbpath_sqlite_sales_db = SQLiteDBAccess.SQLITEDBPATH / self._sqlite_sales_db
+        # pooled: keep one open connection per thread instead of one per call
+        self._pooled = pooled
+        self._pragmas = SQLiteDBAccess.PRAGMAS if pragmas is None else pragmas
+        self._wal_pragmas = SQLiteDBAccess.WAL_PRAGMAS if pragmas is None else {}
+        self._local = threading.local()
+        self._pool: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._regions: List[Region] = []   # cached_regions() copy of the Region table
+        self._regions_expire = 0.0          # time.monotonic() after which it is read again
+        self._regions_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        '''Close every pooled connection. The object can still be used afterwards.'''
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for connection in pool:
+            connection.close()
+        self._local = threading.local()
 
     def connect(self) -> sqlite3.Connection:
         '''Connect to the SQLite database and return the connection object.'''
@@ -35,6 +85,133 @@ class SQLiteDBAccess:
             print(f"Error connecting to database: {e}")
             return None
 
+    def _connect_pooled(self) -> sqlite3.Connection:
+        '''Open a long-lived connection for the current thread and apply the pragmas.'''
+        try:
+            # each thread only uses its own connection; close() may run on another thread
+            connection = sqlite3.connect(self._dbpath_sqlite_sales_db, check_same_thread=False)
+            for pragma, value in self._pragmas.items():
+                connection.execute(f"PRAGMA {pragma} = {value}")
+            if connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                for pragma, value in self._wal_pragmas.items():
+                    connection.execute(f"PRAGMA {pragma} = {value}")
+        except sqlite3.Error as e:
+            print(f"Error connecting to database: {e}")
+            return None
+        with self._pool_lock:
+            self._pool.append(connection)
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[Optional[sqlite3.Connection]]:
+        '''Yield this thread's pooled connection, or a new one that is closed afterwards.'''
+        if not self._pooled:
+            connection = self.connect()
+            try:
+                yield connection
+            finally:
+                if connection:
+                    connection.close()
+        else:
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = self._connect_pooled()
+            yield connection
+
+    @Stats.timed("sqlite.migrate")
+    def migrate(self) -> None:
+        '''Bring the schema (indexes) up to date. Never done on its own, so reading the db
+        does not change it: call it once, e.g. through --migrate of the console or GUI.'''
+        with self._connection() as connection:
+            if connection:
+                self._migrate(connection)
+                try:    # outside the transaction of the migrations: journal_mode cannot change inside one
+                    for pragma, value in SQLiteDBAccess.DB_PRAGMAS.items():
+                        connection.execute(f"PRAGMA {pragma} = {value}")
+                except sqlite3.Error as e:
+                    print(f"Error setting database pragmas: {e}")
+
+    def pending_migrations(self) -> List[int]:
+        '''The versions of MIGRATIONS not applied to the db yet; only reads.'''
+        with self._connection() as connection:
+            if not connection:
+                return []
+            try:
+                return self._pending_migrations(connection)
+            except sqlite3.Error as e:
+                print(f"Error reading the schema version: {e}")
+                return []
+
+    @staticmethod
+    def _pending_migrations(connection: sqlite3.Connection) -> List[int]:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        return [v for v in sorted(SQLiteDBAccess.MIGRATIONS) if v > version]
+
+    def check_schema(self, migrate: bool=False) -> bool:
+        '''Apply the pending migrations when migrate is True, else only tell about them.
+        Returns True when the schema is up to date.'''
+        if migrate:
+            self.migrate()
+        if not self.pending_migrations():
+            return True
+        print("The sales database lacks its indexes, so lookups scan the whole table: "
+              "start once with --migrate to add them.")
+        return False
+
+    def _migrate(self, connection: sqlite3.Connection) -> None:
+        '''Apply the MIGRATIONS newer than the db's user_version in one transaction.'''
+        try:
+            pending = SQLiteDBAccess._pending_migrations(connection)
+            if not pending:
+                return
+            with connection:    # commit, or roll back on error
+                for v in pending:
+                    for statement in SQLiteDBAccess.MIGRATIONS[v]:
+                        connection.execute(statement)
+                connection.execute(f"PRAGMA user_version = {pending[-1]}")
+        except sqlite3.Error as e:
+            print(f"Error migrating database: {e}")
+        else:
+            self._check_query_plans(connection)
+
+    @Stats.timed("sqlite.optimize")
+    def optimize(self) -> None:
+        '''Refresh the planner statistics, e.g. after a large import.'''
+        with self._connection() as connection:
+            if connection:
+                connection.execute("PRAGMA optimize")
+
+    def check_query_plans(self) -> List[str]:
+        '''Return the names of the HOT_QUERIES that would scan the Sales table.'''
+        with self._connection() as connection:
+            if not connection:
+                return []
+            return self._check_query_plans(connection)
+
+    @staticmethod
+    def _check_query_plans(connection: sqlite3.Connection) -> List[str]:
+        scans = []
+        for name, (query, parameters) in SQLiteDBAccess.HOT_QUERIES.items():
+            plan = connection.execute(f"EXPLAIN QUERY PLAN {query}", parameters).fetchall()
+            details = [row[-1] for row in plan]
+            if any(detail.startswith("SCAN") for detail in details):
+                print(f"Warning: query '{name}' scans the table: {'; '.join(details)}")
+                scans.append(name)
+        return scans
+
+    @staticmethod
+    def _date_text(salesDate) -> str:
+        '''salesDate as stored in the Sales table: a date is formatted, text is kept as it is.'''
+        return f"{salesDate:{Sales.DATE_FORMAT}}" if isinstance(salesDate, date) else salesDate
+
+    @staticmethod
+    def _sales_from_row(row: tuple, regions: Regions) -> Sales:
+        '''Sales of an (ID, amount, salesDate, region) row: the date is parsed and the region is
+        the registry's Region, or a new Region named after its code when the registry lacks it.'''
+        id, amount, salesDate, code = row
+        return Sales(id, amount, Sales.parse_date(salesDate), regions.get(code) or Region(code, code))
+
+    @Stats.timed("sqlite.retrieve_sales_by_date_region", rows=lambda sales: int(sales is not None))
     def retrieve_sales_by_date_region(self, salesDate: str, region: str) -> Optional[Sales]:
         '''Retrieve ID, amount, salesDate, and region field from Sales table for the records
         that have the given salesDate and region values.'''
@@ -45,24 +222,126 @@ class SQLiteDBAccess:
             WHERE salesDate = ? AND region = ?
         '''
         
-        connection = self.connect()
-        if not connection:
-            return None
-        
-        cursor = connection.cursor()
-        try:
-            cursor.execute(query, (salesDate, region))
-            result = cursor.fetchone() 
-            if result:
-                return Sales(id=result[0], amount=result[1], salesDate=result[2], region=result[3])
-            else:
+        with self._connection() as connection:
+            if not connection:
+                return None
+            try:
+                cursor = connection.execute(query, (SQLiteDBAccess._date_text(salesDate), region))
+                result = cursor.fetchone()
+                if result:
+                    return SQLiteDBAccess._sales_from_row(result, Regions())
+                else:
+                    return None
+            except sqlite3.Error as e:
+                print(f"Error retrieving sales data: {e}")
                 return None
-        except sqlite3.Error as e:
-            print(f"Error retrieving sales data: {e}")
-            return None
-        finally:
-            connection.close()
 
+    @staticmethod
+    def _sales_filter(start=None, end=None, regions: Optional[Iterable[str]]=None,
+                      min_amount: Optional[float]=None, max_amount: Optional[float]=None) -> tuple:
+        '''WHERE conditions and parameters for the sales queries; None means no limit.'''
+        conditions, parameters = [], []
+        for condition, value in (("salesDate >= ?", start), ("salesDate <= ?", end),
+                                 ("amount >= ?", min_amount), ("amount <= ?", max_amount)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(SQLiteDBAccess._date_text(value))
+        if regions is not None:
+            regions = list(regions)
+            conditions.append(f"region IN ({', '.join('?' * len(regions))})")
+            parameters.extend(regions)
+        return conditions, parameters
+
+    def iter_sales(self, start=None, end=None, regions: Optional[Iterable[str]]=None,
+                   min_amount: Optional[float]=None, max_amount: Optional[float]=None,
+                   fetch_size: int=0) -> Iterator[Sales]:
+        '''Yield the Sales between the dates start and end (inclusive), in the given region codes
+        and between the amounts, ordered by salesDate and ID. Rows are fetched fetch_size at a
+        time, so a large range is never held in memory at once.'''
+        conditions, parameters = SQLiteDBAccess._sales_filter(start, end, regions, min_amount, max_amount)
+        query = (f"SELECT ID, amount, salesDate, region FROM Sales "
+                 f"{'WHERE ' + ' AND '.join(conditions) if conditions else ''} ORDER BY salesDate, ID")
+        fetch_size = fetch_size or SQLiteDBAccess.FETCH_SIZE
+        regions = Regions()
+        with self._connection() as connection:
+            if not connection:
+                return
+            try:
+                with Stats.timer("sqlite.iter_sales"):
+                    cursor = connection.execute(query, parameters)
+                while True:
+                    with Stats.timer("sqlite.iter_sales.fetchmany") as timer:
+                        rows = cursor.fetchmany(fetch_size)
+                        timer.rows = len(rows)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield SQLiteDBAccess._sales_from_row(row, regions)
+            except sqlite3.Error as e:
+                print(f"Error retrieving sales data: {e}")
+
+    @Stats.timed("sqlite.sales_summary")
+    def sales_summary(self) -> da.SalesSummary:
+        '''The SalesSummary of the Sales table, grouped by SQLite: one row per (region, year, quarter)
+        comes back instead of every sales. Dates that are not a valid yyyy-mm-dd ('+0 days' makes
+        SQLite roll 2021-02-30 over, so it no longer matches) are grouped by their text and parsed
+        like iter_sales parses them; there are few, if any.'''
+        summary = da.SalesSummary()
+        with self._connection() as connection:
+            if not connection:
+                return summary
+            try:
+                groups = connection.execute(
+                    "SELECT region, CAST(substr(salesDate, 1, 4) AS INTEGER), "
+                    "(CAST(substr(salesDate, 6, 2) AS INTEGER) + 2) / 3, SUM(amount), COUNT(*) "
+                    "FROM Sales WHERE date(salesDate, '+0 days') IS salesDate GROUP BY 1, 2, 3").fetchall()
+                others = connection.execute(
+                    "SELECT region, salesDate, SUM(amount), COUNT(*) FROM Sales "
+                    "WHERE date(salesDate, '+0 days') IS NOT salesDate GROUP BY region, salesDate").fetchall()
+            except sqlite3.Error as e:
+                print(f"Error retrieving sales data: {e}")
+                return summary
+        for code, year, quarter, total, count in groups:
+            summary.add_group((code, year, quarter), total, count)
+        for code, salesDate, total, count in others:
+            salesDate = Sales.parse_date(salesDate) if isinstance(salesDate, str) else "?"
+            if salesDate == "?":
+                summary.bad_count += count
+            else:
+                summary.add_group((code, salesDate.year, Sales.cal_quarter(salesDate.month)), total, count)
+        return summary
+
+    @Stats.timed("sqlite.retrieve_sales_page", rows=lambda result: len(result[0]))
+    def retrieve_sales_page(self, after: Optional[tuple]=None, page_size: int=100, start=None, end=None,
+                            regions: Optional[Iterable[str]]=None, min_amount: Optional[float]=None,
+                            max_amount: Optional[float]=None) -> tuple[List[Sales], Optional[tuple]]:
+        '''One page of iter_sales, continuing after the (salesDate, ID) key of the previous page
+        (keyset pagination: no OFFSET, every page costs the same). Returns the page and the key
+        to pass as after for the next page, None after the last page.'''
+        conditions, parameters = SQLiteDBAccess._sales_filter(start, end, regions, min_amount, max_amount)
+        if after is not None:
+            conditions.append("(salesDate, ID) > (?, ?)")
+            parameters.extend(after)
+        query = (f"SELECT ID, amount, salesDate, region FROM Sales "
+                 f"{'WHERE ' + ' AND '.join(conditions) if conditions else ''} "
+                 f"ORDER BY salesDate, ID LIMIT ?")
+        with self._connection() as connection:
+            if not connection:
+                return [], None
+            try:
+                # one row more than the page tells whether there is a next page
+                rows = connection.execute(query, (*parameters, page_size + 1)).fetchall()
+            except sqlite3.Error as e:
+                print(f"Error retrieving sales data: {e}")
+                return [], None
+        regions = Regions()
+        page = [SQLiteDBAccess._sales_from_row(row, regions) for row in rows]
+        if len(page) <= page_size:
+            return page, None
+        del page[page_size:]
+        return page, (SQLiteDBAccess._date_text(page[-1].salesDate), page[-1].id)
+
+    @Stats.timed("sqlite.update_sales")
     def update_sales(self, sales: Sales) -> None:
         '''Update amount, salesDate fields of Sales table for the record with the given id value.'''
         
@@ -72,35 +351,213 @@ class SQLiteDBAccess:
             WHERE id = ?
         '''
         
-        connection = self.connect()
-        if not connection:
-            return
-        print(sales.region)
-        cursor = connection.cursor()
+        with self._connection() as connection:
+            if not connection:
+                return
+            print(sales.region)
+            try:
+                connection.execute(query, SQLiteDBAccess._update_record(sales))
+                connection.commit()
+            except sqlite3.Error as e:
+                connection.rollback()
+                print(f"Error updating sales data: {e}")
+
+    @staticmethod
+    def _update_record(sales) -> tuple:
+        '''(amount, salesDate, id) parameters of the UPDATE of a Sales.'''
+        return sales.amount, SQLiteDBAccess._date_text(sales.salesDate), sales.id
+
+    def _execute_updates(self, connection: sqlite3.Connection, sales_iterable: Iterable) -> int:
+        '''Run the updates with executemany in one transaction; raises sqlite3.Error after rolling back.'''
+        query = '''UPDATE Sales SET amount = ?, salesDate = ? WHERE id = ?'''
+        records = map(SQLiteDBAccess._update_record, sales_iterable)
+        count = 0
+        with connection:    # one transaction: commit at the end, or roll back everything
+            while batch := list(islice(records, SQLiteDBAccess.BATCH_SIZE)):
+                count += connection.executemany(query, batch).rowcount
+        return count
+
+    @Stats.timed("sqlite.write_updates", rows=lambda count: count)
+    def write_updates(self, sales_iterable: Iterable) -> int:
+        '''Update amount and salesDate of many Sales (matched by id) in one transaction.
+        Returns the number of rows updated; raises sqlite3.Error when nothing was written.'''
+        with self._connection() as connection:
+            if not connection:
+                raise sqlite3.OperationalError("no connection")
+            return self._execute_updates(connection, sales_iterable)
+
+    def update_many(self, sales_iterable: Iterable) -> int:
+        '''write_updates, but returns 0 if the transaction was rolled back.'''
         try:
-            cursor.execute(query, (sales.amount, sales.salesDate, sales.id))
-            connection.commit()
+            return self.write_updates(sales_iterable)
         except sqlite3.Error as e:
             print(f"Error updating sales data: {e}")
-        finally:
-            connection.close()
+            return 0
 
+    @Stats.timed("sqlite.retrieve_regions", rows=len)
     def retrieve_regions(self) -> List[Region]:
         '''Retrieve region code and name from Region table.'''
         
         query = '''SELECT code, name FROM Region'''
         
-        connection = self.connect()
-        if not connection:
-            return []
-        
-        cursor = connection.cursor()
+        with self._connection() as connection:
+            if not connection:
+                return []
+            try:
+                rows = connection.execute(query).fetchall()
+                return [Region(code=row[0], name=row[1]) for row in rows]
+            except sqlite3.Error as e:
+                print(f"Error retrieving regions: {e}")
+                return []
+
+    def cached_regions(self) -> List[Region]:
+        '''Regions from a cached copy of the Region table, read again after REGION_CACHE_TTL
+        seconds or after invalidate_regions(). Safe to call from several threads.'''
+        with self._regions_lock:
+            if time.monotonic() >= self._regions_expire:
+                regions = self.retrieve_regions()
+                if regions:     # an error returns [], try again on the next call
+                    self._regions = regions
+                    self._regions_expire = time.monotonic() + SQLiteDBAccess.REGION_CACHE_TTL
+                return list(regions)
+            return list(self._regions)
+
+    def invalidate_regions(self) -> None:
+        '''Call after changing the Region table so cached_regions() reads it again.'''
+        with self._regions_lock:
+            self._regions_expire = 0.0
+
+    @staticmethod
+    def _sales_record(sales) -> tuple:
+        '''(amount, salesDate, region code) of a Sales.'''
+        if sales.has_bad_data or sales.region is None:
+            raise ValueError(f"{sales} contains bad data")
+        return sales.amount, SQLiteDBAccess._date_text(sales.salesDate), sales.region.code
+
+    @Stats.timed("sqlite.bulk_load_sales", rows=lambda count: count)
+    def bulk_load_sales(self, sales_source: Union[Iterable, str, Path], filename: str="",
+                        batch_size: int=0) -> int:
+        '''Insert the sales of a SalesList (or any iterable of Sales), or of a quarterly csv
+        file (a name in p01_files or a full path), into the Sales table with executemany, all in one
+        transaction. filename (default: the csv file name) is recorded in ImportedFiles in the
+        same transaction. Returns the number of rows loaded, 0 if nothing was loaded.'''
+
+        query = '''INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)'''
+        batch_size = batch_size or SQLiteDBAccess.BATCH_SIZE
+        if isinstance(sales_source, (str, Path)):
+            filename = filename or Path(sales_source).name
+            batches = (map(SQLiteDBAccess._sales_record, batch) for batch in
+                       da.SalesFile(str(sales_source)).iter_sales_batches(chunk_size=batch_size))
+        else:
+            records = map(SQLiteDBAccess._sales_record, sales_source)
+            batches = iter(lambda: list(islice(records, batch_size)), [])
+
+        with self._connection() as connection:
+            if not connection:
+                return 0
+            start = time.perf_counter()
+            count = 0
+            try:
+                if filename and connection.execute("SELECT 1 FROM ImportedFiles WHERE fileName = ?",
+                                                   (filename,)).fetchone():
+                    print(f"File '{filename}' has already been imported.")
+                    return 0
+                with connection:    # one transaction: commit at the end, or roll back everything
+                    if filename:    # fails on UNIQUE if another connection has imported it meanwhile
+                        connection.execute("INSERT INTO ImportedFiles (fileName) VALUES (?)", (filename,))
+                    for batch in batches:
+                        cursor = connection.executemany(query, batch)
+                        count += cursor.rowcount
+            except (sqlite3.Error, ValueError, OSError) as e:   # IntegrityError too, e.g. a NULL amount
+                print(f"{type(e)}. Fail to load sales: {e}")
+                return 0
+            seconds = time.perf_counter() - start
+            print(f"Loaded {count:,} sales in {seconds:.2f}s ({count / max(seconds, 1e-9):,.0f} rows/sec).")
+            return count
+
+
+class SalesUpdateQueue:
+    '''Write-behind queue in front of SQLiteDBAccess.update_sales. put() only records the edit
+    (the latest one per sales id); flush() writes all pending edits in one transaction. Call
+    flush() on demand, from a timer and at exit. Safe to use from several threads.
+    storage is a SQLiteDBAccess or a storage backend (p01_1da_backend): anything with write_updates.'''
+
+    def __init__(self, storage):
+        self._storage = storage
+        self._pending = {}      # sales id -> Sales, in the order first edited
+        self._lock = threading.Lock()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def put(self, sales) -> None:
+        with self._lock:
+            self._pending[sales.id] = sales
+
+    def get(self, id: int):
+        '''The pending edit of the sales with this id, None if there is none.'''
+        return self._pending.get(id)
+
+    def flush(self) -> int:
+        '''Write the pending edits. Returns the number of rows updated; when the transaction
+        fails the edits stay pending (unless edited again meanwhile) and 0 is returned.'''
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
         try:
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            return [Region(code=row[0], name=row[1]) for row in rows]
-        except sqlite3.Error as e:
-            print(f"Error retrieving regions: {e}")
-            return []
-        finally:
-            connection.close()
+            return self._storage.write_updates(pending.values())
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error updating sales data: {e}")
+            with self._lock:    # put them back, newer edits win
+                pending.update(self._pending)
+                self._pending = pending
+            return 0
+
+
+class SQLiteImportedFile:
+    '''ImportedFile kept in the ImportedFiles table. With a pooled SQLiteDBAccess the names are
+    loaded once into a set and loaded again only when another connection has changed the
+    database; with per-call connections each check is a primary key lookup.'''
+
+    def __init__(self, sqlite_dbaccess: Optional[SQLiteDBAccess]=None):
+        self._sqlite_dbaccess = sqlite_dbaccess or SQLiteDBAccess(pooled=True)
+        self._files = set()
+        self._data_version = None   # (connection id, PRAGMA data_version) the set was loaded at
+
+    def _imported_files(self, connection: sqlite3.Connection) -> set:
+        # data_version changes when another connection commits to the db
+        data_version = (id(connection), connection.execute("PRAGMA data_version").fetchone()[0])
+        if data_version != self._data_version:
+            self._files = {row[0] for row in connection.execute("SELECT fileName FROM ImportedFiles")}
+            self._data_version = data_version
+        return self._files
+
+    @Stats.timed("sqlite.already_imported")
+    def already_imported(self, filepath_name: Union[Path, str]) -> bool:
+        with self._sqlite_dbaccess._connection() as connection:
+            if not connection:
+                return False
+            try:
+                if not self._sqlite_dbaccess._pooled:
+                    return connection.execute("SELECT 1 FROM ImportedFiles WHERE fileName = ?",
+                                              (Path(filepath_name).name,)).fetchone() is not None
+                return Path(filepath_name).name in self._imported_files(connection)
+            except sqlite3.Error as e:
+                print(f"Error retrieving imported files: {e}")
+                return False
+
+    @Stats.timed("sqlite.add_imported_file")
+    def add_imported_file(self, filepath_name: Union[Path, str]) -> None:
+        with self._sqlite_dbaccess._connection() as connection:
+            if not connection:
+                return
+            try:
+                with connection:
+                    connection.execute("INSERT OR IGNORE INTO ImportedFiles (fileName) VALUES (?)",
+                                       (Path(filepath_name).name,))
+                if self._sqlite_dbaccess._pooled:
+                    self._imported_files(connection).add(Path(filepath_name).name)
+            except sqlite3.Error as e:
+                print(f"{type(e)} - The imported file could not be documented.")
@@ -0,0 +1,174 @@
+from collections import deque
+from functools import wraps
+from pathlib import Path
+from typing import Optional, Callable, Union
+import atexit
+import json
+import math
+import os
+import threading
+import time
+
+
+class _StageTimer:
+    # What Stats.timer hands out while on: set .rows inside the with block when the number of
+    # rows is only known at the end; exclude() takes out time that is not the stage's own
+    # (e.g. waiting for the user between pages).
+    __slots__ = ("stage", "rows", "_start")
+
+    def __init__(self, stage: str, rows: int):
+        self.stage = stage
+        self.rows = rows
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        Stats.record(self.stage, time.perf_counter() - self._start, self.rows)
+        return False
+
+    def exclude(self, seconds: float) -> None:
+        self._start += seconds
+
+
+class _NoTimer:
+    # What Stats.timer hands out while off: one shared object that records nothing
+    __slots__ = ("rows",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def exclude(self, seconds: float) -> None:
+        pass
+
+
+class Stats:
+    # Opt-in timers and counters of the hot paths: csv reading, type conversion, id assignment,
+    # view rendering, saving and every SQLiteDBAccess query. Off unless the SALES_STATS
+    # environment variable is set (to anything but 0) or enable() is called, e.g. by the
+    # console's --stats flag; while off a timer costs one attribute check. With SALES_STATS_FILE
+    # set, it is on and report() is written to that file as JSON at exit.
+    ENV_VAR = "SALES_STATS"
+    FILE_ENV_VAR = "SALES_STATS_FILE"
+    MAX_SAMPLES = 10_000    # latest durations kept per stage for the percentiles
+    PERCENTILES = (50, 90, 99)
+    enabled = os.environ.get(ENV_VAR, "0") not in ("", "0") or bool(os.environ.get(FILE_ENV_VAR))
+    _lock = threading.Lock()
+    _stages = {}    # stage -> [calls, rows, seconds, deque of the latest durations]
+    _counters = {}  # name -> count
+    _NO_TIMER = _NoTimer()
+
+    @staticmethod
+    def enable(enabled: bool=True) -> None:
+        Stats.enabled = enabled
+
+    @staticmethod
+    def reset() -> None:
+        with Stats._lock:
+            Stats._stages.clear()
+            Stats._counters.clear()
+
+    @staticmethod
+    def timer(stage: str, rows: int=0):
+        # with Stats.timer("stage", rows) as timer: ... times the block
+        if not Stats.enabled:
+            return Stats._NO_TIMER
+        return _StageTimer(stage, rows)
+
+    @staticmethod
+    def timed(stage: str, rows: Optional[Callable]=None):
+        # decorator timing every call of a function; rows(result) is the number of rows it handled
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not Stats.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                Stats.record(stage, time.perf_counter() - start, rows(result) if rows else 0)
+                return result
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def record(stage: str, seconds: float, rows: int=0) -> None:
+        with Stats._lock:
+            entry = Stats._stages.get(stage)
+            if entry is None:
+                entry = Stats._stages[stage] = [0, 0, 0.0, deque(maxlen=Stats.MAX_SAMPLES)]
+            entry[0] += 1
+            entry[1] += rows
+            entry[2] += seconds
+            entry[3].append(seconds)
+
+    @staticmethod
+    def count(name: str, n: int=1) -> None:
+        if not Stats.enabled or not n:
+            return
+        with Stats._lock:
+            Stats._counters[name] = Stats._counters.get(name, 0) + n
+
+    @staticmethod
+    def _percentile(sorted_seconds: list, percent: float) -> float:
+        # nearest rank
+        return sorted_seconds[max(0, math.ceil(percent / 100 * len(sorted_seconds)) - 1)]
+
+    @staticmethod
+    def report() -> dict:
+        # {"enabled", "stages": {stage: {calls, rows, seconds, rows_per_sec, p50_ms, ..., max_ms}},
+        #  "counters": {name: count}}; the percentiles cover the latest MAX_SAMPLES calls
+        with Stats._lock:
+            entries = {stage: (calls, rows, seconds, sorted(samples))
+                       for stage, (calls, rows, seconds, samples) in Stats._stages.items()}
+            counters = dict(Stats._counters)
+        stages = {}
+        for stage, (calls, rows, seconds, samples) in sorted(entries.items()):
+            stages[stage] = {"calls": calls, "rows": rows, "seconds": seconds,
+                             "rows_per_sec": rows / seconds if rows and seconds > 0 else None}
+            for percent in Stats.PERCENTILES:
+                stages[stage][f"p{percent}_ms"] = Stats._percentile(samples, percent) * 1000
+            stages[stage]["max_ms"] = samples[-1] * 1000
+        return {"enabled": Stats.enabled, "stages": stages, "counters": counters}
+
+    @staticmethod
+    def dump(filepath_name: Union[Path, str]) -> None:
+        # report() as JSON; raises OSError
+        report = Stats.report()
+        report["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        Path(filepath_name).write_text(json.dumps(report, indent=2) + "\n")
+
+    @staticmethod
+    def format_report() -> str:
+        # report() as a table for the console
+        report = Stats.report()
+        if not report["stages"] and not report["counters"]:
+            return ("Nothing recorded yet." if Stats.enabled else
+                    f"Stats are off: start with --stats or set {Stats.ENV_VAR}=1.")
+        percents = [f"p{percent}_ms" for percent in Stats.PERCENTILES]
+        lines = [f"{'Stage':40}{'Calls':>8}{'Rows':>12}{'Total s':>10}{'Rows/s':>12}"
+                 + "".join(f"{percent:>10}" for percent in percents) + f"{'max_ms':>10}"]
+        for stage, values in report["stages"].items():
+            lines.append(f"{stage:40}{values['calls']:>8,}{values['rows']:>12,}{values['seconds']:>10.3f}"
+                         f"{values['rows_per_sec'] or 0:>12,.0f}"
+                         + "".join(f"{values[percent]:>10.3f}" for percent in percents)
+                         + f"{values['max_ms']:>10.3f}")
+        for name, count in sorted(report["counters"].items()):
+            lines.append(f"{name:40}{count:>8,}")
+        return "\n".join(lines)
+
+
+def _dump_at_exit() -> None:
+    filepath_name = os.environ.get(Stats.FILE_ENV_VAR)
+    if not filepath_name:
+        return
+    try:
+        Stats.dump(filepath_name)
+    except OSError as e:
+        print(f"Error writing stats: {e}")
+
+
+atexit.register(_dump_at_exit)
@@ -0,0 +1,239 @@
+from p01_1da_sales import *
+
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:     # optional: the pure Python SalesColumns is used instead
+    np = None
+
+GROUP_FIELDS = ("region", "year", "quarter", "month")
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()    # datetime64[D] counts days from here
+
+
+def _merge_codes(codes: list) -> tuple[list, list]:
+    # Regions with the same code (e.g. two Region objects of a ColumnarSalesList) are one
+    # region here: the distinct codes, and renumber[region_idx] is the position among them
+    unique = list(dict.fromkeys(codes))
+    return [unique.index(code) for code in codes] + [-1], unique    # renumber[-1]: no region
+
+
+class SalesColumns:
+    # Column view of the good sales (no bad amount or date) for filtering and grouping.
+    # Pure Python; NumpySalesColumns has the same interface and is used when numpy is installed.
+    def __init__(self, ids, amounts, ordinals, region_idx, codes: list):
+        self.ids = list(ids)
+        self.amounts = list(amounts)
+        self.ordinals = list(ordinals)     # date.toordinal()
+        renumber, codes = _merge_codes(codes)
+        self.region_idx = [renumber[i] for i in region_idx]    # position in codes, -1 for no region
+        self.codes = codes + [""]          # so that -1 is ""
+        dates = {}
+        for ordinal in set(self.ordinals):
+            dates[ordinal] = date.fromordinal(ordinal)
+        self.years = [dates[ordinal].year for ordinal in self.ordinals]
+        self.months = [dates[ordinal].month for ordinal in self.ordinals]
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _take(self, positions: list) -> "SalesColumns":
+        return SalesColumns([self.ids[i] for i in positions], [self.amounts[i] for i in positions],
+                            [self.ordinals[i] for i in positions], [self.region_idx[i] for i in positions],
+                            self.codes[:-1])
+
+    def filter(self, regions=None, start: Optional[date]=None, end: Optional[date]=None,
+               min_amount: Optional[float]=None, max_amount: Optional[float]=None) -> "SalesColumns":
+        region_idx = None if regions is None else {self.codes.index(code) for code in regions
+                                                   if code in self.codes[:-1]}
+        low = start.toordinal() if start else None
+        high = end.toordinal() if end else None
+        positions = [i for i in range(self.count)
+                     if (region_idx is None or self.region_idx[i] in region_idx)
+                     and (low is None or self.ordinals[i] >= low)
+                     and (high is None or self.ordinals[i] <= high)
+                     and (min_amount is None or self.amounts[i] >= min_amount)
+                     and (max_amount is None or self.amounts[i] <= max_amount)]
+        return self._take(positions)
+
+    def _field(self, field: str) -> list:
+        if field == "region":
+            return [self.codes[i] for i in self.region_idx]
+        if field == "year":
+            return self.years
+        if field == "month":
+            return self.months
+        if field == "quarter":
+            return [(month - 1) // 3 + 1 for month in self.months]
+        raise ValueError(f"Cannot group by {field}, use one of {GROUP_FIELDS}.")
+
+    def group_by(self, *fields: str) -> dict:
+        # {(value of each field, ...): (total amount, count)}
+        groups = {}
+        for key, amount in zip(zip(*[self._field(field) for field in fields]), self.amounts):
+            total, count = groups.get(key, (0.0, 0))
+            groups[key] = (total + amount, count + 1)
+        return dict(sorted(groups.items()))
+
+    def top_n(self, n: int) -> list[tuple]:
+        # (ID, amount, date, region code) of the n largest sales
+        positions = sorted(range(self.count), key=self.amounts.__getitem__, reverse=True)[:n]
+        return [(self.ids[i], self.amounts[i], date.fromordinal(self.ordinals[i]),
+                 self.codes[self.region_idx[i]]) for i in positions]
+
+    def running_total(self) -> list[tuple]:
+        # (date, total of all sales up to and including that date), one entry per date
+        daily = {}
+        for ordinal, amount in zip(self.ordinals, self.amounts):
+            daily[ordinal] = daily.get(ordinal, 0.0) + amount
+        ordinals = sorted(daily)
+        return [(date.fromordinal(ordinal), total) for ordinal, total in
+                zip(ordinals, accumulate(daily[ordinal] for ordinal in ordinals))]
+
+
+class NumpySalesColumns:
+    # SalesColumns on numpy arrays: filters are boolean masks, groups use bincount.
+    # The columns are copied: a view of an array.array (e.g. of a ColumnarSalesList) would
+    # keep its buffer exported, and the array could no longer grow.
+    def __init__(self, ids, amounts, ordinals, region_idx, codes: list):
+        self.ids = np.array(ids, dtype=np.int64)
+        self.amounts = np.array(amounts, dtype=np.float64)
+        self.ordinals = np.array(ordinals, dtype=np.int64)
+        renumber, codes = _merge_codes(codes)
+        self.region_idx = np.array(renumber, dtype=np.int64)[np.array(region_idx, dtype=np.int64)]
+        self.codes = codes + [""]       # so that -1 is ""
+        days = (self.ordinals - EPOCH_ORDINAL).astype("datetime64[D]")
+        months = days.astype("datetime64[M]").astype(np.int64)     # months since 1970-01
+        self.years = months // 12 + 1970
+        self.months = months % 12 + 1
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _take(self, mask) -> "NumpySalesColumns":
+        taken = NumpySalesColumns.__new__(NumpySalesColumns)
+        for name in ("ids", "amounts", "ordinals", "region_idx", "years", "months"):
+            setattr(taken, name, getattr(self, name)[mask])
+        taken.codes = self.codes
+        return taken
+
+    def filter(self, regions=None, start: Optional[date]=None, end: Optional[date]=None,
+               min_amount: Optional[float]=None, max_amount: Optional[float]=None) -> "NumpySalesColumns":
+        mask = np.ones(self.count, dtype=bool)
+        if regions is not None:
+            mask &= np.isin(self.region_idx, [self.codes.index(code) for code in regions
+                                              if code in self.codes[:-1]])
+        if start is not None:
+            mask &= self.ordinals >= start.toordinal()
+        if end is not None:
+            mask &= self.ordinals <= end.toordinal()
+        if min_amount is not None:
+            mask &= self.amounts >= min_amount
+        if max_amount is not None:
+            mask &= self.amounts <= max_amount
+        return self._take(mask)
+
+    def _field(self, field: str):
+        if field == "region":
+            return np.where(self.region_idx < 0, len(self.codes) - 1, self.region_idx)
+        if field == "year":
+            return self.years
+        if field == "month":
+            return self.months
+        if field == "quarter":
+            return (self.months - 1) // 3 + 1
+        raise ValueError(f"Cannot group by {field}, use one of {GROUP_FIELDS}.")
+
+    def group_by(self, *fields: str) -> dict:
+        # {(value of each field, ...): (total amount, count)}
+        if self.count == 0:
+            return {}
+        # one small integer per (field, ...) combination, so a single bincount does the grouping
+        values, combined = [], np.zeros(self.count, dtype=np.int64)
+        for field in fields:
+            unique, inverse = np.unique(self._field(field), return_inverse=True)
+            values.append(unique.tolist())
+            combined = combined * len(unique) + inverse.reshape(-1)
+        totals = np.bincount(combined, weights=self.amounts)
+        counts = np.bincount(combined)
+        groups = {}
+        for position in np.flatnonzero(counts).tolist():
+            key, rest = [], position
+            for field, unique in zip(reversed(fields), reversed(values)):
+                rest, index = divmod(rest, len(unique))
+                key.append(self.codes[unique[index]] if field == "region" else unique[index])
+            groups[tuple(reversed(key))] = (float(totals[position]), int(counts[position]))
+        return dict(sorted(groups.items()))
+
+    def top_n(self, n: int) -> list[tuple]:
+        # (ID, amount, date, region code) of the n largest sales
+        n = min(n, self.count)
+        if n == 0:
+            return []
+        positions = np.argpartition(-self.amounts, n - 1)[:n]
+        positions = positions[np.argsort(-self.amounts[positions], kind="stable")]
+        return [(int(self.ids[i]), float(self.amounts[i]), date.fromordinal(int(self.ordinals[i])),
+                 self.codes[self.region_idx[i]]) for i in positions]
+
+    def running_total(self) -> list[tuple]:
+        # (date, total of all sales up to and including that date), one entry per date
+        ordinals, inverse = np.unique(self.ordinals, return_inverse=True)
+        totals = np.cumsum(np.bincount(inverse.reshape(-1), weights=self.amounts))
+        return [(date.fromordinal(ordinal), total) for ordinal, total in
+                zip(ordinals.tolist(), totals.tolist())]
+
+
+def sales_columns(ids, amounts, ordinals, region_idx, codes: list, use_numpy: Optional[bool]=None):
+    # NumpySalesColumns when numpy is installed (unless use_numpy is False), else SalesColumns
+    if use_numpy is None:
+        use_numpy = np is not None
+    columns_type = NumpySalesColumns if use_numpy else SalesColumns
+    return columns_type(ids, amounts, ordinals, region_idx, codes)
+
+
+def columns_from_saleslist(sales_list: SalesList, use_numpy: Optional[bool]=None):
+    if isinstance(sales_list, ColumnarSalesList):    # straight from the typed arrays
+        columns = [sales_list._ids, sales_list._amounts, sales_list._dates, sales_list._region_idx]
+        codes = [region.code for region in sales_list._regions]
+        if use_numpy is None:
+            use_numpy = np is not None
+        if use_numpy:   # copies, see NumpySalesColumns
+            good = np.array(sales_list._flags, dtype=np.uint8) == 0
+            if not good.all():
+                columns = [np.array(column, dtype=column.typecode)[good] for column in columns]
+        elif any(sales_list._flags):
+            good = [i for i, flags in enumerate(sales_list._flags) if flags == 0]
+            columns = [[column[i] for i in good] for column in columns]
+        return sales_columns(*columns, codes, use_numpy)
+
+    ids, amounts, ordinals, region_idx, codes = [], [], [], [], {}
+    for sales in sales_list:
+        if sales.has_bad_data:
+            continue
+        ids.append(sales.id)
+        amounts.append(sales.amount)
+        ordinals.append(sales.salesDate.toordinal())
+        code = sales.region.code if sales.region else None
+        region_idx.append(-1 if code is None else codes.setdefault(code, len(codes)))
+    return sales_columns(ids, amounts, ordinals, region_idx, list(codes), use_numpy)
+
+
+def columns_from_sqlite(sqlite_dbaccess, use_numpy: Optional[bool]=None):
+    # all rows of the Sales table of a p01_1da_sales_db.SQLiteDBAccess
+    with sqlite_dbaccess._connection() as connection:
+        if not connection:
+            return sales_columns([], [], [], [], [], use_numpy)
+        rows = connection.execute("SELECT ID, amount, salesDate, region FROM Sales").fetchall()
+    codes = {}
+    ids, amounts, ordinals, region_idx = [], [], [], []
+    for id, amount, salesDate, code in rows:
+        salesDate = Sales.parse_date(salesDate)
+        if salesDate == "?":
+            continue
+        ids.append(id)
+        amounts.append(amount)
+        ordinals.append(salesDate.toordinal())
+        region_idx.append(codes.setdefault(code, len(codes)))
+    return sales_columns(ids, amounts, ordinals, region_idx, list(codes), use_numpy)
@@ -1,95 +1,257 @@
 from p01_1da_sales import *
+from p01_1da_backend import SalesBackend, CsvSalesBackend, BACKENDS
+from p01_1da_stats import Stats
 
 from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
 import locale as lc
+import sys
+import time
 
 lc.setlocale(lc.LC_ALL, "en_US")
 
+
+class CurrencyFormatter:
+    # Same text as lc.currency(value, grouping=True), but the locale rules are worked out once:
+    # symbol and sign become a prefix/suffix and grouping is done by format().
+    def __init__(self):
+        conv = lc.localeconv()
+        digits = conv['frac_digits']
+        grouping = conv['mon_grouping']
+        # other groupings (e.g. [3, 2, 0]) and the 'C' locale are left to lc.currency
+        self._fast = digits != 127 and grouping in ([], [3, 0], [3, 3, 0])
+        if self._fast:
+            self._spec = f"{',' if grouping else ''}.{digits}f"
+            self._separators = str.maketrans({',': conv['mon_thousands_sep'],
+                                              '.': conv['mon_decimal_point']})
+            self._affixes = {negative: CurrencyFormatter._affixes_of(conv, negative)
+                             for negative in (False, True)}
+
+    @staticmethod
+    def _affixes_of(conv: dict, negative: bool) -> tuple[str, str]:
+        # the steps of lc.currency applied to a placeholder number
+        prefix = 'n_' if negative else 'p_'
+        s = '<#>'
+        separator = ' ' if conv[prefix + 'sep_by_space'] else ''
+        if conv[prefix + 'cs_precedes']:
+            s = conv['currency_symbol'] + separator + s
+        else:
+            s = s + separator + conv['currency_symbol']
+        sign_pos = conv[prefix + 'sign_posn']
+        sign = conv['negative_sign' if negative else 'positive_sign']
+        if sign_pos == 0:
+            s = '(' + s + ')'
+        elif sign_pos == 2:
+            s = s + sign
+        elif sign_pos == 3:
+            s = s.replace('<', sign)
+        elif sign_pos == 4:
+            s = s.replace('>', sign)
+        else:
+            s = sign + s
+        before, after = s.replace('<', '').replace('>', '').split('#')
+        return before, after
+
+    def __call__(self, value) -> str:
+        if not self._fast:
+            return lc.currency(value, grouping=True)
+        before, after = self._affixes[value < 0]
+        return before + format(abs(value), self._spec).translate(self._separators) + after
+
+
+@lru_cache(maxsize=65_536)
+def _decimal(amount: float) -> Decimal:
+    return Decimal(str(amount))
+
+
+class SalesReport:
+    # Builds the view_sales table and writes it in chunks instead of one print per row
+    COL_WIDTHS = (5, 15, 15, 15, 15)
+    CHUNK_ROWS = 1_000  # rows per write
+    QUARTERS = [f"{Sales.cal_quarter(month)}" for month in range(13)]  # month 0: bad date
+
+    def __init__(self, sales_list: SalesList, limit: Optional[int]=None, offset: int=0):
+        self._sales_list = sales_list
+        self._start = min(offset, sales_list.count)
+        self._stop = sales_list.count if limit is None else min(self._start + limit, sales_list.count)
+        self._currency = CurrencyFormatter()
+        self.bad_data_flag = False
+        self.total = Decimal('0.0')
+
+    @property
+    def row_count(self) -> int:
+        return self._stop - self._start
+
+    def header(self) -> str:
+        col1_w, col2_w, col3_w, col4_w, col5_w = SalesReport.COL_WIDTHS
+        return (f"{' ':{col1_w}}"
+                f"{'Date':{col2_w}}"
+                f"{'Quarter':{col3_w}}"
+                f"{'Region':{col4_w}}"
+                f"{'Amount':>{col5_w}}\n"
+                f"{'-' * sum(SalesReport.COL_WIDTHS)}\n")
+
+    def rows(self) -> Iterator[str]:
+        col1_w, col2_w, col3_w, col4_w, col5_w = SalesReport.COL_WIDTHS
+        currency, quarters = self._currency, SalesReport.QUARTERS
+        # indexed, not islice: the rows before offset are never walked
+        shown = map(self._sales_list.__getitem__, range(self._start, self._stop))
+        for idx, sales in enumerate(shown, start=self._start + 1):
+            if sales.has_bad_data:
+                self.bad_data_flag = True
+                num = f"{idx}.*"
+            else:
+                num = f"{idx}."
+
+            amount = sales.amount
+            if not sales.has_bad_amount:
+                self.total += _decimal(amount)
+                amount = currency(amount)
+
+            sales_date = sales.salesDate
+            if sales.has_bad_date:
+                month = 0
+            else:
+                month = sales_date.month
+                sales_date = f"{sales_date:{Sales.DATE_FORMAT}}"
+
+            yield (f"{num:<{col1_w}}"
+                   f"{sales_date:{col2_w}}"
+                   f"{quarters[month]:<{col3_w}}"
+                   f"{sales.region.name:{col4_w}}"
+                   f"{amount:>{col5_w}}\n")
+
+    def footer(self) -> str:
+        col1_w, col2_w, col3_w, col4_w, col5_w = SalesReport.COL_WIDTHS
+        total = self._currency(self.total.quantize(Decimal("1.00"), ROUND_HALF_UP))
+        return (f"{'-' * sum(SalesReport.COL_WIDTHS)}\n"
+                f"{'TOTAL':{col1_w}}"
+                f"{' ':{col2_w + col3_w + col4_w}}"
+                f"{total:>{col5_w}}\n\n")
+
+    def render(self, write=None, page_size: int=0, more=None) -> bool:
+        # write: function taking text (default sys.stdout.write); with page_size, more() is
+        # asked after every page and the table ends early when it returns False
+        write = write or sys.stdout.write
+        with Stats.timer("view_render") as timer:
+            write(self.header())
+            buffer = []
+            count = 0
+            for count, line in enumerate(self.rows(), start=1):
+                buffer.append(line)
+                if page_size and count % page_size == 0 and count < self.row_count:
+                    write("".join(buffer))
+                    buffer.clear()
+                    if more is not None:
+                        asked = time.perf_counter()
+                        go_on = more()
+                        timer.exclude(time.perf_counter() - asked)  # the time the user takes is not rendering
+                        if not go_on:
+                            break
+                elif len(buffer) >= SalesReport.CHUNK_ROWS:
+                    write("".join(buffer))
+                    buffer.clear()
+            write("".join(buffer))
+            write(self.footer())
+            timer.rows = count
+        return self.bad_data_flag
+
+
 class SalesManager:
-    def __init__(self, sales_list=None):
-        self._datafileaccess = DataFileAccess()
+    def __init__(self, sales_list=None, backend: Optional[SalesBackend]=None):
+        # all_sales.csv unless another storage backend (e.g. SQLiteSalesBackend) is given
+        self._backend = backend or CsvSalesBackend()
+
+    @property
+    def backend(self) -> SalesBackend:
+        return self._backend
+
+    def view_all_sales(self, limit: Optional[int]=None, offset: int=0, page_size: int=0) -> bool:
+        return self.view_sales(self._backend.all_sales(), limit, offset, page_size)
 
     @staticmethod
-    def view_sales(sales_list: SalesList) -> bool:
+    def view_sales(sales_list: SalesList, limit: Optional[int]=None, offset: int=0,
+                   page_size: int=0) -> bool:
         bad_data_flag = False
+        report = SalesReport(sales_list, limit, offset)
 
-        if sales_list.count == 0: 
+        if report.row_count == 0:
             print("No sales to view.")
-        else:  
-            col1_w, col2_w, col3_w, col4_w, col5_w = 5, 15, 15, 15, 15
-            total_w = col1_w + col2_w + col3_w + col4_w + col5_w
-            print(f"{' ':{col1_w}}"
-                  f"{'Date':{col2_w}}"
-                  f"{'Quarter':{col3_w}}"
-                  f"{'Region':{col4_w}}"
-                  f"{'Amount':>{col5_w}}")
-            print(horizontal_line := f"{'-' * total_w}")
-            total = Decimal('0.0') 
-
-            for idx in range(1, sales_list.count+1):  
-                sales = sales_list[idx-1]
-                if sales.has_bad_data:
-                    bad_data_flag = True
-                    num = f"{idx}.*" 
-                else:
-                    num = f"{idx}."  
-
-                amount = sales.amount
-                if not sales.has_bad_amount:
-                    total += Decimal(str(amount))
-                    amount = lc.currency(amount, grouping=True)
-
-                sales_date = sales.sales_date
-                if sales.has_bad_date:
-                    bad_data_flag = True
-                    month = 0
-                else:
-                    sales_date = f"{sales_date:{Sales.DATE_FORMAT}}"
-                    month = sales.sales_date.month
-
-                region = sales.region.name
-                quarter = f"{Sales.cal_quarter(month)}"
-                print(f"{num:<{col1_w}}"
-                      f"{sales_date:{col2_w}}"
-                      f"{quarter:<{col3_w}}"
-                      f"{region:{col4_w}}"
-                      f"{amount:>{col5_w}}") 
-
-            print(horizontal_line)
-            total = total.quantize(Decimal("1.00"), ROUND_HALF_UP)
-            total = lc.currency(total, grouping=True)
-            print(f"{'TOTAL':{col1_w}}"
-                  f"{' ':{col2_w + col3_w + col4_w}}"
-                  f"{total:>{col5_w}}\n")  
+        else:
+            more = None
+            if page_size:
+                more = lambda: input("Press Enter for more, q to stop: ").strip().lower() != "q"
+            bad_data_flag = report.render(sys.stdout.write, page_size, more)
             print(f"view_sales: {DataFileAccess.SALES_ID['Sales']=}")
-            return bad_data_flag
+        return bad_data_flag
+
+    def view_summary(self) -> None:
+        summary = self._backend.summary()
+        groups = summary.groups()
+        if not groups:
+            print("No sales to summarize.")
+            return
+        names = {region.code: region.name for region in Regions()}
+        currency = CurrencyFormatter()
+        col1_w, col2_w, col3_w, col4_w, col5_w = 15, 10, 10, 10, 20
+        print(f"{'Region':{col1_w}}"
+              f"{'Year':{col2_w}}"
+              f"{'Quarter':{col3_w}}"
+              f"{'Sales':>{col4_w}}"
+              f"{'Amount':>{col5_w}}")
+        print(horizontal_line := f"{'-' * (col1_w + col2_w + col3_w + col4_w + col5_w)}")
+        total, count = 0.0, 0
+        for code, year, quarter, group_total, group_count in groups:
+            print(f"{names.get(code, code):{col1_w}}"
+                  f"{year:<{col2_w}}"
+                  f"{quarter:<{col3_w}}"
+                  f"{group_count:>{col4_w}}"
+                  f"{currency(round(group_total, 2)):>{col5_w}}")
+            total += group_total
+            count += group_count
+        print(horizontal_line)
+        print(f"{'TOTAL':{col1_w + col2_w + col3_w}}"
+              f"{count:>{col4_w}}"
+              f"{currency(round(total, 2)):>{col5_w}}")
+        if summary.bad_count:
+            print(f"{summary.bad_count} sales with bad data are not included.")
+        print()
+
+    def find_sales(self, start: date, end: Optional[date]=None, code: Optional[str]=None) -> None:
+        # sales of one date (or from start to end) and region, answered from the backend's indexes
+        if end is None and code is not None:
+            found_sales = self._backend.find(start, code)
+        else:
+            found_sales = self._backend.iter_sales(start, end or start, None if code is None else [code])
+        found = SalesList()
+        found.concat(found_sales)
+        self.view_sales(found)
 
     def add_sales1(self) -> None:
         kwarg = InputAccess.from_input1()
         sales = Sales(**kwarg)
-        self._datafileaccess.add_sales(sales)
-        print(f"Sales for {kwarg["sales_date"]} is added.\n")
+        self._backend.bulk_load([sales])
+        print(f"Sales for {kwarg["salesDate"]} is added.\n")
         print(f"add_sales1: {DataFileAccess.SALES_ID['Sales']=}")
 
     def add_sales2(self) -> None:
         kwarg = InputAccess.from_input2()
         sales = Sales(**kwarg)
-        self._datafileaccess.add_sales(sales)
-        print(f"Sales for {kwarg["sales_date"]} is added.\n")
+        self._backend.bulk_load([sales])
+        print(f"Sales for {kwarg["salesDate"]} is added.\n")
         print(f"add_sales2: {DataFileAccess.SALES_ID['Sales']=}")
 
     def import_sales(self) -> None:
         filename = input("Enter name of file to import: ")
         salesfile = SalesFile(filename)
-        importedfile = ImportedFile()
 
         if not salesfile.is_valid_filename_format:
             print(f"Filename '{filename}' doesn't follow the expected",
                   f"format of '{salesfile.NAMING_CONVENTION}'.")
-        elif Regions().get(salesfile.get_region_code()) is None:
+        elif Regions().get(salesfile.get_code()) is None:
             print(f"Filename '{filename}' doesn't include one of",
                   f"the following region codes: {[region.code for region in Regions()]}.")
-        elif importedfile.already_imported(salesfile._sales_filepath_name):
+        elif self._backend.already_imported(salesfile._sales_filepath_name):
             filename = filename.replace("\n", "")  
             print(f"File '{filename}' has already been imported.")
         else:
@@ -103,16 +265,47 @@ class SalesManager:
                     print(f"File '{filename}' contains bad data.\n"
                          "Please correct the data in the file and try again.")
                 elif imported_sales_list.count > 0:  
-                    self._datafileaccess.concat_saleslist(imported_sales_list)    
-                    print("Imported sales added to list.")
-                    importedfile.add_imported_file(salesfile._sales_filepath_name)
+                    if self._backend.bulk_load(imported_sales_list, salesfile._sales_filepath_name):
+                        print("Imported sales added to list.")
+
+    def import_all_sales(self, max_workers=None) -> None:
+        filenames = []
+        for filename in SalesFile.discover():
+            salesfile = SalesFile(filename)
+            if Regions().get(salesfile.get_code()) is None:     # reported like in import_sales
+                print(f"Filename '{filename}' doesn't include one of",
+                      f"the following region codes: {[region.code for region in Regions()]}.")
+            elif not self._backend.already_imported(salesfile._sales_filepath_name):
+                filenames.append(filename)
+        if not filenames:
+            print("No new sales files to import.")
+            return
+
+        col1_w, col2_w, col3_w = 25, 10, 10
+        print(f"{'File':{col1_w}}{'Sales':>{col2_w}}{'Seconds':>{col3_w}}  Result")
+        imported_count = 0
+        for filename, imported_sales_list, seconds, error in SalesFile.import_sales_files(filenames, max_workers):
+            count = 0 if imported_sales_list is None else imported_sales_list.count
+            if error is not None:
+                result = f"{type(error)}. Fail to import sales."
+            elif any(sales.has_bad_data for sales in imported_sales_list):
+                result = "Contains bad data, not imported."
+            elif count == 0:
+                result = "No sales to import."
+            elif self._backend.bulk_load(imported_sales_list, SalesFile(filename)._sales_filepath_name):
+                imported_count += count     # merged in file name order, ids are assigned here
+                result = "Imported."
+            else:
+                result = "Fail to import sales."
+            print(f"{filename:{col1_w}}{count:>{col2_w}}{seconds:>{col3_w}.3f}  {result}")
+        print(f"{imported_count} imported sales added to list.")
 
 
 def main():
     salesmanager =SalesManager()
-    # datafileaccess = DataFileAccess()
-    salesmanager.view_sales(salesmanager._datafileaccess._all_sales_list)
-    print(f"{salesmanager._datafileaccess.SALES_ID['Sales']=}")
+    # salesmanager = SalesManager(backend=BACKENDS["sqlite"]())
+    salesmanager.view_all_sales()
+    print(f"{DataFileAccess.SALES_ID['Sales']=}")
 
     # salesmanager.add_sales1()
     # salesmanager.add_sales2()
@@ -120,10 +313,10 @@ def main():
     # salesmanager.import_sales()
     # salesmanager.import_sales()
     salesmanager.import_sales()
-    salesmanager.view_sales(salesmanager._datafileaccess._all_sales_list)
-    print(f"{salesmanager._datafileaccess.SALES_ID['Sales']=}")
+    salesmanager.view_all_sales()
+    print(f"{DataFileAccess.SALES_ID['Sales']=}")
 
-    salesmanager._datafileaccess.save_all_sales()
+    salesmanager.backend.save()
 
 
 
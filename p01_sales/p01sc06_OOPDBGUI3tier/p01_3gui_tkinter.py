@@ -1,15 +1,20 @@
 import p01_1da_sales_db as db
 from p01_1da_sales import Sales, Regions
+from p01_1da_backend import SalesBackend, SQLiteSalesBackend, BACKENDS
 
+import argparse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import tkinter as tk
 from tkinter import ttk, messagebox  # To override the basic Tk widgets, the import should follow the Tk import
 
 class SalesFrame(ttk.Frame):
-    sqlite_dbaccess: db.SQLiteDBAccess   # type hint
+    backend: SalesBackend   # type hint
+    POLL_MS = 50    # how often the Tk loop checks a database request running in the background
+    FLUSH_MS = 30_000   # how often queued changes are written to the database
 
-    def __init__(self, parent):
+    def __init__(self, parent, backend: SalesBackend=None):
         ttk.Frame.__init__(self, parent, padding="10 10 10 10")
         self.parent = parent
         self.salesDate_entry = None
@@ -19,19 +24,31 @@ class SalesFrame(ttk.Frame):
         self.getAmount_button = None
         self.clearField_button = None
         self.saveChanges_button = None
+        self.flushChanges_button = None
+        self.busy_bar = None
         
         # Define string variable for text entry fields
         self.salesDate = tk.StringVar()
         self.region = tk.StringVar()
         self.amount = tk.StringVar()
         self.id = tk.StringVar()
+        self.pending = tk.StringVar(value="Pending changes: 0")
 
         self.init_components()
         
         # for database access
         self.sales = None
-        self.sqlite_dbaccess = db.SQLiteDBAccess()
-
+        self.backend = backend or SQLiteSalesBackend()  # sales_db.sqlite unless another backend is given
+        # queries and updates run on this thread, so the window never waits for the database
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.backend.name)
+        self._request = None        # Future of the request in flight
+        self._button_states = {}    # button -> state before the request, restored when it ends
+        # the buttons that start database work, disabled while a request is in flight
+        self._busy_buttons = [self.getAmount_button, self.saveChanges_button, self.flushChanges_button]
+        # saved changes are queued and written together, on demand, by a timer or at exit
+        self.update_queue = db.SalesUpdateQueue(self.backend)
+        self.run_in_background(self.backend.regions, self.fill_regions)
+        self.after(SalesFrame.FLUSH_MS, self.flush_timer)
 
     def init_components(self):
         # Display the grid of labels and text entry fields
@@ -44,7 +61,8 @@ class SalesFrame(ttk.Frame):
         self.salesDate_entry.grid(row=1, column=1, columnspan=2)
 
         ttk.Label(self, text="Region:").grid(row=2, column=0, sticky=tk.E)
-        self.region_entry = ttk.Entry(self, width=25, textvariable=self.region)
+        # region codes are filled in from the region cache once it is loaded
+        self.region_entry = ttk.Combobox(self, width=22, textvariable=self.region)
         self.region_entry.grid(row=2, column=1, columnspan=2)
 
         ttk.Label(self, text="Amount:").grid(row=3, column=0, sticky=tk.E)
@@ -66,10 +84,122 @@ class SalesFrame(ttk.Frame):
         self.clearField_button.grid(row=0, column=1)
         self.saveChanges_button = ttk.Button(button_frame, text="Save Changes", command=self.save_changes, state=tk.DISABLED)
         self.saveChanges_button.grid(row=0, column=2)
-        ttk.Button(button_frame, text="Exit", command=self.parent.destroy).grid(row=0, column=3, padx=5)
+        ttk.Button(button_frame, text="Browse", command=lambda: SalesBrowser(self)).grid(row=0, column=3, padx=5)
+        ttk.Button(button_frame, text="Exit", command=self.parent.destroy).grid(row=0, column=4)
+
+        ttk.Label(self, textvariable=self.pending).grid(row=6, column=0, columnspan=2, sticky=tk.W)
+        self.flushChanges_button = ttk.Button(self, text="Write Changes", command=self.flush_changes,
+                                              state=tk.DISABLED)
+        self.flushChanges_button.grid(row=6, column=2, columnspan=2, sticky=tk.E)
+
+        # shown only while a database request is in flight
+        self.busy_bar = ttk.Progressbar(self, mode="indeterminate", length=150)
+        self.busy_bar.grid(row=7, column=0, columnspan=4)
 
         for child in self.winfo_children():
             child.grid_configure(padx=5, pady=5)
+        self.busy_bar.grid_remove()
+
+    def run_in_background(self, work, on_done):
+        # Run work() on the worker thread; on_done(result) is called on the Tk thread
+        # unless the request was cancelled by clear_field in the meantime.
+        # One request at a time: a second one would orphan the first, so it is refused.
+        if self.busy:
+            return False
+        self._request = self.executor.submit(work)
+        self.set_busy(True)
+        self.after(SalesFrame.POLL_MS, self._poll_request, self._request, on_done)
+        return True
+
+    @property
+    def busy(self) -> bool:
+        return self._request is not None
+
+    def _poll_request(self, request, on_done):
+        if request is not self._request:    # cancelled: the result is stale
+            return
+        if not request.done():
+            self.after(SalesFrame.POLL_MS, self._poll_request, request, on_done)
+            return
+        self._request = None
+        self.set_busy(False)
+        try:
+            result = request.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Database error: {e}")
+        else:
+            on_done(result)
+
+    def cancel_request(self):
+        if self._request is not None:
+            self._request.cancel()      # only stops it if it has not started; the result is ignored anyway
+            self._request = None
+            self.set_busy(False)
+
+    def set_busy(self, busy: bool):
+        # disable the buttons that start database work and show the busy bar
+        if busy:
+            if self._button_states:     # already busy: keep the states saved before the first request
+                return
+            self._busy_buttons = [button for button in self._busy_buttons if button.winfo_exists()]
+            self._disable(self._busy_buttons)
+            self.busy_bar.grid()
+            self.busy_bar.start()
+        else:
+            for button, state in self._button_states.items():
+                if button.winfo_exists():   # a SalesBrowser may have been closed meanwhile
+                    button.config(state=state)
+            self._button_states.clear()
+            self.busy_bar.stop()
+            self.busy_bar.grid_remove()
+
+    def _disable(self, buttons):
+        for button in buttons:
+            self._button_states[button] = str(button.cget("state"))
+            button.config(state=tk.DISABLED)
+
+    def add_busy_buttons(self, *buttons):
+        # buttons of another window (a SalesBrowser) that also start database work
+        self._busy_buttons.extend(buttons)
+        if self.busy:
+            self._disable(buttons)
+
+    def fill_regions(self, regions):
+        self.region_entry.config(values=[region.code for region in regions])
+
+    def show_pending_count(self):
+        count = self.update_queue.pending_count
+        self.pending.set(f"Pending changes: {count}")
+        state = tk.NORMAL if count else tk.DISABLED
+        if self.flushChanges_button in self._button_states:    # busy: set it when the request ends
+            self._button_states[self.flushChanges_button] = state
+        else:
+            self.flushChanges_button.config(state=state)
+
+    def flush_changes(self):
+        self.run_in_background(self.update_queue.flush, self.show_flushed)
+
+    def show_flushed(self, count):
+        self.show_pending_count()
+        if self.update_queue.pending_count:
+            messagebox.showerror("Error", "Changes could not be written, they are still pending.")
+        else:
+            messagebox.showinfo("Success", f"{count} sales updated.")
+
+    def flush_timer(self):
+        self.show_pending_count()   # also after a flush whose result was dropped by clear_field
+        if self.update_queue.pending_count and not self.busy:
+            self.run_in_background(self.update_queue.flush, lambda count: self.show_pending_count())
+        self.after(SalesFrame.FLUSH_MS, self.flush_timer)
+
+    def close(self):
+        # after the window is gone: wait for the request in flight, drop its result,
+        # then write the changes still queued
+        self._request = None
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.update_queue.flush()
+        self.backend.save()
+        self.backend.close()
 
 
     def get_amount(self):
@@ -85,30 +215,40 @@ class SalesFrame(ttk.Frame):
                 messagebox.showerror("Error", f"{salesDate} is not in a valid date format \n"
                                               "'yyyy-mm-dd'")
             else:
-                # check if region is one of the right option
-                regions = self.sqlite_dbaccess.retrieve_regions()
-                region_codes = [region.code for region in regions]
-                if region_code not in region_codes:
-                    messagebox.showerror("Error", f"{region_code} is not one of the following \n"
-                                                  f"region code: {region_codes}")
-                else: # check if there is sales by the date and region
-                    self.sales = self.sqlite_dbaccess.retrieve_sales_by_date_region(salesDate, region_code)
-                    if self.sales is None:
-                        # clear id and amount field
-                        self.amount.set("")
-                        self.id.set("")
-                        # notify user for no sales and expected values
-                        messagebox.showerror("Error", "No sales found.")
-                    else:
-                        self.amount.set(self.sales.amount)
-                        self.id.set(self.sales.id)
-                        self.salesDate_entry.config(state=tk.DISABLED)
-                        self.region_entry.config(state=tk.DISABLED)
-                        self.amount_entry.config(state=tk.ACTIVE)
-                        self.saveChanges_button.config(state=tk.NORMAL)
+                def lookup():   # on the worker thread
+                    region_codes = [region.code for region in self.backend.regions()]
+                    if region_code not in region_codes:
+                        return region_codes, None
+                    found = self.backend.find(salesDate, region_code)
+                    return region_codes, found[0] if found else None
+                self.run_in_background(lookup, lambda result: self.show_sales(region_code, *result))
+
+    def show_sales(self, region_code, region_codes, sales):
+        self.region_entry.config(values=region_codes)   # the cache may have been read again
+        # check if region is one of the right option
+        if region_code not in region_codes:
+            messagebox.showerror("Error", f"{region_code} is not one of the following \n"
+                                          f"region code: {region_codes}")
+        else: # check if there is sales by the date and region
+            self.sales = sales
+            if self.sales is None:
+                # clear id and amount field
+                self.amount.set("")
+                self.id.set("")
+                # notify user for no sales and expected values
+                messagebox.showerror("Error", "No sales found.")
+            else:
+                queued = self.update_queue.get(self.sales.id)  # an edit not written yet
+                self.amount.set(queued.amount if queued else self.sales.amount)
+                self.id.set(self.sales.id)
+                self.salesDate_entry.config(state=tk.DISABLED)
+                self.region_entry.config(state=tk.DISABLED)
+                self.amount_entry.config(state=tk.ACTIVE)
+                self.saveChanges_button.config(state=tk.NORMAL)
 
     
     def clear_field(self):
+        self.cancel_request()
         self.id.set("")
         self.amount.set("")
         self.salesDate.set("")
@@ -136,16 +276,131 @@ class SalesFrame(ttk.Frame):
             salesDate = datetime.strptime(salesDate, Sales.DATE_FORMAT).date()
             region = Regions().get(region_code)
             self.sales = Sales(id, amount, salesDate, region)
-            self.sqlite_dbaccess.update_sales(self.sales)
-            messagebox.showinfo("Success", f"{str(self.sales)} is updated.")
+            self.update_queue.put(self.sales)
+            self.show_pending_count()
+            messagebox.showinfo("Success", f"{str(self.sales)} is queued for saving.")
             self.clear_field()
 
 
+class SalesBrowser(tk.Toplevel):
+    # Pages through the sales of a date range and region with keyset pagination:
+    # only PAGE_SIZE rows are fetched from the database and shown at a time.
+    PAGE_SIZE = 50
+
+    def __init__(self, frame: SalesFrame):
+        tk.Toplevel.__init__(self, frame.parent)
+        self.title("Browse Sales")
+        self.frame = frame
+        self.tree = None
+        self.search_button = None
+        self.previous_button = None
+        self.next_button = None
+
+        self.start = tk.StringVar()
+        self.end = tk.StringVar()
+        self.region = tk.StringVar()
+        self.page_info = tk.StringVar()
+
+        self._filters = {}      # keyword arguments of backend.sales_page for the current search
+        self._keys = []         # 'after' key of each page shown so far, None for the first page
+        self._next_key = None   # 'after' key of the next page, None on the last page
+        self.init_components()
+
+    def init_components(self):
+        ttk.Label(self, text="From:").grid(row=0, column=0, sticky=tk.E)
+        ttk.Entry(self, width=12, textvariable=self.start).grid(row=0, column=1)
+        ttk.Label(self, text="To:").grid(row=0, column=2, sticky=tk.E)
+        ttk.Entry(self, width=12, textvariable=self.end).grid(row=0, column=3)
+        ttk.Label(self, text="Region:").grid(row=0, column=4, sticky=tk.E)
+        ttk.Combobox(self, width=5, textvariable=self.region,
+                     values=self.frame.region_entry.cget("values")).grid(row=0, column=5)
+        self.search_button = ttk.Button(self, text="Search", command=self.search)
+        self.search_button.grid(row=0, column=6)
+
+        columns = {"id": "ID", "salesDate": "Date", "region": "Region", "amount": "Amount"}
+        self.tree = ttk.Treeview(self, columns=list(columns), show="headings", height=20)
+        for column, heading in columns.items():
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=100, anchor=tk.E if column == "amount" else tk.W)
+        self.tree.grid(row=1, column=0, columnspan=7)
+
+        ttk.Label(self, textvariable=self.page_info).grid(row=2, column=0, columnspan=3, sticky=tk.W)
+        self.previous_button = ttk.Button(self, text="Previous", command=self.previous_page, state=tk.DISABLED)
+        self.previous_button.grid(row=2, column=5)
+        self.next_button = ttk.Button(self, text="Next", command=self.next_page, state=tk.DISABLED)
+        self.next_button.grid(row=2, column=6)
+
+        for child in self.winfo_children():
+            child.grid_configure(padx=5, pady=5)
+        # disabled, like the buttons of the main window, while any request is in flight
+        self.frame.add_busy_buttons(self.search_button, self.previous_button, self.next_button)
+
+    def search(self):
+        if self.frame.busy:     # only one request at a time, see SalesFrame.run_in_background
+            return
+        filters = {}
+        for key, text in (("start", self.start.get()), ("end", self.end.get())):
+            if text:    # blank: no limit
+                try:
+                    filters[key] = datetime.strptime(text, Sales.DATE_FORMAT).date()
+                except ValueError:
+                    messagebox.showerror("Error", f"{text} is not in a valid date format \n"
+                                                  "'yyyy-mm-dd'", parent=self)
+                    return
+        if self.region.get():
+            filters["regions"] = [self.region.get()]
+        self._filters = filters
+        self._keys = [None]
+        self.load_page(None)
+
+    def next_page(self):
+        if self.frame.busy:
+            return
+        self._keys.append(self._next_key)
+        self.load_page(self._next_key)
+
+    def previous_page(self):
+        if self.frame.busy:
+            return
+        self._keys.pop()
+        self.load_page(self._keys[-1])
+
+    def load_page(self, after):
+        self.previous_button.config(state=tk.DISABLED)
+        self.next_button.config(state=tk.DISABLED)
+        filters = self._filters
+        self.frame.run_in_background(
+            lambda: self.frame.backend.sales_page(after, SalesBrowser.PAGE_SIZE, **filters),
+            self.show_page)
+
+    def show_page(self, result):
+        if not self.winfo_exists():     # closed while the page was loading
+            return
+        page, self._next_key = result
+        self.tree.delete(*self.tree.get_children())
+        for sales in page:
+            self.tree.insert("", tk.END, values=(sales.id, sales.salesDate, sales.region.code,
+                                                 f"{sales.amount:,.2f}"))
+        self.page_info.set(f"Page {len(self._keys)}" if page else "No sales found.")
+        self.previous_button.config(state=tk.NORMAL if len(self._keys) > 1 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if self._next_key else tk.DISABLED)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Edit sales amounts")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="sqlite",
+                        help="edit the sales of sales_db.sqlite (default) or all_sales.csv")
+    parser.add_argument("--migrate", action="store_true",
+                        help="add the indexes sales_db.sqlite lacks (changes the db file)")
+    args = parser.parse_args()
+    if args.backend == "sqlite":
+        Regions.SQLITE_DB = db.SQLiteDBAccess.SQLITEDBPATH / 'sales_db.sqlite'  # same regions as the db
+        db.SQLiteDBAccess().check_schema(args.migrate)
     root = tk.Tk()
     root.title("Edit Sales Amount")
-    SalesFrame(root)
+    frame = SalesFrame(root, BACKENDS[args.backend]())
     root.mainloop()
+    frame.close()
 
 
 if __name__ == "__main__":
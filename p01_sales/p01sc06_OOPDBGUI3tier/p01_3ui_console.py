@@ -1,8 +1,12 @@
 from p01_2bl_salesmanager import *
+from p01_1da_sales_db import SQLiteDBAccess
+
+import argparse
+
 
 class ConsoleUI:
-    def __init__(self):
-        self._sales_manager = SalesManager()
+    def __init__(self, backend: Optional[SalesBackend]=None):
+        self._sales_manager = SalesManager(backend=backend)
 
     @staticmethod
     def display_title():
@@ -13,23 +17,101 @@ class ConsoleUI:
         cmd_format = "6"  # ^ center, < is the default for str.
         print("COMMAND MENU",
               f"{'view':{cmd_format}} - View all sales",
+              f"{' ':{cmd_format}}   view --limit N --offset N --page N views part of the sales",
+              f"{'summary':{cmd_format}} - View totals by region, year and quarter",
+              f"{'find':{cmd_format}} - Find sales: find YYYY-MM-DD [YYYY-MM-DD] [region]",
               f"{'add1':{cmd_format}} - Add sales by typing sales, year, month, day, and region",
               f"{'add2':{cmd_format}} - Add sales by typing sales, date (YYYY-MM-DD), and region",
               f"{'import':{cmd_format}} - Import sales from file",
+              f"{'batch':{cmd_format}} - Import all new sales files in parallel",
+              f"{'stats':{cmd_format}} - Show timings (with --stats): stats [--json FILE] [--reset]",
               f"{'menu':{cmd_format}} - Show menu",
               f"{'exit':{cmd_format}} - Exit program", sep='\n')
 
 
+    @staticmethod
+    def parse_view_options(args: list) -> Optional[dict]:
+        names = {"--limit": "limit", "--offset": "offset", "--page": "page_size"}
+        if len(args) % 2 != 0:
+            return None
+        options = {}
+        for flag, value in zip(args[::2], args[1::2]):
+            if flag not in names or not value.isdigit():
+                return None
+            options[names[flag]] = int(value)
+        return options
+
+    @staticmethod
+    def parse_find_options(args: list) -> Optional[dict]:
+        # find DATE [END_DATE] [REGION]
+        dates = [Sales.parse_date(arg) for arg in args if len(arg) > 1]
+        codes = [arg for arg in args if len(arg) == 1]
+        if not 1 <= len(dates) <= 2 or "?" in dates or len(codes) > 1 or len(args) != len(dates) + len(codes):
+            return None
+        options = {"start": dates[0], "end": dates[1] if len(dates) == 2 else None}
+        if codes:
+            options["code"] = codes[0]
+        return options
+
+    @staticmethod
+    def parse_stats_options(args: list) -> Optional[dict]:
+        # stats [--json FILE] [--reset]
+        options = {"json_file": None, "reset": False}
+        while args:
+            if args[0] == "--reset":
+                options["reset"], args = True, args[1:]
+            elif args[0] == "--json" and len(args) > 1:
+                options["json_file"], args = args[1], args[2:]
+            else:
+                return None
+        return options
+
+    @staticmethod
+    def show_stats(json_file: Optional[str]=None, reset: bool=False) -> None:
+        print(Stats.format_report())
+        if json_file:
+            try:
+                Stats.dump(json_file)
+                print(f"Stats written to {json_file}.")
+            except OSError as e:
+                print(f"Error writing stats: {e}")
+        if reset:
+            Stats.reset()
+
     def execute_command(self) -> None:
         while True:
-            action = input("\nPlease enter a command: ").strip().lower()
+            command = input("\nPlease enter a command: ").strip()
+            action = command.lower()
             if action == "exit":
-                self._sales_manager._datafileaccess.save_all_sales()
+                self._sales_manager.backend.save()
+                self._sales_manager.backend.close()
                 break
             if action == 'view':
-                self._sales_manager.view_sales(self._sales_manager._datafileaccess._all_sales_list)
+                self._sales_manager.view_all_sales()
+            elif action.startswith("view "):
+                options = self.parse_view_options(action.split()[1:])
+                if options is None:
+                    print("Usage: view [--limit N] [--offset N] [--page N]")
+                else:
+                    self._sales_manager.view_all_sales(**options)
+            elif action == "summary":
+                self._sales_manager.view_summary()
+            elif action == "find" or action.startswith("find "):
+                options = self.parse_find_options(action.split()[1:])
+                if options is None:
+                    print("Usage: find YYYY-MM-DD [YYYY-MM-DD] [region code]")
+                else:
+                    self._sales_manager.find_sales(**options)
             elif action == "import":
                 self._sales_manager.import_sales()
+            elif action == "batch":
+                self._sales_manager.import_all_sales()
+            elif action == "stats" or action.startswith("stats "):
+                options = self.parse_stats_options(command.split()[1:])    # the file name keeps its case
+                if options is None:
+                    print("Usage: stats [--json FILE] [--reset]")
+                else:
+                    self.show_stats(**options)
             elif action == "add1":
                 self._sales_manager.add_sales1()
             elif action == "add2":
@@ -42,7 +124,20 @@ class ConsoleUI:
 
 
 def main():
-    consoleui = ConsoleUI()
+    parser = argparse.ArgumentParser(description="Sales data importer")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="csv",
+                        help="store the sales in all_sales.csv (default) or sales_db.sqlite")
+    parser.add_argument("--stats", action="store_true",
+                        help=f"time the import, view and save steps (also on when {Stats.ENV_VAR}=1)")
+    parser.add_argument("--migrate", action="store_true",
+                        help="add the indexes sales_db.sqlite lacks (changes the db file)")
+    args = parser.parse_args()
+    if args.stats:
+        Stats.enable()
+    if args.backend == "sqlite":    # same regions as the db
+        Regions.SQLITE_DB = SQLiteDBAccess.SQLITEDBPATH / 'sales_db.sqlite'
+        SQLiteDBAccess().check_schema(args.migrate)
+    consoleui = ConsoleUI(BACKENDS[args.backend]())
     consoleui.display_title()
     consoleui.display_menu()
     consoleui.execute_command()